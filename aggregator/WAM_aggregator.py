@@ -0,0 +1,316 @@
+#!/usr/bin/python
+
+# Futures
+from __future__ import absolute_import
+from __future__ import print_function
+
+# Standard Libraries
+import sys
+import os
+import threading
+import socket
+import re
+import time
+import logging
+
+# 3rd Party Packages
+import Pyro4 # https://pypi.org/project/Pyro4/
+
+# Local Source Packages
+from utils.parseJSONFile import parseJSONFile
+from utils.wireFormat import configureWire
+
+# Development Version
+version = 0.5
+
+# Aggregator class visible to the WAM clients
+# Keeps a cached view of every daemon registered with the name server so that wam -cstat and
+# -qstat are answered from memory instead of every client querying every daemon. Each daemon
+# is followed by its own thread: it asks the daemon for the changes since the last state
+# version it saw (getChanges) and applies the changed and removed jobs to its cached queue.
+# The full host info and queue are only fetched when the daemon sends its full state (e.g.
+# after a restart) and every queueRefresh_seconds, which also refreshes run times and ETAs
+# that deltas do not carry. The aggregator subscribes to the job events of each daemon, so a state change
+# triggers the refresh right away; polling only covers missed events.
+@Pyro4.expose
+class clusterAggregator(object):
+	def __init__(self):
+		# define this directory
+		self.aggregatorScriptDirectory = os.path.dirname(os.path.realpath(__file__))
+
+		# load aggregator conf. file
+		self.loadAggregatorConfFile()
+
+		# start logging
+		self.loggingSetup()
+
+		# serializers accepted from clients and compression of the replies
+		wire = self.aggregatorConf["wire"]
+		accepted = configureWire(wire["serializersAccepted"], wire["compression"], wire["compressionThreshold_bytes"], wire["compressionLevel"])
+		logging.info("accepting Pyro serializers: {0}; compression {1}".format(", ".join(accepted), "on" if wire["compression"] else "off"))
+
+		# cached daemon states; hostName: {"version", "hostInfo", "queue", "queueTime", "updated", "error", "wake", "active"}
+		self.hosts = {}
+		self.hostsLock = threading.Lock()
+		self.version = 0			# bumped whenever the cached state of any daemon changes
+		self.callbackURI = None		# URI of this object, subscribed to the job events of the daemons
+
+		self.hostName = socket.gethostname()
+		self.nsThread = None
+		self.discoverThread = None
+
+		logging.info("WAM aggregator initialized")
+
+	## getVersion Method
+	# returns the version of the cached cluster state
+	def getVersion(self):
+		return self.version
+
+	## getHostInfos Method
+	# returns [hostName, host info (see serverDaemon.getHostInfo)] for the requested daemon (or all daemons)
+	# the host info is "TIMEOUT" for daemons not heard from lately or an error string for unreachable daemons
+	def getHostInfos(self,host=None):
+		return [[hostName, self.__cached(state, "hostInfo")] for hostName, state in self.__states(host)]
+
+	## getQueues Method
+	# returns [hostName, queue rows (see serverDaemon.getQueue)] for the requested daemon (or all daemons),
+	# optionally only the jobs of one user and/or with a status starting with the given status
+	def getQueues(self,host=None,user=None,status=None):
+		queues = []
+		for hostName, state in self.__states(host):
+			rows = self.__cached(state, "queue")
+			if isinstance(rows, list):
+				rows = [row for row in rows if (user is None or row[0] == user) and (status is None or row[2].startswith(status))]
+			queues.append([hostName, rows])
+		return queues
+
+	## jobEvent Method
+	# called by the daemons on job state changes; wakes the thread following the daemon
+	@Pyro4.oneway
+	def jobEvent(self,event):
+		with self.hostsLock:
+			state = self.hosts.get(event.get("host"))
+		if state is not None:
+			state["wake"].set()
+
+	## startRefresh Method
+	# starts following the daemons registered with the name server
+	def startRefresh(self,callbackURI):
+		self.callbackURI = str(callbackURI)
+		self.discoverThread = threading.Thread(target=self.__discover, name="WAM-discover")
+		self.discoverThread.setDaemon(True)
+		self.discoverThread.start()
+
+	## __states Private Method
+	# returns (hostName, state) of the requested daemon (or all daemons), sorted by host name
+	def __states(self,host):
+		with self.hostsLock:
+			return sorted([(hostName, state) for hostName, state in self.hosts.items() if host is None or hostName == host])
+
+	## __cached Private Method
+	# returns a cached value of a daemon, "TIMEOUT" if it is stale or the last error
+	def __cached(self,state,key):
+		if state["error"] is not None and state[key] is None:
+			return state["error"]
+		if state["updated"] is None or time.time() - state["updated"] > self.aggregatorConf["refresh"]["staleAfter_seconds"]:
+			return "TIMEOUT"
+		return state[key]
+
+	## __discover Private Method
+	# thread loop; follows daemons that registered with the name server and drops those that left
+	def __discover(self):
+		while True:
+			nsHost = self.aggregatorConf["nameServer"]["nameServerIP"]
+			nsPort = self.aggregatorConf["nameServer"]["nameServerPort"]
+			try:
+				ns = Pyro4.locateNS(host=nsHost,port=nsPort)
+				registered = ns.list(prefix="WAM.")
+				ns._pyroRelease()
+			except Exception as e:
+				logging.error("cannot list daemons on name server ({0}:{1}): {2}".format(nsHost,nsPort,e))
+				registered = None
+
+			if registered is not None:
+				daemons = dict((name[len("WAM."):-len(".daemon")], uri) for name, uri in registered.items() if name.endswith(".daemon"))
+				with self.hostsLock:
+					for hostName in list(self.hosts.keys()):
+						if hostName not in daemons:
+							state = self.hosts.pop(hostName)
+							state["active"] = False
+							state["wake"].set()
+							logging.info("daemon {0} left the name server".format(hostName))
+					for hostName, uri in daemons.items():
+						if hostName not in self.hosts:
+							self.hosts[hostName] = {"uri":str(uri), "version":0, "hostInfo":None, "queue":None, "queueTime":0, "updated":None,
+								"error":None, "wake":threading.Event(), "active":True}
+							thread = threading.Thread(target=self.__follow, args=(hostName, self.hosts[hostName]), name="WAM-follow-{0}".format(hostName))
+							thread.setDaemon(True)
+							thread.start()
+							logging.info("following daemon {0}".format(hostName))
+						else:
+							self.hosts[hostName]["uri"] = str(uri)
+
+			time.sleep(self.aggregatorConf["refresh"]["discoverInterval_seconds"])
+
+	## __follow Private Method
+	# thread loop keeping the cached state of one daemon up to date
+	def __follow(self,hostName,state):
+		refresh = self.aggregatorConf["refresh"]
+		proxy = None
+		subscriptionID = None
+		while state["active"]:
+			try:
+				if proxy is None:
+					proxy = Pyro4.Proxy(state["uri"])
+					proxy._pyroTimeout = refresh["callTimeout_seconds"]
+				if subscriptionID is None:
+					subscriptionID = proxy.subscribe(self.callbackURI)
+
+				changes = proxy.getChanges(state["version"])
+				changed = changes["full"] or changes["version"] != state["version"]
+				if changes["full"] and state["version"] > 0: # the daemon restarted and lost our subscription
+					subscriptionID = proxy.subscribe(self.callbackURI)
+				if changes["full"] or state["queue"] is None or time.time() - state["queueTime"] > refresh["queueRefresh_seconds"]:
+					hostInfo = proxy.getHostInfo()
+					jobQueue = proxy.getQueue()
+					with self.hostsLock:
+						state["hostInfo"] = hostInfo
+						state["queue"] = jobQueue
+						state["queueTime"] = time.time()
+						if changed:
+							self.version = self.version + 1
+				else:
+					with self.hostsLock:
+						self.__applyChanges(state, changes)
+						if changed:
+							self.version = self.version + 1
+				state["version"] = changes["version"]
+				state["updated"] = time.time()
+				state["error"] = None
+			except Exception as e:
+				if state["error"] is None:
+					logging.error("unable to refresh daemon {0}: {1}".format(hostName,e))
+				state["error"] = "*** ERROR: {0}".format(e)
+				if proxy is not None:
+					proxy._pyroRelease()
+				proxy = None
+				subscriptionID = None
+
+			state["wake"].wait(refresh["pollInterval_seconds"])
+			state["wake"].clear()
+
+		if proxy is not None and subscriptionID is not None:
+			try:
+				proxy.unsubscribe(subscriptionID)
+			except Exception:
+				pass
+			proxy._pyroRelease()
+
+	## __applyChanges Private Method
+	# applies a getChanges delta to the cached host info and queue of a daemon
+	# must be called while holding hostsLock
+	def __applyChanges(self,state,changes):
+		hostInfo = dict(changes["host"])
+		hostInfo["coreMap"] = state["hostInfo"].get("coreMap", []) if state["hostInfo"] else [] # refreshed with the full host info
+		state["hostInfo"] = hostInfo
+
+		if not changes["jobs"] and not changes["removed"]:
+			return
+		removed = set(changes["removed"])
+		records = dict((record["jobID"], record) for record in changes["jobs"])
+		jobQueue = []
+		for row in state["queue"]:
+			if row[1] in removed:
+				continue
+			if row[1] in records:
+				row = self.__queueRow(records.pop(row[1]), row)
+			jobQueue.append(row)
+		for record in changes["jobs"]: # new jobs; their place in the queue is fixed by the next full refresh
+			if record["jobID"] in records:
+				jobQueue.append(self.__queueRow(record, None))
+		state["queue"] = jobQueue
+
+	## __queueRow Private Method
+	# returns a queue row (see serverDaemon.getQueue) for a job record of a getChanges delta
+	# the daemon adds the run time or the finished array tasks to the status: the run time is counted from the
+	# start time, task counts are kept from the previous row while the status is unchanged; the ETA is kept until
+	# the next full refresh
+	def __queueRow(self,record,previous):
+		status = record["status"]
+		if "running" in status and record.get("startTimestamp"):
+			hours, remainder = divmod(max(0, int(time.time() - record["startTimestamp"])), 3600)
+			minutes, seconds = divmod(remainder, 60)
+			status = "{0} ({1:d}:{2:02d}:{3:02d})".format(status,hours,minutes,seconds)
+		elif previous is not None and re.match(re.escape(status) + r" \(\d+/\d+ tasks finished\)$", previous[2]):
+			status = previous[2]
+		eta = previous[5] if previous is not None and len(previous) > 5 else "unknown"
+		return [record["user"], record["jobID"], status, record["cpus"]+record["gpus"], record["priority"], eta]
+
+	## loadAggregatorConfFile Method
+	# loads the aggregator configuration json
+	def loadAggregatorConfFile(self):
+		filePath = os.path.join(self.aggregatorScriptDirectory,"aggregatorConf.json")
+		self.aggregatorConf = parseJSONFile(filePath)
+		return self.aggregatorConf
+
+	## loggingSetup Method
+	# configure and start logging
+	def loggingSetup(self):
+		logDirectory = os.path.join(self.aggregatorScriptDirectory,"logs")
+		if not os.path.isdir(logDirectory):
+			os.mkdir(logDirectory)
+		logFile = os.path.join(logDirectory,self.aggregatorConf["localhost"]["logFileName"])
+		maxLogSize = self.aggregatorConf["localhost"]["maxLogSize"] # maximum size of log file in Mb
+
+		if os.path.isfile(logFile) and os.path.getsize(logFile) > maxLogSize*1048576: # delete log file if larger than max - only occurs during restart
+			os.remove(logFile)
+
+		for handler in logging.root.handlers[:]:
+			logging.root.removeHandler(handler)
+
+		logging.basicConfig(filename=logFile, level=logging.DEBUG, format='%(asctime)s - %(levelname)s: %(message)s', datefmt='%m/%d/%Y %I:%M:%S %p')
+
+	## connectToNameServer Method
+	# registers the aggregator with the name server and keeps re-registering in a thread
+	def connectToNameServer(self, aggregator_uri):
+		def nsReregister(aggregator_uri):
+			while 1:
+				nsHost = self.aggregatorConf["nameServer"]["nameServerIP"]
+				nsPort = self.aggregatorConf["nameServer"]["nameServerPort"]
+				reconnectTime = self.aggregatorConf["nameServer"]["reconnectToNameServer_minutes"]
+
+				try:
+					ns = Pyro4.locateNS(host=nsHost,port=nsPort)
+					ns.register(self.aggregatorConf["nameServer"]["aggregatorName"], aggregator_uri)
+					logging.info("shook hands with naming server at {0}:{1}".format(nsHost,nsPort))
+				except:
+					logging.error("cannot connect to name server ({0}:{1}), attempting to reconnect in {2} minutes".format(nsHost,nsPort,reconnectTime))
+
+				time.sleep(reconnectTime*60)
+
+		self.nsThread = threading.Thread(target=nsReregister, args=(aggregator_uri,))
+		self.nsThread.setDaemon(False)
+		self.nsThread.start()
+
+def main():
+	cluster_aggregator = clusterAggregator()
+
+	# initialize Pyro4
+	try: # use network ip addr. if connected to network
+		myIP = [(s.connect(('8.8.8.8', 80)), s.getsockname()[0], s.close()) for s in [socket.socket(socket.AF_INET, socket.SOCK_DGRAM)]][0][1]
+		daemon = Pyro4.Daemon(host=myIP, port=cluster_aggregator.aggregatorConf["usePortNumber"])
+		logging.info("starting aggregator on {0}:{1}".format(myIP,cluster_aggregator.aggregatorConf["usePortNumber"]))
+	except: # otherwise send error
+		logging.error("unable to connect to network, exiting script")
+		sys.exit(1)
+
+	aggregator_uri = daemon.register(cluster_aggregator,objectId=cluster_aggregator.aggregatorConf["nameServer"]["aggregatorName"])
+	cluster_aggregator.startRefresh(aggregator_uri)
+	cluster_aggregator.connectToNameServer(aggregator_uri)
+
+	logging.info("aggregator started successfully: uri = {0}".format(aggregator_uri))
+
+	daemon.requestLoop()
+
+if __name__=="__main__":
+	main()
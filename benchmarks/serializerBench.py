@@ -0,0 +1,77 @@
+#!/usr/bin/python
+from __future__ import print_function
+import os
+import sys
+import time
+import random
+import argparse
+
+import Pyro4.util
+import Pyro4.errors
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "daemon"))
+from utils.wireFormat import configureWire
+
+## @package serializerBench
+## @brief
+# Measures encode time, decode time and wire size of the Pyro serializers, with and without
+# zlib compression, for payloads shaped like a getComputerInfo reply (host info, job list,
+# 30 history rows and the core map) with 10, 1k and 100k jobs. The serializers are the ones
+# Pyro uses on the wire and compression goes through configureWire, so the numbers match what
+# the daemon and client see per call.
+#
+# usage: python serializerBench.py [-jobs 10 1000 100000] [-repeat #] [-threshold bytes] [-level #]
+
+serializers = ["serpent", "marshal", "json", "msgpack"]
+
+## computerInfo Function
+# returns a getComputerInfo shaped payload with the given number of active jobs
+def computerInfo(jobs):
+	random.seed(jobs)
+	statuses = ["queue", "running (1:02:03)", "waiting", "queue (license wait)", "suspended (3:12:45)"]
+	jobList = []
+	for i in range(jobs):
+		jobList.append([u"user{0}".format(i % 25), u"{0}:model_{1}_load{2}".format(1000 + i//4, i % 7, i % 4), random.choice(statuses),
+			random.choice([1, 4, 8, 16]), random.randint(0, 2), random.choice([u"unknown", u"1:20 left", u"~3:45 run"])])
+	history = [[u"user{0}".format(i % 25), u"{0}".format(900 + i), u"model_{0}".format(i), u"complete", u"October 18 - 09:{0:02d}".format(i)] for i in range(30)]
+	return [u"hpc-node-01", 64, 2, 512, u"10.2.129.21", jobList, jobs//2, jobs - jobs//2, history]
+
+## timeSerializer Function
+# returns (encode ms, decode ms, wire bytes) of a payload, best of repeat runs
+def timeSerializer(serializer, payload, compress, repeat):
+	encodeTimes = []
+	decodeTimes = []
+	for i in range(repeat):
+		start = time.time()
+		data, compressed = serializer.serializeData(payload, compress)
+		encodeTimes.append(time.time() - start)
+		start = time.time()
+		serializer.deserializeData(data, compressed)
+		decodeTimes.append(time.time() - start)
+	return min(encodeTimes)*1000.0, min(decodeTimes)*1000.0, len(data)
+
+def main():
+	parser = argparse.ArgumentParser(description="Pyro serializer and compression benchmark")
+	parser.add_argument("-jobs", type=int, nargs="+", default=[10, 1000, 100000], help="job list sizes (default 10 1000 100000)")
+	parser.add_argument("-repeat", type=int, default=5, help="runs per measurement, the best is shown (default 5)")
+	parser.add_argument("-threshold", type=int, default=8192, help="compression threshold in bytes (default 8192)")
+	parser.add_argument("-level", type=int, default=1, help="zlib compression level (default 1)")
+	args = parser.parse_args()
+	configureWire(None, True, args.threshold, args.level)
+
+	print("{0:>8}  {1:<8}  {2:<5}  {3:>12}  {4:>12}  {5:>12}".format("jobs", "format", "zlib", "encode ms", "decode ms", "wire bytes"))
+	for jobs in args.jobs:
+		payload = computerInfo(jobs)
+		for name in serializers:
+			try:
+				serializer = Pyro4.util.get_serializer(name)
+			except Pyro4.errors.SerializeError:
+				print("{0:>8}  {1:<8}  not installed".format(jobs, name))
+				continue
+			for compress in [False, True]:
+				encodeTime, decodeTime, size = timeSerializer(serializer, payload, compress, args.repeat)
+				print("{0:>8}  {1:<8}  {2:<5}  {3:>12.3f}  {4:>12.3f}  {5:>12}".format(jobs, name, "yes" if compress else "no", encodeTime, decodeTime, size))
+		sys.stdout.flush()
+
+if __name__=="__main__":
+	main()
@@ -0,0 +1,125 @@
+#!/usr/bin/python
+from __future__ import print_function
+import os
+import sys
+import re
+import json
+import time
+import base64
+import shutil
+import tempfile
+import argparse
+import threading
+
+import Pyro4
+
+## @package submitLatency
+## @brief
+# Measures the client side latency of a job submission over Pyro.
+#
+# A daemon is started in this process from a copy of the daemon directory (so the real job
+# state and history are left alone) and registered on a loopback Pyro daemon; the scheduler
+# is not started, so queued jobs never run. Each submission is timed both ways:
+#   multi-call - loadServerConfFile, jobInitialization, writing the files into the job directory
+#                (a stand-in for pscp without its ssh handshakes) and jobDefinition
+#   submit     - a single submit(spec, files) call with the files inline
+# The name server lookup is left out of both.
+#
+# usage: python submitLatency.py [-n submissions] [-size input file Kb]
+
+daemonDirectory = os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "daemon")
+
+## startDaemon Function
+# starts a daemon from a copy of the daemon directory; returns its URI and the run directory
+def startDaemon(workDirectory):
+	copyDirectory = os.path.join(workDirectory, "daemon")
+	runDirectory = os.path.join(workDirectory, "run")
+	shutil.copytree(daemonDirectory, copyDirectory, ignore=shutil.ignore_patterns("*.pyc", "__pycache__", "*.serpent", "*.journal", "*.sqlite*", "*.log"))
+	os.mkdir(runDirectory)
+
+	confPath = os.path.join(copyDirectory, "serverConf.json")
+	with open(confPath, "r") as confFile:
+		conf = confFile.read()
+	conf = re.sub(r'"runDirectory"\s*:\s*"[^"]*"', '"runDirectory" : {0}'.format(json.dumps(runDirectory)), conf)
+	with open(confPath, "w") as confFile:
+		confFile.write(conf)
+
+	sys.path.insert(0, copyDirectory)
+	import WAM_daemon
+	serverDaemon = WAM_daemon.serverDaemon()
+	serverDaemon.initSerializedJobList()
+
+	pyroDaemon = Pyro4.Daemon(host="127.0.0.1")
+	uri = pyroDaemon.register(serverDaemon)
+	thread = threading.Thread(target=pyroDaemon.requestLoop)
+	thread.setDaemon(True)
+	thread.start()
+	return uri, runDirectory
+
+## jobSpec Function
+# returns the job specification a client sends for the given input files
+def jobSpec(jobFiles):
+	return {"jobFiles":jobFiles, "solverFlags":{"cpus":1, "gpus":0, "interactive":None},
+		"advanced":{"sendEmailTo":"None", "wallTime":None, "memory":None},
+		"jobData":{"priority":1, "clientName":"benchmark", "dependencies":[], "arrayTable":None, "jobID":None},
+		"InternalUse":{"jsonFileType":"abaqus", "jsonFileVersion":0.5, "clientVersion":0.5, "solver":"default"}}
+
+## multiCallSubmission Function
+# submits a job the way clients did before the submit call
+def multiCallSubmission(server, runDirectory, name, content):
+	server.loadServerConfFile()
+	[jobID, jobDirectory] = server.jobInitialization(runDirectory)
+	with open(os.path.join(jobDirectory, name), "wb") as jobFile:
+		jobFile.write(content)
+	spec = jobSpec([name])
+	spec["jobData"]["jobID"] = jobID
+	with open(os.path.join(jobDirectory, "abaqusSubmit.json"), "w") as jsonFile:
+		json.dump(spec, jsonFile)
+	server.jobDefinition(jobDirectory)
+
+## singleCallSubmission Function
+# submits a job with one submit call
+def singleCallSubmission(server, runDirectory, name, content):
+	server.submit(jobSpec([name]), [{"name":name, "content":base64.b64encode(content).decode("ascii")}])
+
+## timeSubmissions Function
+# returns the latency of each submission in milliseconds
+def timeSubmissions(submission, server, runDirectory, count, content):
+	latencies = []
+	for i in range(count):
+		start = time.time()
+		submission(server, runDirectory, "bench{0}.inp".format(i), content)
+		latencies.append((time.time() - start)*1000.0)
+	return latencies
+
+## summary Function
+# returns mean, median and 95th percentile of a list of latencies
+def summary(latencies):
+	ordered = sorted(latencies)
+	return "mean {0:7.2f} ms   median {1:7.2f} ms   p95 {2:7.2f} ms".format(sum(ordered)/len(ordered), ordered[len(ordered)//2], ordered[int(len(ordered)*0.95)-1])
+
+def main():
+	parser = argparse.ArgumentParser(description="Job submission latency benchmark")
+	parser.add_argument("-n", type=int, default=50, help="submissions per method (default 50)")
+	parser.add_argument("-size", type=int, default=100, help="input file size in Kb (default 100)")
+	args = parser.parse_args()
+
+	workDirectory = tempfile.mkdtemp(prefix="wamBench")
+	try:
+		uri, runDirectory = startDaemon(workDirectory)
+		server = Pyro4.Proxy(uri)
+		content = (b"*Node\n" + b"1, 0.0, 0.0, 0.0\n"*(args.size*64))[:args.size*1024]
+
+		timeSubmissions(singleCallSubmission, server, runDirectory, 3, content) # warm up
+		multiCall = timeSubmissions(multiCallSubmission, server, runDirectory, args.n, content)
+		singleCall = timeSubmissions(singleCallSubmission, server, runDirectory, args.n, content)
+
+		print("{0} submissions of a {1} Kb input file".format(args.n, args.size))
+		print("multi-call: {0}".format(summary(multiCall)))
+		print("submit:     {0}".format(summary(singleCall)))
+		server._pyroRelease()
+	finally:
+		shutil.rmtree(workDirectory, ignore_errors=True)
+
+if __name__=="__main__":
+	main()
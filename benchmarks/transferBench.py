@@ -0,0 +1,139 @@
+#!/usr/bin/python
+from __future__ import print_function
+import os
+import imp
+import time
+import shutil
+import tempfile
+import argparse
+import threading
+import multiprocessing
+
+import Pyro4
+
+from submitLatency import startDaemon
+
+## @package transferBench
+## @brief
+# Measures download throughput and resume behaviour of the daemon's file transfers on loopback.
+#
+# A daemon is started in a child process (so it does not share the interpreter lock with the
+# client) from a copy of the daemon directory, and a results file of the given size is put in
+# a job directory. The file is then downloaded:
+#   sequential - one stream of chunked reads (downloadFile)
+#   parallel   - ranged reads over 1, 2, 4 ... streams (downloadRanges)
+#   resume     - a ranged download broken off after about half the file, then run again;
+#                shows how much was transferred again and that the checksum still matches
+#
+# -latency adds a simulated round trip to every read, as on a link between offices; parallel
+# streams mostly hide that latency and the serialization cost, so their gain depends on the
+# number of cores of both machines.
+#
+# usage: python transferBench.py [-size Mb] [-streams 1 2 4 8] [-range Mb] [-latency ms] [-serializer name]
+
+clientTransfer = imp.load_source("clientFileTransfer", os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "client", "utils", "fileTransfer.py"))
+
+## serveDaemon Function
+# child process: starts the daemon and sends its URI and run directory back
+def serveDaemon(workDirectory, replies):
+	uri, runDirectory = startDaemon(workDirectory)
+	replies.put((str(uri), runDirectory))
+	while True:
+		time.sleep(60)
+
+## makeResults Function
+# writes a results file of size Mb into a new job directory; returns the job number and file name
+def makeResults(runDirectory, size):
+	jobNumber = "1"
+	name = "result.odb"
+	os.mkdir(os.path.join(runDirectory, jobNumber))
+	block = os.urandom(1048576)
+	with open(os.path.join(runDirectory, jobNumber, name), "wb") as results:
+		for i in range(size):
+			results.write(block[i % 997:] + block[:i % 997]) # distinct blocks, cheap to make
+	return jobNumber, name
+
+## benchProxy Class
+# daemon proxy adding a simulated network round trip to each read; fails once the shared
+# read budget (for the resume test) is used up
+class benchProxy(object):
+	def __init__(self, uri, serializer, latency, budget=None):
+		self.proxy = Pyro4.Proxy(uri)
+		self.proxy._pyroSerializer = serializer
+		self.latency = latency		# seconds added to each read
+		self.budget = budget		# [reads left, lock] shared by the streams of a download, None = unlimited
+
+	def readJobFile(self, *args):
+		if self.budget is not None:
+			with self.budget[1]:
+				self.budget[0] = self.budget[0] - 1
+				if self.budget[0] < 0:
+					raise IOError("connection lost (simulated)")
+		time.sleep(self.latency)
+		return self.proxy.readJobFile(*args)
+
+	def __getattr__(self, attribute):
+		return getattr(self.proxy, attribute)
+
+## throughput Function
+# returns "x Mb/s" for bytes moved in seconds
+def throughput(received, seconds):
+	return "{0:8.1f} Mb/s".format(received/1048576.0/max(seconds, 1e-6))
+
+def main():
+	parser = argparse.ArgumentParser(description="File transfer throughput and resume benchmark")
+	parser.add_argument("-size", type=int, default=512, help="results file size in Mb (default 512)")
+	parser.add_argument("-streams", type=int, nargs="+", default=[1, 2, 4, 8], help="parallel streams to try (default 1 2 4 8)")
+	parser.add_argument("-range", type=int, default=16, help="range size in Mb (default 16)")
+	parser.add_argument("-latency", type=float, default=0, help="simulated round trip per read in ms (default 0)")
+	parser.add_argument("-serializer", type=str, default="serpent", help="Pyro serializer of the client (default serpent)")
+	args = parser.parse_args()
+	rangeSize = args.range*1048576
+	latency = args.latency/1000.0
+
+	workDirectory = tempfile.mkdtemp(prefix="wamBench")
+	replies = multiprocessing.Queue()
+	daemonProcess = multiprocessing.Process(target=serveDaemon, args=(workDirectory, replies))
+	daemonProcess.daemon = True
+	daemonProcess.start()
+	try:
+		uri, runDirectory = replies.get(timeout=60)
+		jobNumber, name = makeResults(runDirectory, args.size)
+		server = benchProxy(uri, args.serializer, latency)
+		[[name, size, mtime]] = server.listJobFiles(jobNumber, [name])
+		destination = os.path.join(workDirectory, "client")
+		os.mkdir(destination)
+		connect = lambda: benchProxy(uri, args.serializer, latency)
+		server.checksumJobFile(jobNumber, name) # the daemon caches the checksum of the first download
+
+		print("{0} Mb results file, {1} Mb ranges, {2} ms round trip, {3}".format(args.size, args.range, args.latency, args.serializer))
+		start = time.time()
+		received = clientTransfer.downloadFile(server, jobNumber, name, destination, 1048576)
+		print("sequential:          {0}".format(throughput(received, time.time() - start)))
+		for streams in args.streams:
+			os.remove(os.path.join(destination, name))
+			start = time.time()
+			received = clientTransfer.downloadRanges(connect, jobNumber, name, size, mtime, destination, rangeSize, streams)
+			print("parallel, {0:2d} streams: {1}".format(streams, throughput(received, time.time() - start)))
+
+		# resume: break the download off after about half of the chunks, then run it again
+		streams = max(args.streams)
+		os.remove(os.path.join(destination, name))
+		try:
+			budget = [args.size//2, threading.Lock()] # about half of the 1 Mb reads
+			clientTransfer.downloadRanges(lambda: benchProxy(uri, args.serializer, latency, budget), jobNumber, name, size, mtime, destination, rangeSize, streams)
+		except clientTransfer.transferError as e:
+			manifest = clientTransfer.loadManifest(os.path.join(destination, name + ".part.json"))
+			print("interrupted:         {0}; {1:.0f}% of the file kept".format(e, 100.0*sum(manifest["written"].values())/size))
+		start = time.time()
+		received = clientTransfer.downloadRanges(connect, jobNumber, name, size, mtime, destination, rangeSize, streams)
+		print("resumed:             {0}; {1:.0f}% of the file transferred again".format(throughput(received, time.time() - start), 100.0*received/size))
+		same = clientTransfer.fileChecksum(os.path.join(destination, name)) == server.checksumJobFile(jobNumber, name)["sha256"]
+		print("checksum:            {0}".format("match" if same else "MISMATCH"))
+		server._pyroRelease()
+	finally:
+		daemonProcess.terminate()
+		shutil.rmtree(workDirectory, ignore_errors=True)
+
+if __name__=="__main__":
+	main()
@@ -0,0 +1,224 @@
+from __future__ import print_function
+import os
+import json
+import time
+import zlib
+import base64
+import hashlib
+import threading
+try:
+	import queue
+except ImportError: # python 2
+	import Queue as queue
+
+## @package fileTransfer
+## @brief
+# Client side of the chunked file transfers of the daemon (replaces pscp).
+#
+# Files are read from and written to the job directories over the Pyro proxy of the daemon
+# in chunks of at most chunkSize bytes, base64 encoded so every serializer can carry them.
+# Text files may be zlib compressed on the way. Downloads are written to name.part and only
+# renamed once complete, keeping the modification time of the daemon's copy.
+#
+# Large files (results) are downloaded by downloadRanges: the file is split into ranges read
+# in parallel, each stream over its own connection. The bytes written of each range are
+# recorded in a resume manifest (name.part.json), so an interrupted download continues where
+# each range stopped as long as the daemon's file did not change. The whole file is checked
+# against the daemon's SHA-256 before it is renamed.
+
+class transferError(Exception):
+	pass
+
+## downloadFile Function
+# copies a file of a job directory into the destination directory; returns the number of bytes received
+def downloadFile(server, jobNumber, name, destination, chunkSize, compress=False):
+	path = os.path.join(destination, name)
+	partPath = path + ".part"
+	offset = 0
+	received = 0
+	with open(partPath, "wb") as partFile:
+		while True:
+			chunk = server.readJobFile(jobNumber, name, offset, chunkSize, compress)
+			if not isinstance(chunk, dict):
+				raise transferError(chunk)
+			data = base64.b64decode(chunk["data"])
+			received = received + len(data)
+			if chunk["compressed"]:
+				data = zlib.decompress(data)
+			partFile.write(data)
+			offset = offset + len(data)
+			if not data or offset >= chunk["size"]:
+				break
+	if offset != chunk["size"]:
+		raise transferError("{0} changed during the transfer".format(name))
+	if os.path.exists(path):
+		os.remove(path) # rename does not replace files on Windows
+	os.rename(partPath, path)
+	os.utime(path, (chunk["mtime"], chunk["mtime"]))
+	return received
+
+## uploadFile Function
+# sends a file to the daemon in chunks; returns the upload ID to pass to submit
+def uploadFile(server, path, chunkSize, compressExtensions=(), compressionLevel=1):
+	name = os.path.basename(path)
+	compress = os.path.splitext(name)[1].lower() in [ext.lower() for ext in compressExtensions]
+	uploadID = server.openUpload(name)
+	if not isinstance(uploadID, int):
+		raise transferError(uploadID)
+	offset = 0
+	with open(path, "rb") as localFile:
+		while True:
+			data = localFile.read(chunkSize)
+			if not data:
+				break
+			sent, compressed = data, False
+			if compress:
+				packed = zlib.compress(data, compressionLevel)
+				if len(packed) < len(data):
+					sent, compressed = packed, True
+			error = server.writeUpload(uploadID, offset, base64.b64encode(sent).decode("ascii"), compressed)
+			if error:
+				raise transferError(error)
+			offset = offset + len(data)
+	error = server.closeUpload(uploadID, offset)
+	if error:
+		raise transferError(error)
+	return uploadID
+
+## downloadRanges Function
+# copies a large file of a job directory into the destination directory with parallel ranged reads
+# connect() returns a new proxy of the daemon for each stream; size and mtime are those listed by the daemon
+# returns the number of bytes received; raises transferError, leaving the manifest to resume from
+def downloadRanges(connect, jobNumber, name, size, mtime, destination, rangeSize, streams):
+	path = os.path.join(destination, name)
+	partPath = path + ".part"
+	manifestPath = partPath + ".json"
+	manifest = {"jobNumber":str(jobNumber), "name":name, "size":size, "mtime":mtime, "rangeSize":rangeSize, "written":{}}
+	resumed = loadManifest(manifestPath)
+	if resumed is not None and os.path.isfile(partPath) and os.path.getsize(partPath) == size and \
+		all(resumed.get(key) == manifest[key] for key in ["jobNumber", "name", "size", "mtime", "rangeSize"]):
+		manifest = resumed
+	else:
+		with open(partPath, "wb") as partFile:
+			partFile.truncate(size)
+		saveManifest(manifestPath, manifest)
+
+	written = dict((int(index), count) for index, count in manifest["written"].items()) # range index: bytes written from its start
+	ranges = queue.Queue()
+	for index in range((size + rangeSize - 1)//rangeSize):
+		if written.get(index, 0) < min(size, (index + 1)*rangeSize) - index*rangeSize:
+			ranges.put(index)
+	state = {"received":0, "saved":time.time(), "errors":[]}
+	lock = threading.Lock()
+	stop = threading.Event()
+
+	def stream():
+		server = None
+		try:
+			server = connect()
+			with open(partPath, "r+b") as partFile:
+				while not stop.is_set():
+					try:
+						index = ranges.get_nowait()
+					except queue.Empty:
+						return
+					end = min(size, (index + 1)*rangeSize)
+					offset = index*rangeSize + written.get(index, 0)
+					while offset < end and not stop.is_set():
+						chunk = server.readJobFile(jobNumber, name, offset, end - offset)
+						if not isinstance(chunk, dict):
+							raise transferError(chunk)
+						if chunk["size"] != size or chunk["mtime"] != mtime:
+							raise transferError("{0} changed during the transfer".format(name))
+						data = base64.b64decode(chunk["data"])
+						if not data:
+							raise transferError("{0} is shorter than listed".format(name))
+						partFile.seek(offset)
+						partFile.write(data)
+						partFile.flush() # on disk before the manifest counts it
+						offset = offset + len(data)
+						with lock:
+							state["received"] = state["received"] + len(data)
+							written[index] = offset - index*rangeSize
+							if time.time() - state["saved"] > 1.0:
+								manifest["written"] = dict((str(i), count) for i, count in written.items())
+								saveManifest(manifestPath, manifest)
+								state["saved"] = time.time()
+		except Exception as e:
+			with lock:
+				state["errors"].append(e)
+			stop.set()
+		finally:
+			if server is not None:
+				server._pyroRelease()
+
+	threads = [threading.Thread(target=stream) for i in range(max(1, min(streams, ranges.qsize())))]
+	for thread in threads:
+		thread.setDaemon(True)
+		thread.start()
+	try:
+		for thread in threads:
+			while thread.is_alive():
+				thread.join(0.5) # a timeout keeps <Ctrl-C> working
+	finally:
+		stop.set()
+		for thread in threads:
+			thread.join()
+		with lock:
+			manifest["written"] = dict((str(i), count) for i, count in written.items())
+			saveManifest(manifestPath, manifest)
+	if state["errors"]:
+		raise transferError("{0} (run again to resume)".format(state["errors"][0]))
+
+	# verify the whole file before using it
+	server = connect()
+	try:
+		expected = server.checksumJobFile(jobNumber, name)
+	finally:
+		server._pyroRelease()
+	if not isinstance(expected, dict):
+		raise transferError(expected)
+	if expected["size"] != size or expected["mtime"] != mtime:
+		raise transferError("{0} changed during the transfer (run again to resume)".format(name))
+	if fileChecksum(partPath) != expected["sha256"]:
+		os.remove(partPath)
+		os.remove(manifestPath)
+		raise transferError("checksum of {0} does not match, removed the download".format(name))
+
+	if os.path.exists(path):
+		os.remove(path) # rename does not replace files on Windows
+	os.rename(partPath, path)
+	os.remove(manifestPath)
+	os.utime(path, (mtime, mtime))
+	return state["received"]
+
+## fileChecksum Function
+# returns the SHA-256 hex digest of a local file
+def fileChecksum(path):
+	digest = hashlib.sha256()
+	with open(path, "rb") as localFile:
+		for block in iter(lambda: localFile.read(1048576), b""):
+			digest.update(block)
+	return digest.hexdigest()
+
+## loadManifest Function
+# returns the resume manifest of a download or None
+def loadManifest(manifestPath):
+	try:
+		with open(manifestPath, "r") as manifestFile:
+			manifest = json.load(manifestFile)
+		if isinstance(manifest, dict) and isinstance(manifest.get("written"), dict):
+			return manifest
+	except (IOError, OSError, ValueError):
+		pass
+	return None
+
+## saveManifest Function
+# writes the resume manifest of a download
+def saveManifest(manifestPath, manifest):
+	tmpPath = manifestPath + ".tmp"
+	with open(tmpPath, "w") as manifestFile:
+		json.dump(manifest, manifestFile)
+	if os.path.exists(manifestPath):
+		os.remove(manifestPath) # rename does not replace files on Windows
+	os.rename(tmpPath, manifestPath)
@@ -0,0 +1,45 @@
+from __future__ import print_function
+import threading
+try:
+	import queue
+except ImportError: # python 2
+	import Queue as queue
+
+import Pyro4
+
+## @package jobEvents
+## @brief
+# Receives job events pushed by a daemon (see serverDaemon.subscribe).
+#
+# The listener runs its own Pyro daemon in a background thread on the network interface
+# facing the name server; the server daemon calls jobEvent (oneway, so it never waits on
+# the client) and the events are handed to the main thread through a queue.
+
+class jobEventListener(object):
+	def __init__(self, nsIP):
+		self.events = queue.Queue()
+		self.pyroDaemon = Pyro4.Daemon(host=Pyro4.socketutil.getInterfaceAddress(nsIP))
+		self.uri = self.pyroDaemon.register(self)
+		self.thread = threading.Thread(target=self.pyroDaemon.requestLoop, name="WAM-events")
+		self.thread.setDaemon(True)
+		self.thread.start()
+
+	## jobEvent Method
+	# called by the server daemon for each job event
+	@Pyro4.expose
+	@Pyro4.oneway
+	def jobEvent(self, event):
+		self.events.put(event)
+
+	## next Method
+	# returns the next event, or None if none arrives within timeout seconds
+	def next(self, timeout=None):
+		try:
+			return self.events.get(timeout=timeout)
+		except queue.Empty:
+			return None
+
+	## close Method
+	# stops the Pyro daemon of the listener
+	def close(self):
+		self.pyroDaemon.shutdown()
@@ -0,0 +1,156 @@
+from __future__ import print_function
+import os
+import json
+import time
+import threading
+
+import Pyro4
+from Pyro4.errors import CommunicationError
+
+## @package proxyManager
+## @brief
+# Reuses one Pyro proxy per daemon for a whole wam invocation.
+#
+# Daemon URIs are looked up once on the name server and kept in an on-disk cache shared by
+# later invocations. A cached URI is used until it is older than the TTL or until connecting
+# to it fails (e.g. the daemon restarted on another port); then it is looked up again.
+# Only the connect is retried after a fresh lookup, never a call that may already have run
+# on the daemon.
+
+class managedProxy(object):
+	def __init__(self, manager, name, uri):
+		self._manager = manager
+		self._name = name
+		self._proxy = Pyro4.Proxy(uri)
+		self._proxy._pyroSerializer = manager.serializer
+		self._bound = False
+		self._lock = threading.Lock()
+		self._callLock = threading.Lock()
+
+	def __getattr__(self, attribute):
+		if attribute.startswith("_pyro"): # proxy settings such as _pyroTimeout
+			return getattr(self._proxy, attribute)
+		self._connect()
+		return getattr(self._proxy, attribute)
+
+	def __setattr__(self, attribute, value):
+		if attribute.startswith("_pyro"):
+			setattr(self._proxy, attribute, value)
+		else:
+			object.__setattr__(self, attribute, value)
+
+	## _connect Method
+	# connects to the daemon; on failure looks the daemon up again and reconnects once
+	def _connect(self):
+		with self._lock:
+			if self._bound:
+				return
+			try:
+				self._proxy._pyroBind()
+			except CommunicationError:
+				timeout = self._proxy._pyroTimeout
+				self._proxy._pyroRelease()
+				self._proxy = Pyro4.Proxy(self._manager.lookup(self._name, refresh=True))
+				self._proxy._pyroTimeout = timeout
+				self._proxy._pyroSerializer = self._manager.serializer
+				self._proxy._pyroBind()
+			self._bound = True
+
+	## _callWithTimeout Method
+	# calls a daemon method with its own timeout (e.g. a short fan-out query); the proxy keeps its own timeout for later calls
+	def _callWithTimeout(self, timeout, method, *args, **kwargs):
+		with self._callLock:
+			previous = self._proxy._pyroTimeout
+			self._proxy._pyroTimeout = timeout
+			try:
+				self._connect()
+				return getattr(self._proxy, method)(*args, **kwargs)
+			finally:
+				self._proxy._pyroTimeout = previous
+
+class proxyManager(object):
+	def __init__(self, nsIP, nsPort, cachePath, ttl, serializer=None):
+		self.nsIP = nsIP
+		self.nsPort = nsPort
+		self.cachePath = cachePath	# on-disk URI cache: {name: [uri, lookup time]}
+		self.ttl = ttl				# seconds a cached URI is used without looking it up again
+		self.serializer = serializer	# Pyro serializer of the daemon proxies (None = Pyro's default); the name server keeps the default
+		self.ns = None
+		self.proxies = {}			# name: managedProxy
+		self.lock = threading.Lock()
+		self.cache = self.__loadCache()
+
+	## nameServer Method
+	# returns the name server proxy, located once per invocation
+	def nameServer(self):
+		with self.lock:
+			if self.ns is None:
+				self.ns = Pyro4.locateNS(host=self.nsIP, port=self.nsPort)
+			return self.ns
+
+	## lookup Method
+	# returns the URI registered under a name, from the cache unless it expired or refresh is set
+	def lookup(self, name, refresh=False):
+		with self.lock:
+			entry = self.cache.get(name)
+		if entry is not None and not refresh and time.time() - entry[1] < self.ttl:
+			return entry[0]
+		uri = str(self.nameServer().lookup(name))
+		self.remember({name: uri})
+		return uri
+
+	## remember Method
+	# stores URIs found on the name server (e.g. by a listing) in the cache
+	def remember(self, uris):
+		with self.lock:
+			now = time.time()
+			for name, uri in uris.items():
+				self.cache[name] = [str(uri), now]
+			self.__saveCache()
+
+	## proxy Method
+	# returns the shared proxy of a name; uri skips the lookup when it is already known
+	def proxy(self, name, uri=None):
+		with self.lock:
+			managed = self.proxies.get(name)
+		if managed is None:
+			managed = managedProxy(self, name, uri or self.lookup(name))
+			with self.lock:
+				managed = self.proxies.setdefault(name, managed)
+		return managed
+
+	## streamProxy Method
+	# returns a new proxy of a name for calls made in parallel with the shared proxy (e.g. file transfer streams)
+	# the caller releases it with _pyroRelease
+	def streamProxy(self, name):
+		managed = self.proxy(name)
+		managed._connect()
+		proxy = Pyro4.Proxy(managed._pyroUri)
+		proxy._pyroSerializer = self.serializer
+		proxy._pyroTimeout = managed._pyroTimeout
+		return proxy
+
+	## __loadCache Private Method
+	# reads the URI cache; a missing or damaged cache is treated as empty
+	def __loadCache(self):
+		try:
+			with open(self.cachePath, "r") as cacheFile:
+				cache = json.load(cacheFile)
+			if isinstance(cache, dict):
+				return cache
+		except (IOError, OSError, ValueError):
+			pass
+		return {}
+
+	## __saveCache Private Method
+	# writes the URI cache; must be called while holding lock
+	def __saveCache(self):
+		tmpPath = "{0}.{1}.tmp".format(self.cachePath, os.getpid())
+		try:
+			with open(tmpPath, "w") as cacheFile:
+				json.dump(self.cache, cacheFile)
+			if os.name == "nt" and os.path.isfile(self.cachePath): # rename does not replace files on Windows
+				os.remove(self.cachePath)
+			os.rename(tmpPath, self.cachePath)
+		except (IOError, OSError):
+			pass # the cache only saves lookups
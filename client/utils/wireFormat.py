@@ -0,0 +1,65 @@
+from __future__ import print_function
+import zlib
+import logging
+
+import Pyro4
+import Pyro4.util
+import Pyro4.errors
+
+## @package wireFormat
+## @brief
+# Pyro serializer and compression settings shared by the WAM processes.
+#
+# Servers accept every configured serializer that is installed and answer each call in the
+# serializer it was made with, so clients pick their serializer per proxy (the name server
+# keeps Pyro's default). Pyro compresses every message above 200 bytes when compression is
+# on; configureWire replaces that with a configurable threshold and zlib level by hooking
+# Pyro's private compression method, and falls back to Pyro's own compression (with a
+# warning) on Pyro releases without it. Compressed messages are flagged on the wire, so peers
+# with other settings still read them.
+#
+# The daemon, client and aggregator each ship an identical copy of this module (they are
+# installed separately, like parseJSONFile); change all three together.
+
+defaultSerializers = ["serpent", "marshal", "json", "msgpack"]
+
+## availableSerializers Function
+# returns the serializers Pyro can use here (msgpack is only used if the package is installed)
+def availableSerializers():
+	available = []
+	for name in defaultSerializers:
+		try:
+			Pyro4.util.get_serializer(name)
+			available.append(name)
+		except Pyro4.errors.SerializeError:
+			pass
+	return available
+
+## chooseSerializer Function
+# returns the requested serializer if it is available, otherwise serpent
+def chooseSerializer(name):
+	if name in availableSerializers():
+		return name
+	return "serpent"
+
+## configureWire Function
+# sets the serializers a server accepts and the compression of the messages this process sends
+# returns the serializers that are accepted
+def configureWire(serializersAccepted=None, compression=False, threshold=200, level=6):
+	if serializersAccepted is not None:
+		accepted = [name for name in serializersAccepted if name in availableSerializers()] or ["serpent"]
+		Pyro4.config.SERIALIZERS_ACCEPTED = set(accepted)
+
+	Pyro4.config.COMPRESSION = bool(compression)
+	if compression and hasattr(Pyro4.util.SerializerBase, "_SerializerBase__compressdata"):
+		def compressData(serializer, data, compress):
+			if not compress or len(data) < threshold:
+				return data, False
+			compressed = zlib.compress(data, level)
+			if len(compressed) < len(data):
+				return compressed, True
+			return data, False
+		Pyro4.util.SerializerBase._SerializerBase__compressdata = compressData
+	elif compression:
+		logging.warning("Pyro4 {0} has no compression hook, using Pyro's own compression (threshold and level ignored)".format(Pyro4.__version__))
+	return sorted(Pyro4.config.SERIALIZERS_ACCEPTED)
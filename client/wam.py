@@ -6,20 +6,26 @@ from __future__ import print_function
 # Standard Libraries
 import sys
 import os
-import msvcrt
 import time
 import getpass
 import platform
-import subprocess
 import threading
 import argparse
 from argparse import RawTextHelpFormatter
 import string
 import re, fnmatch
 import json
-import winsound
-from subprocess import check_output
-from string import Template
+import base64
+try:
+	import queue
+except ImportError: # python 2
+	import Queue as queue
+try: # Windows only: <ESC> to stop watching and the HAM horn
+	import msvcrt
+	import winsound
+except ImportError:
+	msvcrt = None
+	winsound = None
 
 # 3rd Party Packages
 import Pyro4
@@ -27,17 +33,23 @@ from tabulate import tabulate
 
 # Local Source Packages
 from utils.parseJSONFile import parseJSONFile
+from utils.jobEvents import jobEventListener
+from utils.proxyManager import proxyManager
+from utils.wireFormat import configureWire, chooseSerializer
+from utils.fileTransfer import downloadFile, downloadRanges, uploadFile, fileChecksum
 
 # Development Version
 version = 0.5
 
+# result of a server that did not answer a query in time
+TIMEOUT = "TIMEOUT"
+
 class frontEndClient(object):
 	def __init__(self, userArgs):
 		# Define variables and load configuration file
 		self.opSystem = platform.system()
 		self.userName = getpass.getuser()
 		self.clientScriptDirectory = os.path.dirname(os.path.realpath(__file__)) # directory of this file
-		self.jsonFileName = None	# define default jsonFileName initialization
 		self.confFileLock = threading.Lock()
 		self.loadClientConfFile()
 		self.defaultEmail = self.clientConf["defaults"]["email"]
@@ -46,18 +58,31 @@ class frontEndClient(object):
 		self.runDirectory = None	# folder that job is created in
 		self.jobDirectory = None	# folder that job in run in
 
+		# serializer and compression of calls to the daemons
+		wire = self.clientConf["wire"]
+		configureWire(None, wire["compression"], wire["compressionThreshold_bytes"], wire["compressionLevel"])
+		serializer = chooseSerializer(wire["serializer"])
+		if serializer != wire["serializer"]:
+			print("*** ERROR: serializer {0} is not available, using {1}".format(wire["serializer"],serializer))
+		self.proxies = proxyManager(self.clientConf["nameServer"]["nsIP"], self.clientConf["nameServer"]["nsPort"],
+			os.path.join(os.path.expanduser("~"), self.clientConf["nameServer"]["uriCacheFile"]), self.clientConf["nameServer"]["uriCacheTTL_seconds"], serializer)
+
 		# Parser arguments and definitions
 		self.parser = argparse.ArgumentParser(prog="wam",description="Client end of the WAM ecosystem. Connects to other server daemons on the Pyro4 Network allowing a user to manage the queue and distribution of work to remote computational machines.\nhttps://github.com/blaykareyano/WAM\nBlake Arellano, 2020", formatter_class=RawTextHelpFormatter) # \TODO add in description and epilog
 
 		# Job submission arguments
-		self.parser.add_argument("-bat","--batch", help="Scan current directory for all valid Abaqus input files and submit all selected.\nAdditional Arguments: [-cpus [#]] [-gpus [#]] [-n [hostname]] [-p [#]] [-e]", action="store_true")
-		self.parser.add_argument("-a", "--all", help="Submit all files in directory. \nAdditional Arguments: [-cpus [#]] [-gpus [#]] [-n [hostname]] [-p [#]] [-e]", action="store_true")
-		self.parser.add_argument("-j", "--job", help="Submit specified job. \nAdditional Arguments: [-cpus [#]] [-gpus [#]] [-n [hostname]] [-p [#]] [-e]", type=str, nargs='?', metavar="jobName", action="store")
+		self.parser.add_argument("-bat","--batch", help="Scan current directory for all valid Abaqus input files and submit all selected.\nAdditional Arguments: [-cpus [#]] [-gpus [#]] [-n [hostname]] [-p [#]] [-e] [-wt [hours]] [-mem [Gb]] [-after [dependency]]", action="store_true")
+		self.parser.add_argument("-a", "--all", help="Submit all files in directory. \nAdditional Arguments: [-cpus [#]] [-gpus [#]] [-n [hostname]] [-p [#]] [-e] [-wt [hours]] [-mem [Gb]] [-after [dependency]]", action="store_true")
+		self.parser.add_argument("-j", "--job", help="Submit specified job. \nAdditional Arguments: [-cpus [#]] [-gpus [#]] [-n [hostname]] [-p [#]] [-e] [-wt [hours]] [-mem [Gb]] [-after [dependency]] [-array [parameterTable]]", type=str, nargs='?', metavar="jobName", action="store")
+		self.parser.add_argument("-array", help="Submit the job as a parametric job array. The job input file is a template with <name> placeholders and the parameter table is a csv file\nwith the placeholder names in its header row and one row per task. Tasks are created on the daemon.", type=str, nargs='?', metavar="parameterTable", action="store")
 		self.parser.add_argument("-cpus", help="Number of cores to be used in the analysis.", type=int, nargs='?', metavar="#", action="store")
 		self.parser.add_argument("-gpus", help="Number of gpus to be used in the analysis.", type=int, nargs='?', metavar="#", action="store")
 		self.parser.add_argument("-n","--host", help="Host name of the machine that will run the job (i.e. cougar, leopard, HPC-02).", type=str, nargs='?', metavar="hostname", action="store")
 		self.parser.add_argument("-p","--priority", help="Set the job priority. Default = 1, high priority = 0, low priority = 2.", type=int, nargs='?', metavar="#", default=1, action="store")
 		self.parser.add_argument("-e","--email", help="Email address for job completion email to be sent to using email from clientConf.json.", action="store_const", const=self.defaultEmail)
+		self.parser.add_argument("-wt","--wallTime", help="Expected run time of the job in hours. Used by daemons running the backfill scheduler.", type=float, nargs='?', metavar="hours", action="store")
+		self.parser.add_argument("-mem","--memory", help="Expected peak memory of the job in Gb. Daemons hold jobs in the queue until this much memory is free.", type=float, nargs='?', metavar="Gb", action="store")
+		self.parser.add_argument("-after", help="Hold the job until other jobs finish. Each dependency has the form [ok|any|fail:]job#[:jobName][@hostname].\nok = parent completed (default), any = parent finished, fail = parent failed. Separate multiple dependencies with a space.", type=str, nargs='+', metavar="dependency", action="store")
 
 		# Other job controls
 		self.parser.add_argument("-get", help="Retrieve job given job id once completed. Files are placed into current directory. \nAdditional Arguments: [-n [hostname]]", type=str, nargs='?', metavar="job# or job#:jobName", action="store")
@@ -67,8 +92,12 @@ class frontEndClient(object):
 		
 		# Info request arguments
 		self.parser.add_argument("-cstat","--computeStats", help="Check basic info (IP, cores, available memory, number of jobs in queue) of all machines on the network.", action="store_true")
-		self.parser.add_argument("-qstat","--queueStats", help="Check job queues on all machines connected to the name server. \nAdditional Arguments: [-n [hostname]]", action="store_true")
-		self.parser.add_argument("-hist","--history", help="Check job history on all machines connected to the name server. \nAdditional Optional Arguments: [-n [hostname]]", action="store_true")
+		self.parser.add_argument("-qstat","--queueStats", help="Check job queues on all machines connected to the name server. \nAdditional Optional Arguments: [-n [hostname]] [-user [username]] [-status [status]]", action="store_true")
+		self.parser.add_argument("-jstat","--jobStats", help="Check the status of a job given its job id. \nAdditional Arguments: [-n [hostname]]", type=str, nargs='?', metavar="job#:jobName", action="store")
+		self.parser.add_argument("-hist","--history", help="Check job history on all machines connected to the name server. \nAdditional Optional Arguments: [-n [hostname]] [-user [username]] [-status [status]] [-limit [#]]", action="store_true")
+		self.parser.add_argument("-user", help="Only show jobs of this user in the job queue or history.", type=str, nargs='?', metavar="username", action="store")
+		self.parser.add_argument("-status", help="Only show jobs whose status starts with this in the job queue or history (ex: running, complete, killed, \"JOB ERROR\").", type=str, nargs='?', metavar="status", action="store")
+		self.parser.add_argument("-limit", help="Number of jobs shown per machine in the job history. Default = 30.", type=int, nargs='?', metavar="#", default=30, action="store")
 		self.parser.add_argument("-tc","--tokenConvert", help="Displays cores to license tokens conversion table.",action="store_true")
 		self.parser.add_argument("-about", help="See WAM version, author, and license info.", action="store_true")
 		self.parser.add_argument("-ham", help="Try it and find out.... Sound on recommended.", action="store_true")
@@ -83,11 +112,11 @@ class frontEndClient(object):
 
 		# Execute provided arguments
 		if userArgs.batch:
-			self.submitBatch(userArgs.all,userArgs.host,userArgs.cpus,userArgs.gpus,userArgs.email,userArgs.priority)
+			self.submitBatch(userArgs.all,userArgs.host,userArgs.cpus,userArgs.gpus,userArgs.email,userArgs.priority,userArgs.wallTime,userArgs.memory,userArgs.after)
 			sys.exit(0)
 
 		if userArgs.job:
-			self.submitJob(userArgs.job,userArgs.host,userArgs.cpus,userArgs.gpus,userArgs.email,userArgs.priority)
+			self.submitJob(userArgs.job,userArgs.host,userArgs.cpus,userArgs.gpus,userArgs.email,userArgs.priority,userArgs.wallTime,userArgs.memory,userArgs.after,userArgs.array)
 			sys.exit(0)
 
 		if userArgs.get:
@@ -111,11 +140,15 @@ class frontEndClient(object):
 			sys.exit(0)
 
 		if userArgs.queueStats:
-			self.queryAllQueues()
+			self.queryAllQueues(userArgs.host,userArgs.user,userArgs.status)
+			sys.exit(0)
+
+		if userArgs.jobStats:
+			self.jobStatus(userArgs.jobStats,userArgs.host)
 			sys.exit(0)
 
 		if userArgs.history:
-			self.pullJobHistory(userArgs.host)
+			self.pullJobHistory(userArgs.host,userArgs.user,userArgs.status,userArgs.limit)
 			sys.exit(0)
 
 		if userArgs.tokenConvert:
@@ -206,104 +239,20 @@ To quit the procedure enter: exit
 		print("\n")
 		return selectedJobs
 
-	## scpJobFiles
-	#  sends job files to the server daemon which will run job
-	def scpJobFiles(self,files,host):
-		print("Transferring files to: {0}:{1}".format(host,self.jobDirectory))
-		userName = self.serverConfFile["localhost"]["userName"]
-		pw = self.serverConfFile["localhost"]["password"]
-		destination = host + ":" + self.jobDirectory
-		if self.opSystem == "Windows":
-			for file in files:
-				p = subprocess.Popen(["pscp","-scp", "-l", userName, "-pw", pw, "-p", file, destination])
-				p.wait()
-		# elif self.opSystem == "Linux":
-		# 	pass
-		else:
-			print("*** ERROR: Incompatible operating system, exiting")
-			sys.exit(1)
-
 	## submitBatch Method
 	#  takes input from parser and submits jobs on selected server
-	def submitBatch(self,selectAll,host,cpus,gpus,email,priority):
-		# get current working directory
-		currentDirectory = os.getcwd()
-
+	def submitBatch(self,selectAll,host,cpus,gpus,email,priority,wallTime=None,memory=None,after=None):
 		# Find all simulation files in current directory
 		inputFiles = self.findSimulationFiles(selectAll)
 
-		# open template job info JSON file
-		with open(os.path.join(self.clientScriptDirectory,r"utils",r"abaqusSubmit.json.tmpl"), "r") as tmp:
-			jsonTemplate = tmp.read()
-
 		# check user input
 		userInput = self.checkUserInput(host,cpus,gpus,email,priority)
-		host = userInput["host"]
-		
-		# connect to defined host
-		connectedServer = self.connectToServer(host)
-
-		# get configuration file from daemon
-		self.loadServerConfFile(host)
-
-		# create job ID with server
-		try:
-			self.runDirectory = self.serverConfFile["localhost"]["runDirectory"]
-			[jobID, self.jobDirectory] = connectedServer.jobInitialization(self.runDirectory)
-			print("Job ID: {0}".format(jobID))
-		except Exception as e:
-			print("*** ERROR: Unable to initialize job: {0}".format(e))
-			sys.exit(1)
-
-		# create a dictionary with job submission information
-		jobInfo = {}
-		jobInfo["emailAddress"] = userInput["email"]
-		jobInfo["nCPUs"] = userInput["cpus"]
-		jobInfo["nGPUs"] = userInput["gpus"]
-		jobInfo["jobFiles"] = json.dumps(inputFiles)
-		jobInfo["clientUserName"] = self.userName
-		jobInfo["priority"] = userInput["priority"]
-		jobInfo["version"] = version
-		jobInfo["jobID"] = jobID
-
-		# write dictionary to JSON template file
-		jsonOutFile = Template(jsonTemplate).substitute(jobInfo)
-
-		if self.jsonFileName is None:
-			self.jsonFileName = os.path.join(currentDirectory,"abaqusSubmit.json")
-
-		with open(self.jsonFileName, "w") as tmp:
-			tmp.write(jsonOutFile)
 
-		inputFiles.append(self.jsonFileName)
-
-		# validate input file info
-		jobData = parseJSONFile(self.jsonFileName)
-		assert "InternalUse" in jobData.keys(), "JSON file ({0}) is missing the InternalUse block.".format(jsonFile)
-		assert jobData["InternalUse"]["jsonFileType"] == "abaqus", "Invalid job type: {0}".format(jobData["InternalUse"]["jsonFileType"])
-
-		# send job files to server
-		self.scpJobFiles(inputFiles, host)
-
-		# submit job files
-		try:
-			verErr = connectedServer.jobDefinition(self.jobDirectory)
-			if verErr != None:
-				for e in verErr:
-					print(e)
-				print("*** ERROR: job not submitted, please update your WAM client before proceeding")
-			else:
-				print("{0} job(s) submitted to {1} for analysis".format(len(inputFiles)-1,host))
-		except Exception as e:
-			print("*** ERROR: Unable to submit job: {0}".format(e))
-			sys.exit(1)
+		self.sendJob(inputFiles,userInput,wallTime,memory,after)
 
 	## submitJob Method
 	#  does same as submit batch, but for only one defined job
-	def submitJob(self,jobName,host,cpus,gpus,email,priority):
-		# get current working directory
-		currentDirectory = os.getcwd()
-
+	def submitJob(self,jobName,host,cpus,gpus,email,priority,wallTime=None,memory=None,after=None,arrayTable=None):
 		# create list of files to send over
 		inputFiles = []
 		jobNameSplit = string.split(jobName,".")
@@ -313,71 +262,135 @@ To quit the procedure enter: exit
 			jobName = jobName + ".inp"
 			inputFiles.append(jobName)
 
-		# open template job info JSON file
-		with open(os.path.join(self.clientScriptDirectory,r"utils",r"abaqusSubmit.json.tmpl"), "r") as tmp:
-			jsonTemplate = tmp.read()
-
 		# check user input
 		userInput = self.checkUserInput(host,cpus,gpus,email,priority)
-		host = userInput["host"]
-		
-		# create a dictionary with job submission information
-		jobInfo = {}
-		jobInfo["emailAddress"] = userInput["email"]
-		jobInfo["nCPUs"] = userInput["cpus"]
-		jobInfo["nGPUs"] = userInput["gpus"]
-		jobInfo["jobFiles"] = json.dumps(inputFiles)
-		jobInfo["clientUserName"] = self.userName
-		jobInfo["priority"] = userInput["priority"]
-		jobInfo["version"] = version
-
-		# write dictionary to JSON template file
-		jsonOutFile = Template(jsonTemplate).substitute(jobInfo)
-
-		if self.jsonFileName is None:
-			self.jsonFileName = os.path.join(currentDirectory,"abaqusSubmit.json")
 
-		with open(self.jsonFileName, "w") as tmp:
-			tmp.write(jsonOutFile)
+		self.sendJob(inputFiles,userInput,wallTime,memory,after,arrayTable)
 
-		inputFiles.append(self.jsonFileName)
-
-		# validate input file info
-		jobData = parseJSONFile(self.jsonFileName)
-		assert "InternalUse" in jobData.keys(), "JSON file ({0}) is missing the InternalUse block.".format(jsonFile)
-		assert jobData["InternalUse"]["jsonFileType"] == "abaqus", "Invalid job type: {0}".format(jobData["InternalUse"]["jsonFileType"])
-
-		# connect to defined host
-		connectedServer = self.connectToServer(host)
-
-		# get configuration file from daemon
-		self.loadServerConfFile(host)
+	## sendJob Method
+	#  submits the input files and job specification to the server daemon in a single call
+	def sendJob(self,inputFiles,userInput,wallTime=None,memory=None,after=None,arrayTable=None):
+		host = userInput["host"]
 
-		# create job ID with server
+		# job specification (same layout as abaqusSubmit.json)
+		spec = {}
+		spec["jobFiles"] = [os.path.basename(inputFile) for inputFile in inputFiles]
+		spec["solverFlags"] = {"cpus":userInput["cpus"], "gpus":userInput["gpus"], "interactive":None}
+		spec["advanced"] = {"sendEmailTo":str(userInput["email"]), "wallTime":wallTime, "memory":memory}
+		spec["jobData"] = {"priority":userInput["priority"], "clientName":self.userName, "dependencies":self.parseDependencies(after),
+			"arrayTable":os.path.basename(arrayTable) if arrayTable else None, "jobID":None}
+		spec["InternalUse"] = {"jsonFileType":"abaqus", "jsonFileVersion":version, "clientVersion":version, "solver":"default"}
+
+		# input files are sent once: files the daemon has cached from earlier submissions are only referenced by checksum
+		print("Transferring files to: {0}".format(host))
+		includeFiles = self.findIncludeFiles(inputFiles)
+		if includeFiles:
+			print("Including: {0}".format(", ".join(os.path.basename(includeFile) for includeFile in includeFiles)))
+		localFiles = inputFiles + includeFiles + ([arrayTable] if arrayTable else [])
 		try:
-			self.runDirectory = self.serverConfFile["localhost"]["runDirectory"]
-			[jobID, self.jobDirectory] = connectedServer.jobInitialization(self.runDirectory)
-			print("Job ID: {0}".format(jobID))
-		except Exception as e:
-			print("*** ERROR: Unable to initialize job: {0}".format(e))
+			connectedServer = self.connectToServer(host)
+			files = self.inputFileEntries(connectedServer, localFiles, self.clientConf["inputCache"]["useInputCache"])
+			[jobID, verErr] = connectedServer.submit(spec, files)
+			if verErr != None and any("input file not cached" in e for e in verErr): # removed from the cache in the meantime
+				files = self.inputFileEntries(connectedServer, localFiles, False)
+				[jobID, verErr] = connectedServer.submit(spec, files)
+		except (IOError, OSError) as e:
+			print("*** ERROR: Unable to read input file: {0}".format(e))
 			sys.exit(1)
-
-		# send job files to server
-		self.scpJobFiles(inputFiles, host)
-
-		# submit job files
-		try:
-			verErr = connectedServer.jobDefinition(self.jobDirectory)
-			if verErr != None:
-				for e in verErr:
-					print(e)
-				print("*** ERROR: job not submitted, please update your WAM client before proceeding")
-			else:
-				print("{0} job(s) submitted to {1} for analysis".format(len(inputFiles)-1,host))
 		except Exception as e:
 			print("*** ERROR: Unable to submit job: {0}".format(e))
 			sys.exit(1)
 
+		if jobID != None:
+			print("Job ID: {0}".format(jobID))
+		if verErr != None:
+			for e in verErr:
+				print(e)
+			print("*** ERROR: job not submitted")
+		elif arrayTable:
+			print("job array submitted to {0} for analysis".format(host))
+		else:
+			print("{0} job(s) submitted to {1} for analysis".format(len(inputFiles),host))
+
+	## findIncludeFiles Method
+	#  returns the files included by the input files (*INCLUDE, INPUT=name) that are next to them, searching included files too
+	#  includes given with a path are left to the solver (e.g. files on a shared drive)
+	def findIncludeFiles(self,inputFiles):
+		rule = re.compile(br'^\*include\s*,.*?input\s*=\s*"?([^",\r\n]+)"?', re.IGNORECASE)
+		includeFiles = []
+		pending = list(inputFiles)
+		while pending:
+			inputFile = pending.pop()
+			with open(inputFile, "rb") as jobFile:
+				for line in jobFile:
+					match = rule.match(line) if line[:1] == b"*" else None
+					if match is None:
+						continue
+					name = match.group(1).strip().decode("utf-8", "replace")
+					includeFile = os.path.join(os.path.dirname(inputFile), name)
+					if os.path.basename(name) == name and os.path.isfile(includeFile) and includeFile not in includeFiles and includeFile not in inputFiles:
+						includeFiles.append(includeFile)
+						pending.append(includeFile)
+		return includeFiles
+
+	## inputFileEntries Method
+	#  returns the submit entries of the input files: a checksum for files in the daemon's input cache, otherwise the file
+	#  (inline if small, uploaded in chunks first if larger) with its checksum so the daemon caches it
+	def inputFileEntries(self,connectedServer,localFiles,useCache):
+		transfer = self.clientConf["fileTransfer"]
+		digests = {}
+		missing = []
+		if useCache:
+			digests = dict((localFile, fileChecksum(localFile)) for localFile in localFiles if os.path.getsize(localFile) >= self.clientConf["inputCache"]["minFileSize_bytes"])
+			try:
+				missing = connectedServer.missingInputs(sorted(set(digests.values())))
+			except Exception:
+				missing = list(digests.values()) # daemon without an input cache
+
+		files = []
+		sent = 0
+		for localFile in localFiles:
+			entry = {"name":os.path.basename(localFile)}
+			if localFile in digests:
+				entry["hash"] = digests[localFile]
+				if entry["hash"] not in missing:
+					files.append(entry)
+					continue
+			if os.path.getsize(localFile) > transfer["chunkSize_bytes"]:
+				entry["upload"] = uploadFile(connectedServer, localFile, transfer["chunkSize_bytes"], transfer["compressExtensions"], transfer["compressionLevel"])
+			else:
+				with open(localFile, "rb") as jobFile:
+					entry["content"] = base64.b64encode(jobFile.read()).decode("ascii")
+			files.append(entry)
+			sent = sent + 1
+		if sent < len(localFiles):
+			print("{0} of {1} input file(s) already on the server, sent {2}".format(len(localFiles) - sent, len(localFiles), sent))
+		return files
+
+	## parseDependencies Method
+	#  converts -after arguments ([ok|any|fail:]job#[:jobName][@hostname]) into dependency dictionaries
+	def parseDependencies(self,after):
+		dependencies = []
+		for dependency in after or []:
+			host = None
+			if "@" in dependency:
+				[dependency, host] = dependency.rsplit("@",1)
+			depType = "ok"
+			depSplit = string.split(dependency,":",1)
+			if depSplit[0] in ["ok","any","fail"] and len(depSplit) > 1:
+				depType = depSplit[0]
+				dependency = depSplit[1]
+			jobRefSplit = string.split(dependency,":")
+			if len(jobRefSplit) > 1:
+				jobRef = jobRefSplit[0] + ":" + string.split(jobRefSplit[1],".")[0] # incase .inp was added
+			else:
+				jobRef = jobRefSplit[0]
+			if not jobRefSplit[0].isdigit():
+				print("*** ERROR: invalid dependency: {0}".format(dependency))
+				sys.exit(1)
+			dependencies.append({"type":depType, "jobRef":jobRef, "host":host})
+		return dependencies
+
 	## checkUserInput Method
 	#  ensures all job input info is accounted for
 	def checkUserInput(self,host,cpus,gpus,email,priority):
@@ -438,10 +451,6 @@ To quit the procedure enter: exit
 				elif host:
 					break
 
-		# load server config
-		self.loadServerConfFile(host)
-		self.runDirectory = self.serverConfFile["localhost"]["runDirectory"]
-
 		# normalize jobID input
 		jobIDsplit = string.split(jobID,":")
 		if len(jobIDsplit) > 1:
@@ -451,40 +460,13 @@ To quit the procedure enter: exit
 			jobNumber = jobIDsplit[0]
 			jobName = None
 
-		# define job folder
-		connectedServer = self.connectToServer(host)
-		jobFolder = connectedServer.makePath(self.runDirectory,jobNumber)
-
 		# transfer files
-		print("Transferring job {0} from {1}:{2}".format(jobID,host,jobFolder))
-		userName = self.serverConfFile["localhost"]["userName"]
-		pw = self.serverConfFile["localhost"]["password"]
-		destination = os.getcwd()
-
+		print("Transferring job {0} from {1}".format(jobID,host))
 		if jobName == None:
 			files = self.defaultFileTypes
-			if self.opSystem == "Windows":
-				for file in files:
-					source = host + ":" + jobFolder + "/" + file
-					p = subprocess.Popen(["pscp", "-l", userName, "-pw", pw, "-p", source, destination])
-					p.wait()
-			# elif self.opSystem == "Linux":
-			# 	pass
-			else:
-				print("*** ERROR: Incompatible operating system, exiting")
-				sys.exit(1)
 		else:
 			files = [jobName + fileExt[1:] for fileExt in self.defaultFileTypes]
-			if self.opSystem == "Windows":
-				for file in files:
-					source = host + ":" + jobFolder + "/" + file
-					p = subprocess.Popen(["pscp", "-l", userName, "-pw", pw, "-p", source, destination])
-					p.wait()
-			# elif self.opSystem == "Linux":
-			# 	pass
-			else:
-				print("*** ERROR: Incompatible operating system, exiting")
-				sys.exit(1)
+		self.fetchFiles(host,jobNumber,files,os.getcwd())
 
 	## monitor Method
 	#  retrieves status files for job, displays out.log to user
@@ -498,10 +480,6 @@ To quit the procedure enter: exit
 					self.queryAllServers()
 				elif host:
 					break
-		
-		# load server config
-		self.loadServerConfFile(host)
-		self.runDirectory = self.serverConfFile["localhost"]["runDirectory"]
 
 		# normalize jobID input
 		jobIDsplit = string.split(jobID,":")
@@ -512,48 +490,23 @@ To quit the procedure enter: exit
 			jobNumber = jobIDsplit[0]
 			jobName = None
 
-		# define job folder
-		connectedServer = self.connectToServer(host)
-		jobFolder = connectedServer.makePath(self.runDirectory,jobNumber)
-
 		# transfer files
-		print("Transferring files {0} from {1}:{2}".format(jobID,host,jobFolder))
-		userName = self.serverConfFile["localhost"]["userName"]
-		pw = self.serverConfFile["localhost"]["password"]
+		print("Transferring files {0} from {1}".format(jobID,host))
 		destination = os.getcwd()
-
 		if jobName == None:
 			files = self.defaultMonitorFileTypes
-			if self.opSystem == "Windows":
-				for file in files:
-					source = host + ":" + jobFolder + "/" + file
-					p = subprocess.Popen(["pscp", "-l", userName, "-pw", pw, "-p", source, destination])
-					p.wait()
-			# elif self.opSystem == "Linux":
-			# 	pass
-			else:
-				print("*** ERROR: Incompatible operating system, exiting")
-				sys.exit(1)
 		else:
 			files = [jobName + fileExt[1:] for fileExt in self.defaultMonitorFileTypes]
 			files = files[:-1]
-			if self.opSystem == "Windows":
-				for file in files:
-					source = host + ":" + jobFolder + "/" + file
-					p = subprocess.Popen(["pscp", "-l", userName, "-pw", pw, "-p", source, destination])
-					p.wait()
-			# elif self.opSystem == "Linux":
-			# 	pass
-			else:
-				print("*** ERROR: Incompatible operating system, exiting")
-				sys.exit(1)
+		self.fetchFiles(host,jobNumber,files,destination)
 		if "*.log" in files:
 			tmp = open(os.path.join(destination,"out.log"),"r")
 			tmp = tmp.read()
 			print("\n" + tmp)
 
 	## watch Method
-	#  retrieves sta file and shows it to the use in a loop
+	#  shows the sta file and status changes of a job as the daemon pushes them until the job finishes
+	#  falls back to polling the sta file if the daemon cannot push events to this machine
 	def watch(self,jobID,host):
 		# check to make sure a host was specified
 		if host == None:
@@ -564,10 +517,62 @@ To quit the procedure enter: exit
 					self.queryAllServers()
 				elif host:
 					break
-		
-		# load server config
-		self.loadServerConfFile(host)
-		self.runDirectory = self.serverConfFile["localhost"]["runDirectory"]
+
+		# normalize jobID input
+		jobIDsplit = string.split(jobID,":")
+		jobNumber = jobIDsplit[0]
+		jobName = string.split(jobIDsplit[1],".")[0] if len(jobIDsplit) > 1 else None # incase .inp was added
+
+		connectedServer = self.connectToServer(host)
+		try:
+			listener = jobEventListener(self.clientConf["nameServer"]["nsIP"])
+			subscriptionID = connectedServer.subscribe(listener.uri, jobNumber, None, True)
+		except Exception as e:
+			print("*** ERROR: unable to subscribe to job events ({0}); polling the sta file instead".format(e))
+			self.watchByPolling(jobID,host)
+			return
+
+		try:
+			# jobs still active on the daemon; watching stops when they all finished
+			activeJobs = set([row[1] for row in connectedServer.getQueue() if string.split(row[1],":")[0] == jobNumber and (jobName == None or row[1] == jobNumber + ":" + jobName)])
+			if not activeJobs:
+				print("No active job {0} on {1}".format(jobID,host))
+				return
+
+			print("Job {0} on {1}".format(jobID,host))
+			print("Press <ESC> or close this window to exit\n")
+			while activeJobs:
+				event = listener.next(0.5)
+				if event is not None and (jobName == None or event["jobName"] == jobName):
+					if event.get("dropped"):
+						print("*** {0} events were dropped".format(event["dropped"]))
+					if event["type"] == "progress":
+						print("\n".join(event["lines"]))
+					else:
+						print("{0} {1}: {2}".format(time.strftime("%H:%M:%S",time.localtime(event["time"])),event["jobID"],event["status"]))
+						if event["final"]:
+							activeJobs.discard(event["jobID"])
+				if self.escapePressed():
+					break
+		finally:
+			try:
+				connectedServer.unsubscribe(subscriptionID)
+			except Exception:
+				pass
+			listener.close()
+
+	## watchByPolling Method
+	#  retrieves sta file and shows it to the use in a loop
+	def watchByPolling(self,jobID,host):
+		# check to make sure a host was specified
+		if host == None:
+			while True:
+				host = raw_input("Specify desired host (by name) or enter 'list' to view all active servers:\n")
+				print("\n")
+				if host == "list":
+					self.queryAllServers()
+				elif host:
+					break
 
 		# normalize jobID input
 		jobIDsplit = string.split(jobID,":")
@@ -578,53 +583,22 @@ To quit the procedure enter: exit
 			jobNumber = jobIDsplit[0]
 			jobName = None
 
-		# define job folder
-		connectedServer = self.connectToServer(host)
-		jobFolder = connectedServer.makePath(self.runDirectory,jobNumber)
-
 		# transfer files
-		print("Job {0} from {1}:{2}".format(jobID,host,jobFolder))
-		userName = self.serverConfFile["localhost"]["userName"]
-		pw = self.serverConfFile["localhost"]["password"]
+		print("Job {0} from {1}".format(jobID,host))
+		connectedServer = self.connectToServer(host)
 		destination = os.getcwd()
 
 		staFileName = None
 		while True:
 			if jobName == None:
-				if self.opSystem == "Windows":
-					source = host + ":" + jobFolder + "/*.sta"
-					p = subprocess.Popen(["pscp", "-l", userName, "-pw", pw, "-q", "-p", source, destination])
-					p.wait()
-
-					# Get newest sta file
-					statusFiles = []
-					for file in os.listdir(destination):
-						if file.endswith('.sta'):
-							statusFiles.append(file)
-					if len(statusFiles) > 0:
-						statusPaths = [os.path.join(destination, statusFile) for statusFile in statusFiles]
-						staFilePath = max(statusPaths, key=os.path.getctime)
-						staFileName = os.path.basename(staFilePath)
-					else:
-						pass
-				# elif self.opSystem == "Linux":
-				# 	pass
-				else:
-					print("*** ERROR: Incompatible operating system, exiting")
-					sys.exit(1)
+				# Get newest sta file
+				statusFiles = connectedServer.listJobFiles(jobNumber,["*.sta"])
+				if isinstance(statusFiles, list) and len(statusFiles) > 0:
+					staFileName = max(statusFiles, key=lambda statusFile: statusFile[2])[0]
 			else:
 				staFileName = jobName + ".sta"
-				if self.opSystem == "Windows":
-					source = host + ":" + jobFolder + "/" + staFileName
-					p = subprocess.Popen(["pscp", "-l", userName, "-pw", pw, "-q", "-p", source, destination])
-					p.wait()
-				# elif self.opSystem == "Linux":
-				# 	pass
-				else:
-					print("*** ERROR: Incompatible operating system, exiting")
-					sys.exit(1)
 
-			if staFileName != None:
+			if staFileName != None and self.fetchFiles(host,jobNumber,[staFileName],destination,quiet=True):
 				print("\n" + staFileName)
 				with open(os.path.join(destination,staFileName),"r") as staFile:
 					for line in (staFile.readlines() [-25:]): # only read the last 25 lines to keep from overflowing window
@@ -634,9 +608,54 @@ To quit the procedure enter: exit
 			
 			print("Press <ESC> or close this window to exit\n")
 			time.sleep(3) # wait 3 seconds before re-polling sta file
-			if msvcrt.kbhit():
-				if ord(msvcrt.getch()) == 27: # ESC key chr(27)
-					break
+			if self.escapePressed():
+				break
+
+	## fetchFiles Method
+	#  copies the files of a job matching the shell patterns into the destination directory
+	#  large files are downloaded in parallel ranges and resumed if an earlier download was interrupted
+	#  returns the names of the files copied
+	def fetchFiles(self,host,jobNumber,patterns,destination,quiet=False):
+		transfer = self.clientConf["fileTransfer"]
+		connectedServer = self.connectToServer(host)
+		try:
+			files = connectedServer.listJobFiles(jobNumber,patterns)
+		except Exception as e:
+			files = "*** ERROR: {0}".format(e)
+		if not isinstance(files, list):
+			print(files)
+			return []
+		if not files and not quiet:
+			print("*** ERROR: no files matching {0} in job {1}".format(" ".join(patterns),jobNumber))
+
+		fetched = []
+		for [name, size, mtime] in files:
+			try:
+				start = time.time()
+				if size > transfer["parallelAbove_bytes"]:
+					received = downloadRanges(lambda: self.proxies.streamProxy("WAM." + host + ".daemon"), jobNumber, name, size, mtime, destination,
+						transfer["rangeSize_bytes"], transfer["parallelStreams"])
+					note = "  (resumed, {0:.0f}% transferred)".format(100.0*received/size) if received < size else ""
+				else:
+					received = downloadFile(connectedServer, jobNumber, name, destination, transfer["chunkSize_bytes"], transfer["compression"])
+					note = "  (compressed to {0:.0f}%)".format(100.0*received/size) if size and received < size else ""
+				fetched.append(name)
+				if not quiet:
+					elapsed = max(time.time() - start, 1e-6)
+					print("{0:<40} {1:>10.1f} Mb  {2:>8.1f} Mb/s{3}".format(name, size/1048576.0, received/1048576.0/elapsed, note))
+			except KeyboardInterrupt:
+				print("*** ERROR: transfer of {0} interrupted (run again to resume)".format(name))
+				sys.exit(1)
+			except Exception as e:
+				print("*** ERROR: unable to transfer {0}: {1}".format(name,e))
+		return fetched
+
+	## escapePressed Method
+	#  True if the user pressed <ESC> (Windows consoles only)
+	def escapePressed(self):
+		if msvcrt is not None and msvcrt.kbhit():
+			return ord(msvcrt.getch()) == 27 # ESC key chr(27)
+		return False
 
 	## killJob method
 	#  kills job given a jobID
@@ -663,152 +682,255 @@ To quit the procedure enter: exit
 	def queryAllServers(self):
 		sys.excepthook = Pyro4.util.excepthook
 
-		# Initialize the table
+		# Initialize the tables
 		headers = ["Host Name", "IP Address", "Cores", "GPUS", "Total Memory", "Job Queue Length"]
-		table = []
-
-		# Find all daemon servers and loop through them
-		daemons = self.findServers()
-
-		for daemon_uri, daemonName in daemons:
-			currentServer = Pyro4.Proxy(daemon_uri)
-
-			try:
-				[compName, cpus, gpus, mem, IP, jobList, jobsQueue, jobsRunning, jobHist] = currentServer.getComputerInfo()	
-				tmp = []
-				tmp.append(compName)
-				tmp.append(IP)
-				tmp.append(cpus)
-				tmp.append(gpus)
-				tmp.append(str(mem) + " Gb")
-				tmp.append("Running: {0}, Queue: {1}".format(jobsRunning,jobsQueue))
-				table.append(tmp[:])
-
-			except Exception as e:
-				tmp = []
-				tmp.append(daemonName.lstrip("WAM.").rstrip(".daemon"))
-				tmp.append("ERROR")
-				tmp.append("ERROR")
-				tmp.append("ERROR")
-				tmp.append("ERROR")
-				table.append(tmp[:])
-				print("*** ERROR: {0}".format(e))
-				pass
-
-		print(tabulate(table, headers, tablefmt="rst", numalign="center", stralign="center"))
+		coreHeaders = ["Host Name", "Job ID", "Pinned Cores", "NUMA Nodes"]
+		coreTable = []
+		errors = []
+
+		# Ask the aggregator or else query all daemon servers at once; rows are printed as the servers answer
+		results = self.queryAggregator("getHostInfos")
+		if results is None:
+			results = self.queryServers(None, "getHostInfo")
+		widths = self.printTableHeader(headers, [16, 15, 5, 4, 12, 24])
+		for compName, hostInfo in results:
+			if hostInfo is TIMEOUT or isinstance(hostInfo, Exception):
+				self.printTableRows([self.failedRow(compName, hostInfo, len(headers), errors)], widths)
+				continue
+			tmp = []
+			tmp.append(hostInfo["hostName"])
+			tmp.append(hostInfo["IP"])
+			tmp.append(hostInfo["cpus"])
+			tmp.append(hostInfo["gpus"])
+			tmp.append(str(hostInfo["memory"]) + " Gb")
+			tmp.append("Running: {0}, Queue: {1}".format(hostInfo["jobsRunning"],hostInfo["jobsQueue"]))
+			self.printTableRows([tmp], widths)
+
+			for jobID, cores, nodes in hostInfo["coreMap"]:
+				coreTable.append([hostInfo["hostName"], jobID, cores, nodes])
+
+		self.printTableRule(widths)
+		for error in errors:
+			print(error)
+		if coreTable:
+			print(tabulate(coreTable, coreHeaders, tablefmt="rst", numalign="center", stralign="center"))
 
 	## queryAllQueues Method
-	#  Looks through all servers and gathers queue info (host, user, job ID, status)
-	def queryAllQueues(self):
+	#  Looks through the requested server (or all servers) and gathers queue info (host, user, job ID, status), optionally filtered by user and status
+	def queryAllQueues(self,host=None,user=None,status=None):
 		sys.excepthook = Pyro4.util.excepthook
 
 		# Initialize the table
-		headers = ["Host Name", "Username", "Job ID", "Status", "Priority", "Est. Tokens"]
-		table = []
-
-		# Find all daemon servers and loop through them
-		daemons = self.findServers()
-
-		for daemon_uri, daemonName in daemons:
-			currentServer = Pyro4.Proxy(daemon_uri)
-			try:
-				[compName, cpus, gpus, mem, IP, jobList, jobsQueue, jobsRunning, jobHist] = currentServer.getComputerInfo()
-				if jobList:
-					for job in jobList:
-
-						if job[4] == 0:
-							priority = "High"
-						elif job[4] == 1:
-							priority = "Med"
-						else:
-							priority = "Low"
-
-						tmp = []
-						tmp.append(compName) # hostname
-						tmp.append(job[0]) # username
-						tmp.append(job[1]) # job ID
-						tmp.append(job[2]) # status
-						tmp.append(priority) # job priority
-						tmp.append(str(int(5*job[3]**0.422))) # cores being used (cpus and gpus)
-						table.append(tmp[:])
+		headers = ["Host Name", "Username", "Job ID", "Status", "Priority", "Est. Tokens", "ETA"]
+		errors = []
+
+		# Ask the aggregator or else query the daemon servers at once; each server's rows are printed as it answers
+		results = self.queryAggregator("getQueues", host=host, user=user, status=status)
+		if results is None:
+			results = self.queryServers(host, "getQueue", user=user, status=status)
+		widths = self.printTableHeader(headers, [16, 12, 24, 20, 8, 11, 12])
+		for compName, jobList in results:
+			if jobList is TIMEOUT or isinstance(jobList, Exception):
+				self.printTableRows([self.failedRow(compName, jobList, len(headers), errors)], widths)
+				continue
+			table = []
+			for job in jobList:
+
+				if job[4] == 0:
+					priority = "High"
+				elif job[4] == 1:
+					priority = "Med"
+				else:
+					priority = "Low"
 
-			except Exception as e:
 				tmp = []
-				tmp.append(daemonName.lstrip("WAM.").rstrip(".daemon"))
-				tmp.append("ERROR")
-				tmp.append("ERROR")
-				tmp.append("ERROR")
-				tmp.append("ERROR")
-				tmp.append("ERROR")
+				tmp.append(compName) # hostname
+				tmp.append(job[0]) # username
+				tmp.append(job[1]) # job ID
+				tmp.append(job[2]) # status
+				tmp.append(priority) # job priority
+				tmp.append(str(int(5*job[3]**0.422))) # cores being used (cpus and gpus)
+				tmp.append(job[5] if len(job) > 5 else "") # predicted time left (running) or run time (queued)
 				table.append(tmp[:])
-				print("*** ERROR: {0}".format(e))
-				pass
+			self.printTableRows(table, widths)
 
-		print(tabulate(table, headers, tablefmt="rst", numalign="center", stralign="center"))
+		self.printTableRule(widths)
+		for error in errors:
+			print(error)
 
 	## pullJobHistory Method
-	#  Gets the previous 20 (or so) jobs from the requested host (or all hosts)
-	def pullJobHistory(self,host):
+	#  Gets the latest jobs (30 by default) from the requested host (or all hosts), optionally filtered by user and status
+	def pullJobHistory(self,host,user=None,status=None,limit=30):
 		# Initialize the table
 		headers = ["Host Name", "Username", "Job Number", "Job Name", "Status", "Submission Time"]
-		table = []
+		errors = []
+
+		filters = {}
+		if user is not None:
+			filters["user"] = user
+		if status is not None:
+			filters["status"] = status
+
+		# Query the daemon servers at once; each server's rows are printed as it answers
+		widths = self.printTableHeader(headers, [16, 12, 10, 24, 16, 22])
+		for compName, jobHist in self.queryServers(host, "getHistory", limit=limit, filters=filters):
+			if not isinstance(jobHist, list) and jobHist is not TIMEOUT and not isinstance(jobHist, Exception):
+				jobHist = Exception(jobHist.replace("*** ERROR: ",""))
+			if jobHist is TIMEOUT or isinstance(jobHist, Exception):
+				self.printTableRows([self.failedRow(compName, jobHist, len(headers), errors)], widths)
+				continue
+			table = []
+			for job in jobHist:
+				tmp = []
+				tmp.append(compName) # hostname
+				tmp.append(job[0]) # username
+				tmp.append(job[1]) # job number
+				tmp.append(job[2]) # job name
+				tmp.append(job[3]) # status
+				tmp.append(job[4]) # submission time
+				table.append(tmp[:])
+			self.printTableRows(table, widths)
+
+		self.printTableRule(widths)
+		for error in errors:
+			print(error)
 
+	## queryServers Method
+	#  Calls a daemon method on the requested server (or all servers) at once from a pool of threads
+	#  Yields [compName, result] pairs as the servers answer; the result is the exception raised by a failed call
+	#  or TIMEOUT for servers that did not answer within hostTimeout_seconds of the start of the query
+	def queryServers(self,host,method,*args,**kwargs):
 		if host == None:
-			# Find all daemon servers and loop through them
-			daemons = self.findServers()
+			daemons = list(self.findServers())
+		else:
+			daemons = [(None, "WAM.{0}.daemon".format(host))]
+		timeout = self.clientConf["query"]["hostTimeout_seconds"]
+		poolSize = max(1, min(len(daemons), self.clientConf["query"]["threads"]))
 
-			for daemon_uri, daemonName in daemons:
-				currentServer = Pyro4.Proxy(daemon_uri)
-				try:
-					[compName, cpus, gpus, mem, IP, jobList, jobsQueue, jobsRunning, jobHist] = currentServer.getComputerInfo()
-					if jobHist:
-						for job in jobHist:
-							tmp = []
-							tmp.append(compName) # hostname
-							tmp.append(job[0]) # username
-							tmp.append(job[1]) # job number
-							tmp.append(job[2]) # job name
-							tmp.append(job[3]) # status
-							tmp.append(job[4]) # submission time
-							table.append(tmp[:])
+		pending = queue.Queue()
+		for daemon in daemons:
+			pending.put(daemon)
+		answers = queue.Queue()
 
+		def worker():
+			while True:
+				try:
+					daemon_uri, daemonName = pending.get_nowait()
+				except queue.Empty:
+					return
+				compName = daemonName[len("WAM."):-len(".daemon")]
+				try:
+					currentServer = self.proxies.proxy(daemonName, daemon_uri)
+					answers.put([compName, currentServer._callWithTimeout(timeout, method, *args, **kwargs)])
 				except Exception as e:
-					tmp = []
-					tmp.append(daemonName.lstrip("WAM.").rstrip(".daemon"))
-					tmp.append("ERROR")
-					tmp.append("ERROR")
-					tmp.append("ERROR")
-					tmp.append("ERROR")
-					table.append(tmp[:])
-					print("*** ERROR: {0}".format(e))
-					pass
+					answers.put([compName, e])
 
-		else:
-			currentServer = self.connectToServer(host)
+		for i in range(poolSize):
+			thread = threading.Thread(target=worker)
+			thread.setDaemon(True) # hung servers do not keep the client alive
+			thread.start()
+
+		# one deadline for the whole query, however many servers wait for a free thread
+		deadline = time.time() + timeout
+		answered = set()
+		while len(answered) < len(daemons):
 			try:
-				[compName, cpus, gpus, mem, IP, jobList, jobsQueue, jobsRunning, jobHist] = currentServer.getComputerInfo()
-				if jobHist:
-					for job in jobHist:
-						tmp = []
-						tmp.append(compName) # hostname
-						tmp.append(job[0]) # username
-						tmp.append(job[1]) # job number
-						tmp.append(job[2]) # job name
-						tmp.append(job[3]) # status
-						tmp.append(job[4]) # submission time
-						table.append(tmp[:])
+				compName, result = answers.get(timeout=max(0, deadline - time.time()))
+			except queue.Empty:
+				break
+			answered.add(compName)
+			yield [compName, result]
 
-			except Exception as e:
-				tmp = []
-				tmp.append(compName)
-				tmp.append("ERROR")
-				tmp.append("ERROR")
-				tmp.append("ERROR")
-				tmp.append("ERROR")
-				table.append(tmp[:])
-				print("*** ERROR: {0}".format(e))
-				pass
+		for daemon_uri, daemonName in daemons:
+			compName = daemonName[len("WAM."):-len(".daemon")]
+			if compName not in answered:
+				yield [compName, TIMEOUT]
+
+	## queryAggregator Method
+	#  Gets cached daemon information from the aggregator if one is registered with the name server
+	#  Returns [compName, result] pairs like queryServers or None if the aggregator can not be used
+	def queryAggregator(self,method,**kwargs):
+		if not self.clientConf["aggregator"]["useAggregator"]:
+			return None
+		try:
+			aggregator = self.proxies.proxy(self.clientConf["aggregator"]["aggregatorName"])
+			results = aggregator._callWithTimeout(self.clientConf["query"]["hostTimeout_seconds"], method, **kwargs)
+		except Exception:
+			return None # no aggregator running; query the daemons directly
+
+		for result in results:
+			if result[1] == TIMEOUT:
+				result[1] = TIMEOUT # the marker is compared by identity
+			elif not isinstance(result[1], (list, dict)):
+				result[1] = Exception(result[1].replace("*** ERROR: ",""))
+		return results
+
+	## failedRow Method
+	#  Returns the table row of a server that failed (ERROR) or did not answer in time (TIMEOUT)
+	#  the error message is added to errors, to be printed below the table
+	def failedRow(self,compName,result,columns,errors):
+		if result is TIMEOUT:
+			errors.append("*** ERROR: {0} did not answer within {1} seconds".format(compName,self.clientConf["query"]["hostTimeout_seconds"]))
+			return [compName] + ["TIMEOUT"]*(columns-1)
+		errors.append("*** ERROR: {0}".format(result))
+		return [compName] + ["ERROR"]*(columns-1)
+
+	## printTableRule Method
+	#  Prints the rule above, below or under the header of a table printed with printTableRows (rst style)
+	def printTableRule(self,widths):
+		print("  ".join(["="*width for width in widths]))
+
+	## printTableRows Method
+	#  Prints table rows as soon as they are known, so servers show up as they answer
+	#  cells are centered in fixed column widths; a longer cell widens only its own row
+	def printTableRows(self,rows,widths):
+		for row in rows:
+			print("  ".join([str(cell).center(width) for cell, width in zip(row, widths)]))
+		sys.stdout.flush()
+
+	## printTableHeader Method
+	#  Prints the header of a table whose rows follow as the servers answer; returns the column widths
+	def printTableHeader(self,headers,minWidths):
+		widths = [max(len(header), width) for header, width in zip(headers, minWidths)]
+		self.printTableRule(widths)
+		self.printTableRows([headers], widths)
+		self.printTableRule(widths)
+		return widths
+
+	## jobStatus Method
+	#  Shows the status of a single job on the requested host
+	def jobStatus(self,jobID,host):
+		# check to make sure a host was specified
+		if host == None:
+			while True:
+				host = raw_input("Specify desired host (by name) or enter 'list' to view all active servers:\n")
+				print("\n")
+				if host == "list":
+					self.queryAllServers()
+				elif host:
+					break
+
+		connectedServer = self.connectToServer(host)
+		job = connectedServer.getJob(jobID)
+		if not isinstance(job, dict):
+			print(job)
+			sys.exit(1)
 
+		if job["priority"] == 0:
+			priority = "High"
+		elif job["priority"] == 1:
+			priority = "Med"
+		else:
+			priority = "Low"
+
+		headers = ["Host Name", "Username", "Job ID", "Status", "Priority", "Cores", "Submission Time", "Run Time"]
+		runTime = ""
+		if job["runTime"] is not None:
+			hours, remainder = divmod(int(job["runTime"]), 3600)
+			runTime = "{0:d}:{1:02d}:{2:02d}".format(hours, remainder//60, remainder%60)
+		elif job["startTimestamp"] is not None:
+			runTime = "started {0}".format(time.strftime("%m/%d/%Y %H:%M:%S", time.localtime(job["startTimestamp"])))
+		table = [[job["host"], job["user"], job["jobID"], job["status"], priority, job["cpus"]+job["gpus"], job["submissionTime"], runTime]]
 		print(tabulate(table, headers, tablefmt="rst", numalign="center", stralign="center"))
 
 	## tokenConvert Method
@@ -853,30 +975,23 @@ MA  02110-1301, USA.
 
 	## connectToServer Method
 	#  used Pyro to connect to defined server
-	#  returns Pyro proxy object
+	#  returns the Pyro proxy object shared by the whole invocation
 	def connectToServer(self,host):
 		sys.excepthook = Pyro4.util.excepthook
-		nsIP = self.clientConf["nameServer"]["nsIP"]
-		nsPort = self.clientConf["nameServer"]["nsPort"]
-		ns = Pyro4.locateNS(host=nsIP,port=nsPort)
-		daemon_uri = ns.lookup("WAM." + host + ".daemon")
-		connectedServer = Pyro4.Proxy(daemon_uri)
-		return connectedServer
+		return self.proxies.proxy("WAM." + host + ".daemon")
 
 	## findServers Method
 	#  Looks through the name server to find all registered servers
 	def findServers(self):
 		sys.excepthook = Pyro4.util.excepthook
 
-		nsHost = self.clientConf["nameServer"]["nsIP"]
-		nsPort = self.clientConf["nameServer"]["nsPort"]
-
-		ns = Pyro4.locateNS(host=nsHost,port=nsPort)
+		registered = self.proxies.nameServer().list(prefix="WAM.")
+		self.proxies.remember(registered)
 
 		daemon_uris = []
 		daemonNames = []
 
-		for daemonName, daemon_uri in ns.list(prefix="WAM.").items():
+		for daemonName, daemon_uri in registered.items():
 			daemon_uris.append(daemon_uri)
 			daemonNames.append(daemonName)
 
@@ -897,14 +1012,6 @@ MA  02110-1301, USA.
 			filePath = os.path.join(self.clientScriptDirectory,"clientConf.json")
 			self.clientConf = parseJSONFile(filePath)
 
-	def loadServerConfFile(self,host):
-		try:
-			connectedServer = self.connectToServer(host)
-			self.serverConfFile = connectedServer.loadServerConfFile()
-		except Exception as e:
-			print("*** ERROR: Unable to get server configuration file: {0}".format(e))
-			sys.exit(1)
-
 	def ham(self):
 		print(r"""
 			                           `::..   .
@@ -977,7 +1084,8 @@ $$$$$$eeu. >                       >P"
 
 		# HAM HORRRNNNNN
 		HAM = os.path.join(self.clientScriptDirectory,"utils","HAM.wav")
-		winsound.PlaySound(HAM, winsound.SND_FILENAME)
+		if winsound is not None:
+			winsound.PlaySound(HAM, winsound.SND_FILENAME)
 
 def main():
 	front_end_client = frontEndClient(sys.argv)
@@ -20,16 +20,37 @@ import logging
 import copy
 import string
 import base64
+import zlib
+import csv
+import json
+import shutil
+from collections import OrderedDict
+try:
+	import queue
+except ImportError: # python 2
+	import Queue as queue
 from subprocess import CalledProcessError, check_output
 
 # 3rd Party Packages
 import Pyro4 # https://pypi.org/project/Pyro4/
 import serpent # https://pypi.org/project/serpent/1.28/
-from psutil import virtual_memory # https://pypi.org/project/psutil/
+import psutil # https://pypi.org/project/psutil/
+from psutil import virtual_memory
 
 # Local Source Packages
 from utils.parseJSONFile import parseJSONFile
 from utils.emailMisc import sendEmailMsg
+from utils.jobQueue import jobQueue
+from utils.runtimePredictor import runtimePredictor, inputFileFeatures
+from utils.memoryEstimate import inputFileMemoryEstimate, datMemoryEstimate
+from utils.cpuTopology import coreAllocator, numaNodes, usableCores, setAffinity, formatCPUList
+from utils.jobJournal import jobJournal, atomicWrite
+from utils.jobStore import jobStore
+from utils.jobRecovery import findSolverProcess, canRecover, attachedProcess
+from utils.eventPublisher import eventPublisher
+from utils.wireFormat import configureWire
+from utils.fileTransfer import fileTransfer
+from utils.blobStore import blobStore
 
 # Development Version
 version = 0.5
@@ -45,20 +66,46 @@ class serverDaemon(object):
 		self.confFileLock = threading.Lock()
 		self.loadServerConfFile()
 
+		# start logging before the job state is loaded so recovery errors reach the daemon log
+		self.loggingSetup()
+
 		# lock and load serialized objects
 		self.jobIDLock = threading.Lock()
 		self.loadSerializedJobID()
 		self.jobListLock = threading.Lock()
-		self.serializedJobListLock = threading.Lock()
-		self.loadSerializedJobList()
-		self.serializedJobHistLock = threading.Lock()
-		self.loadSerializedJobHist()
-
-		# set up cpu lock for running jobs
-		self.CPULock = threading.Lock()
-
-		# start logging
-		self.loggingSetup()
+		self.schedulerCondition = threading.Condition(self.jobListLock) # wakes the dispatcher on submit, kill and completion
+		self.journal = jobJournal(os.path.join(self.serverScriptDirectory,"jobState.serpent"), os.path.join(self.serverScriptDirectory,"jobState.journal"),
+			self.__journalState, self.jobListLock, self.serverConf["journal"]["flushDelay_seconds"], self.serverConf["journal"]["compactAfterRecords"])
+		self.jobStore = jobStore(os.path.join(self.serverScriptDirectory,"jobHist.sqlite"), socket.gethostname())
+
+		# state version, bumped on every job change; lets clients fetch only what changed (getChanges)
+		self.stateVersion = 0
+		self.jobVersions = OrderedDict()	# jobID: (version of its last change, removed?), oldest change first
+		self.histVersions = []				# (version, history row) of jobs added to history, oldest first
+		self.oldestVersion = 0				# changes at or before this version have been forgotten
+		self.fullStateCache = None			# (version, getChanges response) of the last full state sent
+
+		# job events pushed to subscribed clients (subscribe)
+		self.events = eventPublisher(self.serverConf["events"]["queueSize"], self.serverConf["events"]["maxDeliveryFailures"])
+		self.publishedStatus = {}			# jobID: last status sent to subscribers
+		self.progressOffsets = {}			# jobID: bytes of the job's .sta file already sent to subscribers
+		self.progressThread = None
+		self.loadSerializedJobState()
+
+		# chunked file transfers to and from the job directories (listJobFiles, readJobFile, openUpload)
+		transfer = self.serverConf["fileTransfer"]
+		self.files = fileTransfer(self.serverConf["localhost"]["runDirectory"], transfer["chunkSize_bytes"], transfer["compressExtensions"],
+			transfer["compressionLevel"], transfer["uploadTimeout_hours"]*3600)
+
+		# content addressed cache of submitted input files; clients only send the files it does not have (missingInputs)
+		self.inputCache = None
+		if self.serverConf["inputCache"]["enabled"]:
+			self.inputCache = blobStore(os.path.join(self.serverConf["localhost"]["runDirectory"],".blobs"), self.serverConf["inputCache"]["maxSize_GB"]*1024**3)
+
+		# serializers accepted from clients and compression of the replies
+		wire = self.serverConf["wire"]
+		accepted = configureWire(wire["serializersAccepted"], wire["compression"], wire["compressionThreshold_bytes"], wire["compressionLevel"])
+		logging.info("accepting Pyro serializers: {0}; compression {1}".format(", ".join(accepted), "on" if wire["compression"] else "off"))
 
 		# gather HPC info
 		self.hostName = socket.gethostname()
@@ -68,6 +115,35 @@ class serverDaemon(object):
 		self.mem = virtual_memory() # in bytes; options include: total & available
 		self.opSystem = platform.system()
 
+		# running job bookkeeping; keyed by jobID: {"job", "subProcess", "start", "estimate", "peakMemory", "memory", "memoryEstimate",
+		# "suspended" (time the job was suspended or None), "suspendedTime" (seconds spent suspended so far), "cores" (pinned cores or None)}
+		self.runningJobs = {}
+
+		# dispatcher thread and bounded worker pool, started by __startScheduler once the job list is recovered
+		self.workQueue = queue.Queue()
+		self.dispatcherThread = None
+		self.workerThreads = []
+		self.startupLock = threading.Lock()	# recovery and scheduler start run once, even if a client calls initSerializedJobList
+		self.started = False
+
+		# job dependencies; states of parent jobs on other hosts are polled by the dependency watcher
+		self.remoteJobStates = {}		# (host, jobRef): "active", "complete", "failed", "unknown" or "unreachable"
+		self.jobWatchers = {}			# jobNumber: hosts with jobs depending on it
+		self.dependencyEvent = threading.Event()
+		self.dependencyThread = None
+
+		# wall time and peak memory model trained on completed jobs
+		self.predictor = runtimePredictor(os.path.join(self.serverScriptDirectory,"runtimeModel.serpent"))
+
+		# disjoint core sets for running jobs, taken from as few NUMA nodes as possible
+		self.coreAllocator = coreAllocator(numaNodes())
+
+		# license tokens granted by the cluster wide license broker; queued jobs wait for them in the queue
+		self.licenseTickets = {}		# jobID: broker ticket of a running job or of a queued job that asked for tokens
+		self.licenseRequests = {}		# jobID of a queued job: {"tokens", "granted"}
+		self.licenseEvent = threading.Event()
+		self.licenseThread = None
+
 		# name server connect/reconnect thread initialization
 		self.nsThread = None
 
@@ -78,22 +154,79 @@ class serverDaemon(object):
 	# returns jobID and directory to client
 	def jobInitialization(self,runDirectory):
 		# create new jobID and serialize
-		self.jobID = self.jobID + 1
-		self.serializeJobID()
+		with self.jobIDLock:
+			self.jobID = self.jobID + 1
+			jobID = self.jobID
+			self.serializeJobID()
 
 		# create directory to run jobs 
 		logging.info("job initialization started in directory: {0}".format(runDirectory))
-		jobDirectory = os.path.join(runDirectory, str(self.jobID))
+		jobDirectory = os.path.join(runDirectory, str(jobID))
 		
 		try:
 			os.mkdir(jobDirectory)
 			os.chmod(jobDirectory, 0o777)
-			logging.info("directory made for job: {0}".format(self.jobID))
+			logging.info("directory made for job: {0}".format(jobID))
 		except OSError as e:
-			logging.error("unable to create job directory for job {0}: {1}".format(self.jobID,e))
+			logging.error("unable to create job directory for job {0}: {1}".format(jobID,e))
 
 		# return job ID for client
-		return(self.jobID, jobDirectory)
+		return(jobID, jobDirectory)
+
+	## submit Method
+	# creates and queues a job in a single call: allocates the job ID, writes the input files to a new job directory and queues the jobs
+	# spec: job specification with the layout of abaqusSubmit.json (jobFiles, solverFlags, advanced, jobData, InternalUse); jobData.jobID is set here
+	# files: [{"name": file name, "content": base64 encoded file}] for files sent inline,
+	#        [{"name": file name, "upload": upload ID}] for files sent with openUpload or
+	#        [{"name": file name, "hash": SHA-256}] for files in the input cache (see missingInputs)
+	# sent files with a "hash" are added to the input cache
+	# returns [jobID, None] or [jobID, errors]; the job directory is removed again on errors
+	def submit(self,spec,files):
+		errors = self.__checkVersions(spec)
+		if errors:
+			return [None, errors]
+		names = [entry.get("name") for entry in files]
+		for name in names:
+			if not name or os.path.basename(name) != name or name in (".",".."):
+				return [None, ["invalid file name: {0}".format(name)]]
+		for jobFile in spec["jobFiles"]:
+			if os.path.basename(jobFile) not in names:
+				return [None, ["input file {0} was not sent".format(jobFile)]]
+		for entry in files:
+			if "path" in entry: # the daemon runs as root; copying client-named paths would let any client read any file
+				return [None, ["input file {0} must be sent, files are not read by path".format(entry["name"])]]
+		cached = [entry for entry in files if "hash" in entry and not ("content" in entry or "upload" in entry)]
+		if cached and (self.inputCache is None or self.inputCache.missing([entry["hash"] for entry in cached])):
+			return [None, ["input file not cached: {0}".format(", ".join(entry["name"] for entry in cached))]]
+
+		[jobID, jobDirectory] = self.jobInitialization(self.serverConf["localhost"]["runDirectory"])
+		try:
+			for entry in files:
+				filePath = os.path.join(jobDirectory, entry["name"])
+				if "content" in entry:
+					with open(filePath, "wb") as jobFile:
+						jobFile.write(base64.b64decode(entry["content"]))
+				elif "upload" in entry:
+					self.files.takeUpload(entry["upload"], filePath)
+				elif self.inputCache.link(entry["hash"], filePath):
+					continue
+				else: # removed from the cache since the check above
+					raise ValueError("input file not cached: {0}".format(entry["name"]))
+				if "hash" in entry and self.inputCache is not None:
+					self.inputCache.add(entry["hash"], filePath)
+
+			spec["jobData"]["jobID"] = jobID
+			with open(os.path.join(jobDirectory,"abaqusSubmit.json"), "w") as jsonFile: # kept with the job files for reference
+				json.dump(spec, jsonFile, indent=4)
+		except Exception as e:
+			logging.error("unable to write files of job {0}: {1}".format(jobID,e))
+			shutil.rmtree(jobDirectory, ignore_errors=True)
+			return [jobID, ["unable to write job files: {0}".format(e)]]
+
+		errors = self.__defineJobs(spec, jobDirectory)
+		if errors:
+			shutil.rmtree(jobDirectory, ignore_errors=True)
+		return [jobID, errors]
 
 	## jobDefinition Method
 	# Gathers all necessary information for job submission
@@ -103,20 +236,35 @@ class serverDaemon(object):
 		jobData = parseJSONFile(jsonFile)
 
 		# send an error if the client has the wrong version
+		e = self.__checkVersions(jobData)
+		if len(e) > 0:
+			return(e) # break on error and return errors to user
+
+		logging.info("job {0} submission JSON loaded".format(jobData["jobData"]["jobID"]))
+		return self.__defineJobs(jobData, jobDirectory)
+
+	## __checkVersions Private Method
+	# returns the errors for a job specification written by a client of another version
+	def __checkVersions(self,jobData):
 		e = []
 		if jobData["InternalUse"]["clientVersion"] != version:
 			e.append("client {0} using wrong client version, current daemon version = {1}".format(jobData["jobData"]["clientName"],version))
 		if jobData["InternalUse"]["jsonFileVersion"] != version:
 			e.append("client {0} using wrong JSON version, current daemon version = {1}".format(jobData["jobData"]["clientName"],version))
-		if len(e) > 0:
-			for verErr in e:
-				logging.error(verErr)
-			return(e) # break on error and return errors to user
-
-		logging.info("job {0} submission JSON loaded".format(self.jobID))
+		for verErr in e:
+			logging.error(verErr)
+		return e
 
+	## __defineJobs Private Method
+	# queues the jobs of a job specification whose files are in jobDirectory; returns None or a list of errors
+	def __defineJobs(self,jobData,jobDirectory):
 		subTime = datetime.datetime.now().strftime("%B %d - %H:%M")
 		jobData["jobData"]["submissionTime"] = subTime
+		jobData["jobData"]["submissionTimestamp"] = time.time() # sortable submission time for the queue
+
+		# parametric job array: one template input file expanded on the daemon as slots free up
+		if jobData["jobData"].get("arrayTable"):
+			return self.__defineJobArray(jobData, jobDirectory)
 
 		# Separate all job files and create indivual dictionaries for each
 		for i,jobFile in enumerate(jobData["jobFiles"]):
@@ -132,225 +280,1093 @@ class serverDaemon(object):
 
 			self.addJobToQueue(singleJob, jobDirectory)
 
+	## __defineJobArray Private Method
+	# queues a single array job for a template input file and a parameter table (csv with a header row)
+	# tasks are only created when the scheduler starts them
+	def __defineJobArray(self,jobData,jobDirectory):
+		arrayJob = jobData
+		jobFile = arrayJob.pop("jobFiles")[0]
+		tablePath = os.path.join(jobDirectory,os.path.basename(arrayJob["jobData"].pop("arrayTable")))
+		try:
+			with open(tablePath,"r") as table:
+				nTasks = len([row for row in csv.reader(table) if row]) - 1 # skip header row
+		except Exception as e:
+			logging.error("unable to read array parameter table {0}: {1}".format(tablePath,e))
+			return ["unable to read array parameter table: {0}".format(e)]
+		if nTasks < 1:
+			return ["array parameter table {0} has no parameter rows".format(os.path.basename(tablePath))]
+
+		arrayJob["jobData"]["jobName"] = os.path.splitext(os.path.basename(jobFile))[0]
+		arrayJob["jobData"]["jobNumber"] = str(arrayJob["jobData"]["jobID"])
+		arrayJob["jobData"]["jobID"] = str(arrayJob["jobData"]["jobID"])+":"+arrayJob["jobData"]["jobName"]
+		arrayJob["jobData"]["jobFile"] = os.path.join(jobDirectory,arrayJob["jobData"]["jobName"]+".inp")
+		arrayJob["jobData"]["jobDirectory"] = jobDirectory
+		arrayJob["jobData"]["array"] = {"table":tablePath, "tasks":nTasks, "nextTask":0, "taskStates":{}}
+
+		logging.info("created job array {0} with {1} tasks".format(arrayJob["jobData"]["jobID"],nTasks))
+
+		self.addJobToQueue(arrayJob, jobDirectory)
+
+	## __nextArrayTask Private Method
+	# writes the input file of the next task of an array job and returns the queued task
+	# the array job leaves the heap once its last task has been created
+	# must be called while holding jobListLock
+	def __nextArrayTask(self,arrayJob):
+		array = arrayJob["jobData"]["array"]
+		taskIndex = array["nextTask"]
+
+		with open(array["table"],"r") as table:
+			rows = [row for row in csv.reader(table) if row]
+		parameters = dict(zip([name.strip() for name in rows[0]], [value.strip() for value in rows[taskIndex+1]]))
+
+		with open(arrayJob["jobData"]["jobFile"],"r") as template:
+			content = template.read()
+		for name, value in parameters.items():
+			content = content.replace("<{0}>".format(name), value)
+
+		task = {}
+		for key in ["solverFlags", "advanced", "InternalUse", "jobData"]:
+			task[key] = dict(arrayJob[key])
+		task["jobData"].pop("array")
+		task["jobData"].pop("dependencies",None)
+		task["jobData"]["jobName"] = "{0}_{1:04d}".format(arrayJob["jobData"]["jobName"],taskIndex+1)
+		task["jobData"]["jobID"] = "{0}:{1}".format(arrayJob["jobData"]["jobNumber"],task["jobData"]["jobName"])
+		task["jobData"]["jobFile"] = os.path.join(arrayJob["jobData"]["jobDirectory"],task["jobData"]["jobName"]+".inp")
+		task["jobData"]["arrayID"] = arrayJob["jobData"]["jobID"]
+		task["jobData"]["parameters"] = parameters
+		task["jobData"]["status"] = "queue"
+
+		with open(task["jobData"]["jobFile"],"w") as taskFile:
+			taskFile.write(content)
+
+		array["nextTask"] = taskIndex + 1
+		array["taskStates"][task["jobData"]["jobName"]] = "queue"
+		if array["nextTask"] >= array["tasks"]:
+			arrayJob["jobData"]["status"] = "array"
+			self.jobs.hold(arrayJob["jobData"]["jobID"])
+
+		self.jobs.push(task)
+		self.serializeJob(arrayJob)
+		self.serializeJob(task)
+		logging.info("created task {0} of job array {1}".format(task["jobData"]["jobID"],arrayJob["jobData"]["jobID"]))
+		return task
+
+	## __arrayTaskFinished Private Method
+	# records the final status of an array task in its array job
+	# moves the array job to history once all of its tasks have finished
+	# must be called while holding jobListLock
+	def __arrayTaskFinished(self,task):
+		arrayJob = self.jobs.get(task["jobData"]["arrayID"])
+		if arrayJob is None: # array job was killed
+			return
+		array = arrayJob["jobData"]["array"]
+		array["taskStates"][task["jobData"]["jobName"]] = task["jobData"]["status"]
+
+		finished = [state for state in array["taskStates"].values() if state not in ("queue","running")]
+		if len(finished) < array["tasks"]:
+			self.serializeJob(arrayJob)
+			return
+
+		failed = len([state for state in finished if state != "complete"])
+		if failed == 0:
+			arrayJob["jobData"]["status"] = "complete"
+		else:
+			arrayJob["jobData"]["status"] = "JOB ERROR ({0} of {1} tasks)".format(failed,array["tasks"])
+		self.serializeJobHist(arrayJob)
+		self.jobs.remove(arrayJob["jobData"]["jobID"])
+		self.serializeJobRemoval(arrayJob["jobData"]["jobID"])
+		logging.info("job array {0} finished: {1}".format(arrayJob["jobData"]["jobID"],arrayJob["jobData"]["status"]))
+
+	## getArrayStatus Method
+	# returns the task counts and the status of every created task of an array job
+	def getArrayStatus(self,arrayID):
+		with self.jobListLock:
+			arrayJob = self.jobs.get(arrayID)
+			if arrayJob is None:
+				histJobs = self.jobStore.query(jobID=arrayID, limit=1)
+				arrayJob = histJobs[0] if histJobs else None
+			if arrayJob is None or "array" not in arrayJob["jobData"]:
+				return "*** ERROR: invalid job array ID: {0}".format(arrayID)
+
+			array = arrayJob["jobData"]["array"]
+			counts = {}
+			for state in array["taskStates"].values():
+				counts[state] = counts.get(state,0) + 1
+			counts["not created"] = array["tasks"] - array["nextTask"]
+			return {"arrayID":arrayID, "status":arrayJob["jobData"]["status"], "tasks":array["tasks"], "counts":counts, "taskStates":dict(array["taskStates"])}
+
 	## addJobToQueue Method
 	# adds jobs from job list into queue
-	# calls _runJob from created queue
+	# wakes the dispatcher to run the queue
 	def addJobToQueue(self,job,jobDirectory):
 		with self.jobListLock:
 
 			job["jobData"]["status"] = "queue"
 			logging.info("job {0} added to queue".format(job["jobData"]["jobID"]))
 
-			self.jobs.append(job)
+			self.jobs.push(job)
+
+			# jobs with dependencies wait outside the heap until their parents finish
+			if job["jobData"].get("dependencies"):
+				job["jobData"]["status"] = "waiting"
+				self.jobs.hold(job["jobData"]["jobID"])
+
+			self.serializeJob(job)
+			self.schedulerCondition.notify()
+
+	## __startScheduler Private Method
+	# starts the dispatcher thread and the pool of worker threads that run jobs; only the first call starts them
+	# private so clients cannot start more threads through Pyro
+	def __startScheduler(self):
+		if self.dispatcherThread is not None and self.dispatcherThread.is_alive():
+			return
+		for i in range(self.serverConf["scheduler"]["workerThreads"]):
+			worker = threading.Thread(target=self.__worker, name="WAM-worker-{0}".format(i))
+			worker.setDaemon(True)
+			worker.start()
+			self.workerThreads.append(worker)
+
+		self.dispatcherThread = threading.Thread(target=self.__dispatcher, name="WAM-dispatcher")
+		self.dispatcherThread.setDaemon(True)
+		self.dispatcherThread.start()
+
+		self.dependencyThread = threading.Thread(target=self.__dependencyWatcher, name="WAM-dependencies")
+		self.dependencyThread.setDaemon(True)
+		self.dependencyThread.start()
+
+		self.progressThread = threading.Thread(target=self.__progressWatcher, name="WAM-progress")
+		self.progressThread.setDaemon(True)
+		self.progressThread.start()
+
+		if self.serverConf["licenseBroker"]["useLicenseBroker"]:
+			self.licenseThread = threading.Thread(target=self.__licenseWatcher, name="WAM-license")
+			self.licenseThread.setDaemon(True)
+			self.licenseThread.start()
+		logging.info("scheduler started with {0} worker threads".format(len(self.workerThreads)))
+
+	## __dispatcher Private Method
+	# single loop that starts queued jobs; sleeps until a job is submitted, killed or finished
+	# (or the dispatch interval passes)
+	def __dispatcher(self):
+		with self.schedulerCondition:
+			while True:
+				try:
+					self.__scheduleJobs()
+				except Exception as e:
+					logging.error("dispatcher error: {0}".format(e))
+				self.schedulerCondition.wait(self.serverConf["scheduler"]["dispatchInterval_seconds"])
+
+	## __wakeDispatcher Private Method
+	# asks the dispatcher to look at the queue again
+	def __wakeDispatcher(self):
+		with self.schedulerCondition:
+			self.schedulerCondition.notify()
+
+	## __worker Private Method
+	# worker thread loop; runs the jobs handed over by the dispatcher
+	def __worker(self):
+		while True:
+			job = self.workQueue.get()
+			self.__runJob(job)
+
+	## __scheduleJobs Private Method
+	# starts queued jobs in priority order for as long as their cpus/gpus fit in the free slots
+	# jobs waiting for license tokens are passed over until the broker grants them
+	# must be called while holding jobListLock
+	def __scheduleJobs(self):
+		self.__releaseWaitingJobs()
+		self.__resumeSuspendedJobs()
+
+		blockedJob = None
+		for job in self.jobs.queued():
+			state = "started"
+			while state == "started" and self.jobs.isQueued(job["jobData"]["jobID"]): # array jobs start one task at a time
+				state = self.__admitJob(job)
+			if state == "blocked":
+				blockedJob = job
+				break # keep strict priority order; lower priority jobs wait behind the blocked job
+
+		# let smaller jobs jump ahead of a blocked job if the policy allows it
+		if blockedJob is not None and self.serverConf["scheduler"]["policy"] == "backfill":
+			self.__backfillJobs(blockedJob)
+
+	## __admitJob Private Method
+	# starts a queued job if its cpus/gpus fit (suspending lower priority jobs if allowed) and its license tokens were granted
+	# returns "started", "license" (waits for its tokens without holding cpus or a worker) or "blocked"
+	# must be called while holding jobListLock
+	def __admitJob(self,job):
+		fits = self.__resourcesAvailable(job)
+		if not fits and not self.__mayPreempt(job):
+			return "blocked"
+		if not self.__licenseGranted(job):
+			return "license" if fits else "blocked"
+		if not fits and not self.__preemptJobs(job):
+			return "blocked"
+		self.__startQueuedJob(job)
+		return "started"
+
+	## __preemptJobs Private Method
+	# suspends lower priority running jobs (SIGSTOP of their process group) until an urgent job fits
+	# suspended jobs give up their cpus/gpus but keep their memory and license tokens
+	# returns True if the job can now be started
+	# must be called while holding jobListLock
+	def __preemptJobs(self,job):
+		if not self.__mayPreempt(job):
+			return False
+		preemption = self.serverConf["preemption"]
+		priority = int(job["jobData"]["priority"])
+		if len(self.runningJobs) >= len(self.workerThreads) or not self.__memoryAvailable(job):
+			return False # suspending jobs would not help
+
+		# lowest priority first, then the most recently started job first
+		maxSuspend = preemption["maxSuspend_minutes"]*60
+		candidates = []
+		for runningJob in self.runningJobs.values():
+			if runningJob["suspended"] is not None or runningJob["subProcess"] is None:
+				continue
+			if int(runningJob["job"]["jobData"]["priority"]) <= priority or runningJob["suspendedTime"] >= maxSuspend:
+				continue
+			candidates.append(runningJob)
+		candidates.sort(key=lambda runningJob: (int(runningJob["job"]["jobData"]["priority"]), runningJob["start"]), reverse=True)
+
+		[usedCPUs, usedGPUs] = self.__usedResources()
+		cpus = int(job["solverFlags"]["cpus"])
+		gpus = int(job["solverFlags"]["gpus"])
+		victims = []
+		for runningJob in candidates:
+			if usedCPUs + cpus <= self.cpus and usedGPUs + gpus <= self.gpus:
+				break
+			victims.append(runningJob)
+			usedCPUs = usedCPUs - int(runningJob["job"]["solverFlags"]["cpus"])
+			usedGPUs = usedGPUs - int(runningJob["job"]["solverFlags"]["gpus"])
+		if not victims or usedCPUs + cpus > self.cpus or usedGPUs + gpus > self.gpus:
+			return False # suspending every candidate would still not make room
+
+		for runningJob in victims:
+			try:
+				os.killpg(runningJob["subProcess"].pid, signal.SIGSTOP)
+			except OSError as e:
+				logging.error("unable to suspend job {0}: {1}".format(runningJob["job"]["jobData"]["jobID"],e))
+				return False
+			runningJob["suspended"] = datetime.datetime.now()
+			runningJob["job"]["jobData"]["status"] = "suspended"
+			runningJob["cores"] = None
+			self.coreAllocator.release(runningJob["job"]["jobData"]["jobID"])
+			logging.info("job {0} suspended for job {1}".format(runningJob["job"]["jobData"]["jobID"],job["jobData"]["jobID"]))
+			self.serializeJob(runningJob["job"])
+		return self.__resourcesAvailable(job)
+
+	## __mayPreempt Private Method
+	# True if the job is urgent enough to suspend lower priority jobs
+	def __mayPreempt(self,job):
+		preemption = self.serverConf["preemption"]
+		return preemption["enabled"] and self.opSystem == "Linux" and int(job["jobData"]["priority"]) <= preemption["preemptingPriority"]
+
+	## __resumeSuspendedJobs Private Method
+	# resumes suspended jobs (SIGCONT) once their cpus/gpus are free again and no more urgent job is queued
+	# a job is resumed regardless once it reaches the maximum suspend time
+	# must be called while holding jobListLock
+	def __resumeSuspendedJobs(self):
+		suspendedJobs = [runningJob for runningJob in self.runningJobs.values() if runningJob["suspended"] is not None]
+		if not suspendedJobs:
+			return
+		suspendedJobs.sort(key=lambda runningJob: runningJob["suspended"])
+
+		now = datetime.datetime.now()
+		maxSuspend = self.serverConf["preemption"]["maxSuspend_minutes"]*60
+		headJob = self.jobs.peek()
+		for runningJob in suspendedJobs:
+			job = runningJob["job"]
+			suspendedTime = runningJob["suspendedTime"] + (now - runningJob["suspended"]).total_seconds()
+			[usedCPUs, usedGPUs] = self.__usedResources()
+			fits = usedCPUs + int(job["solverFlags"]["cpus"]) <= self.cpus and usedGPUs + int(job["solverFlags"]["gpus"]) <= self.gpus
+			urgentJobQueued = headJob is not None and int(headJob["jobData"]["priority"]) < int(job["jobData"]["priority"])
+			if suspendedTime < maxSuspend and (not fits or urgentJobQueued):
+				continue
+
+			try:
+				os.killpg(runningJob["subProcess"].pid, signal.SIGCONT)
+			except OSError as e:
+				logging.error("unable to resume job {0}: {1}".format(job["jobData"]["jobID"],e))
+			runningJob["suspendedTime"] = suspendedTime
+			runningJob["suspended"] = None
+			if self.serverConf["scheduler"]["pinCores"]:
+				runningJob["cores"] = self.__assignCores(job)
+				self.__applyAffinity(runningJob, runningJob["cores"])
+			job["jobData"]["suspendedTime"] = int(suspendedTime)
+			job["jobData"]["status"] = "running"
+			if fits:
+				logging.info("job {0} resumed after {1:d} seconds suspended".format(job["jobData"]["jobID"],int(suspendedTime)))
+			else:
+				logging.info("job {0} resumed, it reached the maximum suspend time".format(job["jobData"]["jobID"]))
+			self.serializeJob(job)
+
+	## __runTime Private Method
+	# returns the seconds a running job has been running, not counting time spent suspended
+	def __runTime(self,runningJob):
+		now = datetime.datetime.now()
+		runTime = (now - runningJob["start"]).total_seconds() - runningJob["suspendedTime"]
+		if runningJob["suspended"] is not None:
+			runTime = runTime - (now - runningJob["suspended"]).total_seconds()
+		return max(0, runTime)
+
+	## __startQueuedJob Private Method
+	# starts a queued job, or the next task if the job is an array job
+	# must be called while holding jobListLock
+	def __startQueuedJob(self,job):
+		# the tokens granted to a queued job go to the job (or array task) that is started
+		self.licenseRequests.pop(job["jobData"]["jobID"],None)
+		ticket = self.licenseTickets.pop(job["jobData"]["jobID"],None)
+		if job["jobData"]["status"] == "queue (license wait)":
+			job["jobData"]["status"] = "queue"
+		if "array" in job["jobData"]:
+			job = self.__nextArrayTask(job)
+		if ticket is not None:
+			self.licenseTickets[job["jobData"]["jobID"]] = ticket
+		self.__startJob(self.jobs.take(job["jobData"]["jobID"]))
+
+	## __releaseWaitingJobs Private Method
+	# queues held jobs whose dependencies are satisfied and fails those whose dependencies never can be
+	# must be called while holding jobListLock
+	def __releaseWaitingJobs(self):
+		for job in self.jobs.held():
+			if job["jobData"]["status"] != "waiting":
+				continue
+			state = self.__dependencyState(job)
+			if state == "ready":
+				job["jobData"]["status"] = "queue"
+				self.jobs.push(job)
+				self.serializeJob(job)
+				logging.info("dependencies of job {0} satisfied, job added to queue".format(job["jobData"]["jobID"]))
+			elif state == "never":
+				job["jobData"]["status"] = "DEPENDENCY ERROR"
+				self.serializeJobHist(job)
+				self.jobs.remove(job["jobData"]["jobID"])
+				self.serializeJobRemoval(job["jobData"]["jobID"])
+				logging.info("dependencies of job {0} can never be satisfied, job removed from queue".format(job["jobData"]["jobID"]))
+
+	## __dependencyState Private Method
+	# returns "ready", "waiting" or "never" for the dependencies of a job
+	# dependency types: "ok" = parent completed, "fail" = parent failed, "any" = parent finished
+	def __dependencyState(self,job):
+		for dependency in job["jobData"].get("dependencies",[]):
+			host = dependency.get("host")
+			if host in (None, self.hostName):
+				state = self.__jobState(dependency["jobRef"])
+			else:
+				state = self.remoteJobStates.get((host, dependency["jobRef"]), "unreachable")
+
+			if state in ("active", "unreachable"):
+				return "waiting"
+			if state == "unknown":
+				logging.error("job {0} depends on unknown job {1}".format(job["jobData"]["jobID"],dependency["jobRef"]))
+				return "never"
+			if dependency["type"] == "ok" and state != "complete":
+				return "never"
+			if dependency["type"] == "fail" and state != "failed":
+				return "never"
+		return "ready"
+
+	## __jobState Private Method
+	# returns "active", "complete", "failed" or "unknown" for a jobID or for all jobs of a jobNumber
+	# must be called while holding jobListLock
+	def __jobState(self,jobRef):
+		if ":" in jobRef:
+			active = jobRef in self.jobs
+		else:
+			active = len(self.jobs.getByNumber(jobRef)) > 0
+		if active:
+			return "active"
 
-			# sort the job queue by priority
+		if ":" in jobRef:
+			states = self.jobStore.statuses(jobID=jobRef)
+		else:
+			states = self.jobStore.statuses(jobNumber=jobRef)
+		if not states:
+			return "unknown"
+		if all([state == "complete" for state in states]):
+			return "complete"
+		return "failed"
+
+	## getJobState Method
+	# returns "active", "complete", "failed" or "unknown" for a job ID (job#:jobName) or job number
+	# watcherHost is told through dependencyChanged as soon as an active job finishes
+	def getJobState(self,jobRef,watcherHost=None):
+		with self.jobListLock:
+			state = self.__jobState(jobRef)
+			if state == "active" and watcherHost is not None:
+				self.jobWatchers.setdefault(jobRef.split(":")[0], set()).add(watcherHost)
+		return state
+
+	## dependencyChanged Method
+	# called by other daemons when a job that jobs on this host depend on has finished
+	def dependencyChanged(self):
+		self.dependencyEvent.set()
+
+	## __dependencyWatcher Private Method
+	# polls the state of parent jobs on other hosts and wakes the dispatcher when one changes
+	def __dependencyWatcher(self):
+		while True:
+			with self.jobListLock:
+				remoteDependencies = set()
+				for job in self.jobs.held():
+					for dependency in job["jobData"].get("dependencies",[]):
+						if dependency.get("host") not in (None, self.hostName):
+							remoteDependencies.add((dependency["host"], dependency["jobRef"]))
+
+			changed = False
+			for host, jobRef in remoteDependencies:
+				try:
+					state = self.__connectToDaemon(host).getJobState(jobRef, self.hostName)
+				except Exception as e:
+					logging.error("unable to get state of job {0} from {1}: {2}".format(jobRef,host,e))
+					state = "unreachable"
+				if self.remoteJobStates.get((host, jobRef)) != state:
+					changed = True
+				self.remoteJobStates[(host, jobRef)] = state
+
+			for key in list(self.remoteJobStates.keys()):
+				if key not in remoteDependencies:
+					self.remoteJobStates.pop(key)
+
+			if changed:
+				self.__wakeDispatcher()
+
+			self.dependencyEvent.wait(self.serverConf["scheduler"]["dispatchInterval_seconds"])
+			self.dependencyEvent.clear()
+
+	## __notifyJobWatchers Private Method
+	# tells the daemons waiting on a job number that one of its jobs finished
+	def __notifyJobWatchers(self,jobNumber):
+		with self.jobListLock:
+			hosts = set(self.jobWatchers.get(jobNumber, set()))
+			if not self.jobs.getByNumber(jobNumber): # stop watching once every job of the job number has finished
+				self.jobWatchers.pop(jobNumber, None)
+		for host in hosts:
 			try:
-				self.jobs.sort(key=lambda i: (i["jobData"]["status"]!="running",i["jobData"]["priority"],i["jobData"]["submissionTime"]))
+				self.__connectToDaemon(host).dependencyChanged()
 			except Exception as e:
-				logging.error("unable to prioritize jobs list: {0}".format(e))
-			
-			self.serializeJobList()
+				logging.error("unable to notify {0} that job {1} finished: {2}".format(host,jobNumber,e))
+
+	## __connectToDaemon Private Method
+	# returns a Pyro proxy to the daemon running on another host
+	def __connectToDaemon(self,host):
+		nsHost = self.serverConf["nameServer"]["nameServerIP"]
+		nsPort = self.serverConf["nameServer"]["nameServerPort"]
+		ns = Pyro4.locateNS(host=nsHost,port=nsPort)
+		daemon = Pyro4.Proxy(ns.lookup("WAM.{0}.daemon".format(host)))
+		daemon._pyroTimeout = 30
+		return daemon
+
+	## __connectToLicenseBroker Private Method
+	# returns a Pyro proxy to the cluster wide license broker
+	def __connectToLicenseBroker(self):
+		nsHost = self.serverConf["nameServer"]["nameServerIP"]
+		nsPort = self.serverConf["nameServer"]["nameServerPort"]
+		ns = Pyro4.locateNS(host=nsHost,port=nsPort)
+		broker = Pyro4.Proxy(ns.lookup(self.serverConf["licenseBroker"]["brokerName"]))
+		broker._pyroTimeout = 30
+		return broker
+
+	## __licenseTokens Private Method
+	# returns the number of Abaqus license tokens a job needs (same conversion as wam -tc)
+	def __licenseTokens(self,job):
+		cores = job["solverFlags"]["cpus"] + job["solverFlags"]["gpus"]
+		return int(5*max(1,cores)**0.422)
+
+	## __licenseGranted Private Method
+	# True if the license broker granted the tokens of a queued job (or the broker is not used)
+	# otherwise asks the license watcher to request them; the job keeps waiting in the queue meanwhile
+	# must be called while holding jobListLock
+	def __licenseGranted(self,job):
+		if not self.serverConf["licenseBroker"]["useLicenseBroker"]:
+			return True
+		jobID = job["jobData"]["jobID"]
+		request = self.licenseRequests.get(jobID)
+		if request is None:
+			self.licenseRequests[jobID] = {"tokens":self.__licenseTokens(job), "granted":False}
+			job["jobData"]["status"] = "queue (license wait)"
+			self.serializeJob(job)
+			self.licenseEvent.set()
+			return False
+		return request["granted"]
+
+	## __releaseLicense Private Method
+	# gives the license tokens of a job back to the license broker
+	def __releaseLicense(self,job):
+		with self.jobListLock:
+			ticket = self.licenseTickets.pop(job["jobData"]["jobID"],None)
+		if ticket is not None:
+			self.__releaseTicket(job["jobData"]["jobID"], ticket)
 
-		threading.Thread(target=self.__runJob).start()
+	## __releaseTicket Private Method
+	# gives the tokens of a broker ticket back (or withdraws a waiting request)
+	def __releaseTicket(self,jobID,ticket):
+		try:
+			self.__connectToLicenseBroker().releaseTokens(ticket)
+			logging.info("job {0} released its license tokens".format(jobID))
+		except Exception as e:
+			logging.error("unable to release license tokens of job {0}, the broker lease will expire: {1}".format(jobID,e))
+
+	## __licenseWatcher Private Method
+	# requests and polls the tokens of queued jobs waiting for licenses and wakes the dispatcher once they are granted,
+	# gives back the tokens of jobs that left the queue before they started and renews the leases of the tickets held
+	def __licenseWatcher(self):
+		broker = self.serverConf["licenseBroker"]
+		lastRenewal = time.time()
+		while True:
+			self.licenseEvent.wait(broker["pollInterval_seconds"])
+			self.licenseEvent.clear()
 
-	## __runJob Private Method
-	# submits each job individually
-	def __runJob(self):
-		with self.CPULock:
-			
-			job = self.jobs[0]
-			jobDirectory = job["jobData"]["jobDirectory"]
-
-			# check if job has been killed
-			if "killed" in job["jobData"]["status"]:
+			with self.jobListLock:
+				for jobID in [jobID for jobID in self.licenseRequests if jobID not in self.jobs]:
+					del self.licenseRequests[jobID] # killed or failed while waiting
+				orphans = [(jobID, ticket) for jobID, ticket in self.licenseTickets.items() if jobID not in self.licenseRequests and jobID not in self.runningJobs]
+				for jobID, ticket in orphans:
+					del self.licenseTickets[jobID]
+				pending = [(jobID, request["tokens"], self.licenseTickets.get(jobID)) for jobID, request in self.licenseRequests.items() if not request["granted"]]
+
+			for jobID, ticket in orphans:
+				self.__releaseTicket(jobID, ticket)
+			for jobID, tokens, ticket in pending:
+				self.__pollLicense(jobID, tokens, ticket)
+
+			if time.time() - lastRenewal >= broker["leaseRenewal_seconds"]:
+				lastRenewal = time.time()
+				with self.jobListLock:
+					tickets = list(self.licenseTickets.values())
+				if not tickets:
+					continue
+				try:
+					unknown = self.__connectToLicenseBroker().renewLeases(self.hostName, tickets)
+					for ticket in unknown:
+						logging.error("license broker no longer knows ticket {0}".format(ticket))
+				except Exception as e:
+					logging.error("unable to renew license leases: {0}".format(e))
+
+	## __pollLicense Private Method
+	# requests the tokens of a queued job (again if the broker lost the request) and records whether they were granted
+	# a job needing more tokens than the whole pool is failed; if the broker cannot be reached the job runs without it
+	def __pollLicense(self,jobID,tokens,ticket):
+		try:
+			broker = self.__connectToLicenseBroker()
+			state = "unknown" if ticket is None else broker.checkTokens(ticket)
+			if state == "unknown":
+				if ticket is not None: # lease expired, ask again
+					logging.error("license broker lost the request of job {0}, requesting tokens again".format(jobID))
+				ticket = broker.requestTokens(self.hostName, jobID, tokens)
+				state = broker.checkTokens(ticket)
+		except ValueError as e: # more tokens than the pool holds; the job could never be granted
+			logging.error("job {0} can never get its {1} license tokens: {2}".format(jobID,tokens,e))
+			with self.jobListLock:
+				self.__failLicenseJob(jobID)
+			return
+		except Exception as e:
+			logging.error("unable to request {0} license tokens for job {1}, running without the license broker: {2}".format(tokens,jobID,e))
+			ticket = None
+			state = "granted"
+
+		with self.schedulerCondition:
+			request = self.licenseRequests.get(jobID)
+			if request is not None:
+				if ticket is not None:
+					self.licenseTickets[jobID] = ticket
+				if state == "granted":
+					request["granted"] = True
+					logging.info("job {0} was granted {1} license tokens".format(jobID,tokens))
+					self.schedulerCondition.notify()
 				return
+		if ticket is not None: # the job left the queue while its tokens were requested
+			self.__releaseTicket(jobID, ticket)
+
+	## __failLicenseJob Private Method
+	# moves a queued job whose license tokens can never be granted to history as "LICENSE ERROR"
+	# must be called while holding jobListLock
+	def __failLicenseJob(self,jobID):
+		self.licenseRequests.pop(jobID,None)
+		job = self.jobs.get(jobID)
+		if job is None or not self.jobs.isQueued(jobID):
+			return
+		job["jobData"]["status"] = "LICENSE ERROR"
+		self.serializeJobHist(job)
+		self.jobs.remove(jobID)
+		self.serializeJobRemoval(jobID)
+		logging.info("job {0} needs more license tokens than the broker has, job removed from queue".format(jobID))
+
+	## __backfillJobs Private Method
+	# EASY backfill: reserves the earliest start time of the blocked head job from the estimated
+	# end times of the running jobs, then starts lower priority jobs that either finish before
+	# that reservation or only use cores/gpus the head job will not need
+	# must be called while holding jobListLock
+	def __backfillJobs(self,headJob):
+		headCPUs = int(headJob["solverFlags"]["cpus"])
+		headGPUs = int(headJob["solverFlags"]["gpus"])
+		[usedCPUs, usedGPUs] = self.__usedResources()
+		freeCPUs = self.cpus - usedCPUs
+		freeGPUs = self.gpus - usedGPUs
+
+		# find the reserved start time (shadow time) of the head job
+		endTimes = []
+		for runningJob in self.runningJobs.values():
+			if runningJob["suspended"] is not None:
+				continue # suspended jobs hold no cpus/gpus
+			remaining = max(0, runningJob["estimate"] - self.__runTime(runningJob))
+			endTimes.append((remaining, int(runningJob["job"]["solverFlags"]["cpus"]), int(runningJob["job"]["solverFlags"]["gpus"])))
+		endTimes.sort()
+
+		shadowTime = None
+		for remaining, cpus, gpus in endTimes:
+			freeCPUs = freeCPUs + cpus
+			freeGPUs = freeGPUs + gpus
+			if freeCPUs >= headCPUs and freeGPUs >= headGPUs:
+				shadowTime = remaining
+				break
+
+		if shadowTime is None: # head job is wider than the machine and needs it empty
+			shadowTime = endTimes[-1][0] if endTimes else 0
+			extraCPUs = 0
+			extraGPUs = 0
+		else:
+			extraCPUs = freeCPUs - headCPUs
+			extraGPUs = freeGPUs - headGPUs
+
+		# start any lower priority job that cannot delay the head job
+		queuedJobs = self.jobs.queued()
+		headIndex = [job["jobData"]["jobID"] for job in queuedJobs].index(headJob["jobData"]["jobID"])
+		for job in queuedJobs[headIndex+1:]:
+			if not self.__resourcesAvailable(job):
+				continue
+			cpus = int(job["solverFlags"]["cpus"])
+			gpus = int(job["solverFlags"]["gpus"])
+			if self.__estimateRunTime(job) <= shadowTime:
+				if not self.__licenseGranted(job):
+					continue
+			elif cpus <= extraCPUs and gpus <= extraGPUs:
+				if not self.__licenseGranted(job):
+					continue
+				extraCPUs = extraCPUs - cpus
+				extraGPUs = extraGPUs - gpus
+			else:
+				continue
+			logging.info("backfilling job {0} ahead of job {1}".format(job["jobData"]["jobID"],headJob["jobData"]["jobID"]))
+			self.__startQueuedJob(job)
+
+	## __estimateRunTime Private Method
+	# returns the expected run time of a job in seconds
+	# uses the wall time requested by the user, then the runtime predictor, then the run time of
+	# previous runs of the same job, then the default run time from serverConf.json
+	def __estimateRunTime(self,job):
+		wallTime = job["advanced"].get("wallTime")
+		if wallTime is not None:
+			return float(wallTime)*3600
+
+		prediction = self.__predictJob(job)
+		if prediction["wallTime"] is not None:
+			return prediction["wallTime"]
+
+		runTimes = self.jobStore.runTimes(job["jobData"]["jobName"], job["solverFlags"]["cpus"])
+		if runTimes:
+			return float(sum(runTimes))/len(runTimes)
+
+		return self.serverConf["scheduler"]["defaultRunTime_hours"]*3600
+
+	## __resourcesAvailable Private Method
+	# checks if the requested cpus and gpus of a job fit next to the running jobs
+	# a job wider than the machine is allowed to run once the machine is empty
+	def __resourcesAvailable(self,job):
+		if len(self.runningJobs) >= len(self.workerThreads):
+			return False # every worker is busy
+		if not all([runningJob["suspended"] is not None for runningJob in self.runningJobs.values()]):
+			# jobs wider than the machine may still start on an idle node; memory is checked regardless
+			[usedCPUs, usedGPUs] = self.__usedResources()
+			cpus = int(job["solverFlags"]["cpus"])
+			gpus = int(job["solverFlags"]["gpus"])
+			if usedCPUs + cpus > self.cpus or usedGPUs + gpus > self.gpus:
+				return False
+		return self.__memoryAvailable(job)
+
+	## __memoryAvailable Private Method
+	# checks if the memory estimate of a job fits in the live available memory, minus the memory
+	# running jobs are still expected to allocate and the configured headroom
+	def __memoryAvailable(self,job):
+		if not self.serverConf["memory"]["admissionControl"]:
+			return True
+		available = virtual_memory().available
+		reserved = 0
+		for runningJob in self.runningJobs.values():
+			reserved = reserved + max(0, runningJob["memoryEstimate"] - runningJob["memory"])
+		headroom = self.serverConf["memory"]["headroom_GB"]*1024**3
+		required = self.__memoryEstimate(job)
+		if required + reserved + headroom <= available:
+			return True
+		if job["jobData"].get("memoryHeld") != True:
+			job["jobData"]["memoryHeld"] = True
+			logging.info("job {0} held, needs {1:.1f} Gb but only {2:.1f} Gb is free".format(job["jobData"]["jobID"],required/1024.0**3,(available-reserved-headroom)/1024.0**3))
+		return False
+
+	## __memoryEstimate Private Method
+	# returns the expected peak memory of a job in bytes
+	# uses the memory requested by the user, then the runtime predictor, then the input file size
+	def __memoryEstimate(self,job):
+		memory = job["advanced"].get("memory")
+		if memory is not None:
+			return int(float(memory)*1024**3)
+
+		prediction = self.__predictJob(job)
+		if prediction["peakMemory"] is not None:
+			return int(prediction["peakMemory"])
+
+		return inputFileMemoryEstimate(job["jobData"]["jobFile"], self.serverConf["memory"]["bytesPerInputByte"])
+
+	## __usedResources Private Method
+	# returns the cpus and gpus held by running jobs; suspended jobs do not hold any
+	def __usedResources(self):
+		usedCPUs = 0
+		usedGPUs = 0
+		for runningJob in self.runningJobs.values():
+			if runningJob["suspended"] is not None:
+				continue
+			usedCPUs = usedCPUs + int(runningJob["job"]["solverFlags"]["cpus"])
+			usedGPUs = usedGPUs + int(runningJob["job"]["solverFlags"]["gpus"])
+		return [usedCPUs, usedGPUs]
+
+	## __startJob Private Method
+	# reserves resources for a job and hands it to the worker pool
+	# attached is the solver of a job re-attached after a daemon restart; the worker then only monitors it
+	# must be called while holding jobListLock
+	def __startJob(self,job,attached=None):
+		jobID = job["jobData"]["jobID"]
+		job["jobData"]["status"] = "running"
+		if "arrayID" in job["jobData"]:
+			arrayJob = self.jobs.get(job["jobData"]["arrayID"])
+			arrayJob["jobData"]["array"]["taskStates"][job["jobData"]["jobName"]] = "running"
+			self.serializeJob(arrayJob)
+		self.runningJobs[jobID] = {"job":job, "subProcess":attached, "start":datetime.datetime.now(), "estimate":self.__estimateRunTime(job),
+			"peakMemory":0, "memory":0, "memoryEstimate":self.__memoryEstimate(job), "suspended":None, "suspendedTime":0,
+			"cores":self.__assignCores(job)}
+		if attached is not None:
+			self.runningJobs[jobID]["start"] = datetime.datetime.fromtimestamp(job["jobData"]["startTimestamp"])
+			self.runningJobs[jobID]["suspendedTime"] = job["jobData"].get("suspendedTime",0)
+			self.__applyAffinity(self.runningJobs[jobID], self.runningJobs[jobID]["cores"])
+		job["jobData"].pop("memoryHeld",None)
+		self.serializeJob(job)
+		logging.info("job {0} started, using {1} of {2} cpus".format(jobID,self.__usedResources()[0],self.cpus))
+		self.workQueue.put(job)
+
+	## __assignCores Private Method
+	# picks the cores a job is pinned to; returns None if pinning is off or not enough cores are free
+	def __assignCores(self,job):
+		if not self.serverConf["scheduler"]["pinCores"] or self.opSystem != "Linux":
+			return None
+		cores = self.coreAllocator.allocate(job["jobData"]["jobID"], int(job["solverFlags"]["cpus"]))
+		if cores is not None:
+			logging.info("job {0} pinned to cores {1} (NUMA node {2})".format(job["jobData"]["jobID"],formatCPUList(cores),
+				formatCPUList(self.coreAllocator.nodesOf(cores))))
+		return cores
+
+	## __applyAffinity Private Method
+	# pins every thread of a running job's process tree to the given cores (all usable cores if None)
+	def __applyAffinity(self,runningJob,cores):
+		if cores is None:
+			cores = usableCores()
+		try:
+			parent = psutil.Process(runningJob["subProcess"].pid)
+			for process in [parent] + parent.children(recursive=True):
+				for thread in process.threads():
+					setAffinity(thread.id, cores)
+		except (psutil.Error, OSError) as e:
+			logging.error("unable to set cpu affinity of job {0}: {1}".format(runningJob["job"]["jobData"]["jobID"],e))
+
+	## __finishJob Private Method
+	# releases the resources of a job and wakes the dispatcher to start any queued jobs that now fit
+	def __finishJob(self,job):
+		self.__releaseLicense(job) # in case the job ended before its tokens were given back
+		with self.schedulerCondition:
+			self.runningJobs.pop(job["jobData"]["jobID"],None)
+			self.coreAllocator.release(job["jobData"]["jobID"])
+			self.schedulerCondition.notify()
+		self.__notifyJobWatchers(job["jobData"]["jobNumber"])
 
-			# preliminary job submission stuff	
-			self.start = datetime.datetime.now() # start a clock
-			with self.jobListLock:
-				job["jobData"]["status"] = "running"
-				self.serializeJobList()
-			os.chdir(jobDirectory)
-			cwd = jobDirectory
-
-			# create log files
-			stdErrorFile = os.path.join(jobDirectory, "error.log")
-			stdOutFile = os.path.join(jobDirectory, "out.log")
-
-			# gather job information
-			clientName = job["jobData"]["clientName"]
-			cpus = job["solverFlags"]["cpus"]
-			gpus = job["solverFlags"]["gpus"]
-			jobName = job["jobData"]["jobName"]
-			jobID = job["jobData"]["jobID"]
-			solver = job["InternalUse"]["jsonFileType"]
-
-			self.currentJobID = jobID
-			self.currentJobNumber = job["jobData"]["jobNumber"]
-
-			# compile command line options
-			cmd = []
-			cmd.append(solver)
-			cmd.append("job={0}".format(jobName))
-			for key in job["solverFlags"].keys():
-				if job["solverFlags"][key] is None:
-					cmd.append(key)
-				else:
-					cmd.append("{0}={1}".format(key,job["solverFlags"][key]))
-
-			if self.opSystem == "Linux":
-				import pwd
-				# define user id, environment variables, etc.
-				currentUserID = pwd.getpwnam(getpass.getuser()).pw_uid 
-				pw_record = pwd.getpwnam(getpass.getuser())
-				user_name      = pw_record.pw_name
-				user_home_dir  = pw_record.pw_dir
-				user_uid       = pw_record.pw_uid
-				user_gid       = pw_record.pw_gid
-				env = os.environ.copy()
-				env[ 'HOME'     ]  = user_home_dir
-				env[ 'LOGNAME'  ]  = user_name
-				env[ 'PWD'      ]  = jobDirectory
-				env[ 'USER'     ]  = user_name
-				env[ 'PATH'		]  = '/var/DassaultSystemes/SIMULIA/Commands:/sbin:/bin:/usr/sbin:/usr/bin'
-
-				# spawn subprocess as a given user
-				def demote(user_uid, user_gid):
-					def result():
-						os.setgid(user_gid)
-						os.setuid(user_uid)
-						os.setsid()
-					return result
-
-				# Run the job
-				with open(stdOutFile,"a+") as out, open(stdErrorFile,"a+") as err:
-					os.chown(stdOutFile, currentUserID, -1)
-					os.chown(stdErrorFile, currentUserID, -1)
+	## __runJob Private Method
+	# submits each job individually
+	def __runJob(self,job):
+		try:
+			self.__executeJob(job)
+		except Exception as e:
+			logging.error("unexpected error while running job {0}: {1}".format(job["jobData"]["jobID"],e))
+		finally:
+			self.__finishJob(job)
+
+	## __executeJob Private Method
+	# runs the solver for a single job and records the result
+	def __executeJob(self,job):
+		jobDirectory = job["jobData"]["jobDirectory"]
+		runningJob = self.runningJobs[job["jobData"]["jobID"]]
+
+		# check if job has been killed
+		if "killed" in job["jobData"]["status"]:
+			return
+
+		cwd = jobDirectory
+
+		# create log files
+		stdErrorFile = os.path.join(jobDirectory, "error.log")
+		stdOutFile = os.path.join(jobDirectory, "out.log")
+
+		# gather job information
+		clientName = job["jobData"]["clientName"]
+		cpus = job["solverFlags"]["cpus"]
+		gpus = job["solverFlags"]["gpus"]
+		jobName = job["jobData"]["jobName"]
+		jobID = job["jobData"]["jobID"]
+		solver = job["InternalUse"]["jsonFileType"]
+
+		# compile command line options
+		cmd = []
+		cmd.append(solver)
+		cmd.append("job={0}".format(jobName))
+		for key in job["solverFlags"].keys():
+			if job["solverFlags"][key] is None:
+				cmd.append(key)
+			else:
+				cmd.append("{0}={1}".format(key,job["solverFlags"][key]))
+
+		if self.opSystem == "Linux":
+			import pwd
+			# define user id, environment variables, etc.
+			currentUserID = pwd.getpwnam(getpass.getuser()).pw_uid 
+			pw_record = pwd.getpwnam(getpass.getuser())
+			user_name      = pw_record.pw_name
+			user_home_dir  = pw_record.pw_dir
+			user_uid       = pw_record.pw_uid
+			user_gid       = pw_record.pw_gid
+			env = os.environ.copy()
+			env[ 'HOME'     ]  = user_home_dir
+			env[ 'LOGNAME'  ]  = user_name
+			env[ 'PWD'      ]  = jobDirectory
+			env[ 'USER'     ]  = user_name
+			env[ 'PATH'		]  = '/var/DassaultSystemes/SIMULIA/Commands:/sbin:/bin:/usr/sbin:/usr/bin'
+
+			# spawn subprocess as a given user, pinned to the job's cores
+			def demote(user_uid, user_gid, cores):
+				def result():
+					if cores:
+						setAffinity(0, cores)
+					os.setgid(user_gid)
+					os.setuid(user_uid)
+					os.setsid()
+				return result
+
+			# Run the job
+			with open(stdOutFile,"a+") as out, open(stdErrorFile,"a+") as err:
+				os.chown(stdOutFile, currentUserID, -1)
+				os.chown(stdErrorFile, currentUserID, -1)
+				try:
+					if runningJob["subProcess"] is None:
+						logging.info("job {0} has been submitted for analysis".format(jobID))
+						runningJob["subProcess"] = subprocess.Popen(cmd, stdout=out, stderr=err, preexec_fn=demote(user_uid,user_gid,runningJob["cores"]), cwd=cwd, env=env)
+						self.__recordSolverProcess(runningJob)
+					self.__waitForJob(runningJob)
+					logging.info("job {0} has completed".format(jobID))
+
+				except Exception as e:
+
+					cmd = " ".join(cmd)
+					err.write("*** ERROR: command line error\n")
+					err.write(str(e)+"\n")
+					err.write("Error encountered while executing: {0} \n".format(cmd))
+					err.write("\n")
+
+					logging.error("error running Abaqus: {0}".format(jobID))
+					logging.error("error encountered while executing: {0}".format(cmd))
+
+				# convert unix2dos
+				fileTypes = [jobName+".fil",jobName+".sta",jobName+".msg",jobName+".dat"]
+				for fileType in fileTypes:
+					cmd = ["unix2dos","-f","-o " + fileType]
 					try:
-						logging.info("job {0} has been submitted for analysis".format(self.currentJobID))
-						self.currentSubProcess = subprocess.Popen(cmd, stdout=out, stderr=err, preexec_fn=demote(user_uid,user_gid), cwd=cwd, env=env)
-						self.currentSubProcess.wait()
-						self.currentSubProcess = None
-						logging.info("job {0} has completed".format(self.currentJobID))
-
+						p = subprocess.Popen(cmd,cwd=cwd)
+						p.wait()
+						logging.info("converted file {0} using unix2dos".format(fileType))
 					except Exception as e:
-
-						self.currentSubProcess = None
-
-						cmd = " ".join(cmd)
-						err.write("*** ERROR: command line error\n")
-						err.write(str(e)+"\n")
-						err.write("Error encountered while executing: {0} \n".format(cmd))
-						err.write("\n")
-
-						logging.error("error running Abaqus: {0}".format(self.currentJobID))
-						logging.error("error encountered while executing: {0}".format(cmd))
-
-					# convert unix2dos
-					fileTypes = [jobName+".fil",jobName+".sta",jobName+".msg",jobName+".dat"]
-					for fileType in fileTypes:
-						cmd = ["unix2dos","-f","-o " + fileType]
-						try:
-							self.currentSubProcess = subprocess.Popen(cmd,cwd=cwd)
-							self.currentSubProcess.wait()
-							self.currentSubProcess = None
-							logging.info("converted file {0} using unix2dos".format(fileType))
-						except Exception as e:
-							logging.error("unable to convert file {0} using unix2dos: {1}".format(fileType,e))
-
-					# send email on completion (if requested)
-					if job["advanced"]["sendEmailTo"] != "None":
-						message = None
-
-						# get the msg file contents:
-						if os.path.exists(jobName+".msg") == False:
-							out = open("{0}.msg".format(jobName),"w")
-							out.write("*** no message file exists for job {0} ***\r\n\n".format(jobName))
-							out.write("*** this is probably due to an input file error ***\r\n\n".format(jobName))
-							out.close()
-
-						with open("{0}.msg".format(jobName),"r") as out:
-							# get server data:
-							SMTPServer = self.serverConf["emailServer"]["SMTPServer"]
-							SMTPPort   = self.serverConf["emailServer"]["SMTPPort"]
-							username   = self.serverConf["emailServer"]["username"]
-							password   = self.serverConf["emailServer"]["password"]
-							emailInfoEncrypted = self.serverConf["emailServer"]["emailInfoEncrypted"]
-							useStarttls   = self.serverConf["emailServer"]["useStarttls"]
-
-							if emailInfoEncrypted:
-								SMTPServer = base64.b64decode(SMTPServer)
-								SMTPPort   = base64.b64decode(SMTPPort)
-								username   = base64.b64decode(username)
-								password   = base64.b64decode(password)
-
-							data  = out.readlines()
-							logFileLines = data[-100::]
-							message = []
-							message.append("Finished running: {0}.inp \r\n\nTo retrieve your files use the command: wam -get {1} -n {2} \r\n\n *** The end of {0}.msg reads: \r\n\r\n".format(jobName, jobID, self.hostName))
-							for line in logFileLines:
+						logging.error("unable to convert file {0} using unix2dos: {1}".format(fileType,e))
+
+				# send email on completion (if requested)
+				if job["advanced"]["sendEmailTo"] != "None":
+					message = None
+
+					# get the msg file contents:
+					msgFile = os.path.join(jobDirectory,"{0}.msg".format(jobName))
+					staFile = os.path.join(jobDirectory,"{0}.sta".format(jobName))
+					if os.path.exists(msgFile) == False:
+						out = open(msgFile,"w")
+						out.write("*** no message file exists for job {0} ***\r\n\n".format(jobName))
+						out.write("*** this is probably due to an input file error ***\r\n\n".format(jobName))
+						out.close()
+
+					with open(msgFile,"r") as out:
+						# get server data:
+						SMTPServer = self.serverConf["emailServer"]["SMTPServer"]
+						SMTPPort   = self.serverConf["emailServer"]["SMTPPort"]
+						username   = self.serverConf["emailServer"]["username"]
+						password   = self.serverConf["emailServer"]["password"]
+						emailInfoEncrypted = self.serverConf["emailServer"]["emailInfoEncrypted"]
+						useStarttls   = self.serverConf["emailServer"]["useStarttls"]
+
+						if emailInfoEncrypted:
+							SMTPServer = base64.b64decode(SMTPServer)
+							SMTPPort   = base64.b64decode(SMTPPort)
+							username   = base64.b64decode(username)
+							password   = base64.b64decode(password)
+
+						data  = out.readlines()
+						logFileLines = data[-100::]
+						message = []
+						message.append("Finished running: {0}.inp \r\n\nTo retrieve your files use the command: wam -get {1} -n {2} \r\n\n *** The end of {0}.msg reads: \r\n\r\n".format(jobName, jobID, self.hostName))
+						for line in logFileLines:
+							message.append(line.strip() + "\r\n")
+
+					# get the status file contents if the file exists:
+					if os.path.isfile(staFile):
+						with open(staFile,"r") as sta:
+							data  = sta.readlines()
+							staFileLines = data[-100::]
+							message.append("\r\n *** The end of {0}.sta reads: \r\n\r\n".format(jobName))
+							for line in staFileLines:
 								message.append(line.strip() + "\r\n")
 
-						# get the status file contents if the file exists:
-						if os.path.isfile("{0}.sta".format(jobName)):
-							with open("{0}.sta".format(jobName),"r") as sta:
-								data  = sta.readlines()
-								staFileLines = data[-100::]
-								message.append("\r\n *** The end of {0}.sta reads: \r\n\r\n".format(jobName))
-								for line in staFileLines:
-									message.append(line.strip() + "\r\n")
-
-						if message is not None:
-							message = "".join(message)
-							recipient = job["advanced"]["sendEmailTo"]
-							subject = "WAM Run Complete ({0})".format(self.currentJobID)
-							sendEmailMsg(message, subject, recipient, username, password, SMTPServer, SMTPPort, useStarttls, logging)
-
-			elif self.opSystem == "Windows":
-				with open(stdOutFile,"a+") as out, open(stdErrorFile,"a+") as err:
-					try:
-						cmd[0] = "C:\\SIMULIA\\Commands\\abaqus.bat"
-						self.currentSubProcess = subprocess.Popen(cmd, stdout=out, stderr=err, cwd=cwd)
-						self.currentSubProcess.wait()
-						logging.info("job {0} has completed".format(self.currentJobID))					
-						self.currentSubProcess = None
-					except:
-						cmd = " ".join(cmd)
-						err.write("*** ERROR: command line error\n")
-						err.write(str(e)+"\n")
-						err.write("Error encountered while executing: {0} \n".format(cmd))
-						err.write("\n")
-
-						logging.error("error running Abaqus: {0}".format(self.currentJobID))
-						logging.error("error encountered while executing: {0} \n".format(cmd))
-
-			# post job cleanup
-			self.currentJobID = None
-			self.currentJobNumber = None
-			self.currentSubProcess = None
-
-			# check if job has been killed
-			if "killed" in job["jobData"]["status"]:
-				return
-
-			# check if job failed
-			with open("out.log") as log:
-				if "errors" in log.read():
-					with self.jobListLock:
-						job["jobData"]["status"] = "JOB ERROR"
-				else: 
-					with self.jobListLock:
-						job["jobData"]["status"] = "complete"
+					if message is not None:
+						message = "".join(message)
+						recipient = job["advanced"]["sendEmailTo"]
+						subject = "WAM Run Complete ({0})".format(jobID)
+						sendEmailMsg(message, subject, recipient, username, password, SMTPServer, SMTPPort, useStarttls, logging)
+
+		elif self.opSystem == "Windows":
+			with open(stdOutFile,"a+") as out, open(stdErrorFile,"a+") as err:
+				try:
+					cmd[0] = "C:\\SIMULIA\\Commands\\abaqus.bat"
+					runningJob["subProcess"] = subprocess.Popen(cmd, stdout=out, stderr=err, cwd=cwd)
+					self.__waitForJob(runningJob)
+					logging.info("job {0} has completed".format(jobID))
+				except Exception as e:
+					cmd = " ".join(cmd)
+					err.write("*** ERROR: command line error\n")
+					err.write(str(e)+"\n")
+					err.write("Error encountered while executing: {0} \n".format(cmd))
+					err.write("\n")
+
+					logging.error("error running Abaqus: {0}".format(jobID))
+					logging.error("error encountered while executing: {0} \n".format(cmd))
+
+		# give the license tokens back as soon as the solver exits
+		self.__releaseLicense(job)
+
+		# check if job has been killed
+		if "killed" in job["jobData"]["status"]:
+			return
+
+		# check if job failed
+		with open(stdOutFile) as log:
+			if "errors" in log.read():
+				with self.jobListLock:
+					job["jobData"]["status"] = "JOB ERROR"
+			else: 
+				with self.jobListLock:
+					job["jobData"]["status"] = "complete"
+
+		job["jobData"]["runTime"] = int(self.__runTime(runningJob))
+		job["jobData"]["suspendedTime"] = int(runningJob["suspendedTime"])
+		job["jobData"]["peakMemory"] = runningJob["peakMemory"]
+
+		# train the runtime predictor on successful runs
+		if job["jobData"]["status"] == "complete":
+			try:
+				self.predictor.update(self.hostName, solver, self.__jobFeatures(job), cpus, job["jobData"]["runTime"], job["jobData"]["peakMemory"])
+			except Exception as e:
+				logging.error("unable to update runtime predictor with job {0}: {1}".format(jobID,e))
 
-			# add job to job history
-			self.jobHist.insert(0,job)
-			self.serializeJobHist()
+		with self.jobListLock:
+			# add job to job history; array tasks are recorded in their array job instead
+			if "arrayID" in job["jobData"]:
+				self.__arrayTaskFinished(job)
+			else:
+				self.serializeJobHist(job)
 
 			# remove job from jobs list
-			if job in self.jobs:
-				indexToRemove = self.jobs.index(job)
-				removedItem = self.jobs.pop(indexToRemove)
-				self.serializeJobList()
+			if self.jobs.remove(job["jobData"]["jobID"]) is not None:
+				self.serializeJobRemoval(job["jobData"]["jobID"])
+
+	## __recordSolverProcess Private Method
+	# journals the pid and start time of a job's solver so a restarted daemon can re-attach to it
+	def __recordSolverProcess(self,runningJob):
+		job = runningJob["job"]
+		try:
+			createTime = psutil.Process(runningJob["subProcess"].pid).create_time()
+		except psutil.Error:
+			createTime = None
+		with self.jobListLock:
+			job["jobData"]["pid"] = runningJob["subProcess"].pid
+			job["jobData"]["pidCreateTime"] = createTime
+			job["jobData"]["startTimestamp"] = time.mktime(runningJob["start"].timetuple())
+			if job["jobData"]["jobID"] in self.jobs:
+				self.serializeJob(job)
+
+	## __waitForJob Private Method
+	# waits for the solver to exit while recording the memory of its process tree
+	# replaces the job's memory estimate with the Abaqus estimate from the .dat file once it is written
+	def __waitForJob(self,runningJob):
+		subProcess = runningJob["subProcess"]
+		datFile = os.path.join(runningJob["job"]["jobData"]["jobDirectory"],runningJob["job"]["jobData"]["jobName"]+".dat")
+		datEstimate = None
+		while subProcess.poll() is None:
+			try:
+				parent = psutil.Process(subProcess.pid)
+				rss = parent.memory_info().rss
+				for child in parent.children(recursive=True):
+					rss = rss + child.memory_info().rss
+				runningJob["memory"] = rss
+				runningJob["peakMemory"] = max(runningJob["peakMemory"], rss)
+			except psutil.Error:
+				pass
+
+			if datEstimate is None:
+				try:
+					datEstimate = datMemoryEstimate(datFile)
+				except Exception as e:
+					logging.error("unable to read memory estimate from {0}: {1}".format(datFile,e))
+					datEstimate = 0
+				if datEstimate:
+					runningJob["memoryEstimate"] = datEstimate
+					logging.info("job {0} memory estimate from .dat file: {1:.1f} Gb".format(runningJob["job"]["jobData"]["jobID"],datEstimate/1024.0**3))
+
+			time.sleep(2)
+
+	## __jobFeatures Private Method
+	# returns the input file features of a job; scanned once and cached in the job record
+	def __jobFeatures(self,job):
+		if "features" not in job["jobData"]:
+			job["jobData"]["features"] = inputFileFeatures(job["jobData"]["jobFile"])
+		return job["jobData"]["features"]
+
+	## __predictJob Private Method
+	# predicts wall time (seconds) and peak memory (bytes) of a job
+	def __predictJob(self,job):
+		try:
+			return self.predictor.predict(self.hostName, job["InternalUse"]["jsonFileType"], self.__jobFeatures(job), job["solverFlags"]["cpus"])
+		except Exception as e:
+			logging.error("unable to predict job {0}: {1}".format(job["jobData"]["jobID"],e))
+			return {"wallTime":None, "peakMemory":None, "samples":0}
+
+	## predictJob Method
+	# returns the predicted wall time (seconds) and peak memory (bytes) of a queued, running or finished job
+	def predictJob(self,jobID):
+		job = self.jobs.get(jobID)
+		if job is None:
+			histJobs = self.jobStore.query(jobID=jobID, limit=1)
+			job = histJobs[0] if histJobs else None
+		if job is None:
+			return "*** ERROR: invalid job ID: {0}".format(jobID)
+		return self.__predictJob(job)
 
 	## killJob Method
 	# looks through all jobs in queue and kills requested jobs
@@ -369,31 +1385,40 @@ class serverDaemon(object):
 		msgs = []
 
 		with self.jobListLock:
-			for job in self.jobs[::-1]: # iterate backwards so we dont skip jobs
-				if jobName == None:
-					jobRef = job["jobData"]["jobNumber"]
-					curJobRef = self.currentJobNumber
+			if jobName == None:
+				jobsToKill = self.jobs.getByNumber(jobNumber)
+			elif jobID in self.jobs:
+				jobsToKill = [self.jobs.get(jobID)]
+				if "array" in jobsToKill[0]["jobData"]: # killing an array job kills all of its tasks
+					jobsToKill.extend([job for job in self.jobs.getByNumber(jobNumber) if job["jobData"].get("arrayID") == jobID])
+			else:
+				jobsToKill = []
+
+			for job in jobsToKill:
+				job["jobData"]["status"] = "killed by %s"%(username)
+				if "arrayID" in job["jobData"]:
+					self.__arrayTaskFinished(job)
 				else:
-					jobRef = job["jobData"]["jobID"]
-					curJobRef = self.currentJobID
+					self.serializeJobHist(job)
+				self.jobs.remove(job["jobData"]["jobID"])
+				self.serializeJobRemoval(job["jobData"]["jobID"])
 
-				if jobRef == jobID:
-					job["jobData"]["status"] = "killed by %s"%(username)
-					self.jobHist.insert(0,job)
-					self.serializeJobHist()
-					indexToRemove = self.jobs.index(job)
-					removedItem = self.jobs.pop(indexToRemove)
-					self.serializeJobList()
+				# if the job is currently running... SACRIFICE
+				runningJob = self.runningJobs.get(job["jobData"]["jobID"])
+				if runningJob is not None and runningJob["subProcess"] is not None:
+					os.killpg(runningJob["subProcess"].pid, signal.SIGTERM)
+					if runningJob["suspended"] is not None: # a stopped process only sees SIGTERM once it continues
+						os.killpg(runningJob["subProcess"].pid, signal.SIGCONT)
 
-					# if the job is currently running... SACRIFICE
-					if jobID == curJobRef:
-						if self.currentSubProcess is not None:
-							os.killpg(self.currentSubProcess.pid, signal.SIGTERM)
+				msg = "Job {0} killed by {1}".format(job["jobData"]["jobID"],username)
+				logging.info("job {0} killed by {1}".format(job["jobData"]["jobID"],username))
 
-					msg = "Job {0} killed by {1}".format(job["jobData"]["jobID"],username)
-					logging.info("job {0} killed by {1}".format(job["jobData"]["jobID"],username))
+				msgs.append(msg)
 
-					msgs.append(msg)
+		# a killed job may have been holding back the rest of the queue or other jobs may depend on it
+		self.__wakeDispatcher()
+		if len(msgs) > 0:
+			self.__notifyJobWatchers(jobNumber)
 
 		if len(msgs) == 0:
 			msg = "*** ERROR: invalid job number: {0}".format(jobID)
@@ -403,9 +1428,10 @@ class serverDaemon(object):
 		return msgs
 
 	## getComputerInfo Method
-	# gathers host info to be presented to client
+	# returns host information, the job queue and the latest job history in one list
+	# kept for older clients; newer clients use getHostInfo, getQueue and getHistory
 	def getComputerInfo(self):
-		logging.info("HPC information requested from client")
+		logging.debug("HPC information requested from client")
 		
 		# Get total memory and convert from bytes to Gb
 		totMem = int(self.mem.total/1024.0 ** 3) # convert from bytes to gb
@@ -413,41 +1439,330 @@ class serverDaemon(object):
 		jobsQueue = 0
 		jobsRunning = 0
 		jobList = []
-		for job in self.jobs:
-			tmp = []
-			tmp.append(job["jobData"]["clientName"])
-			tmp.append(job["jobData"]["jobID"])
-			if "running" in job["jobData"]["status"]:
-				now = datetime.datetime.now()
-				deltaTime = now - self.start
-				deltaTimeSec = int(deltaTime.total_seconds())
-				hours, remainder = divmod(deltaTimeSec, 3600)
-				minutes, seconds = divmod(remainder, 60)
-				deltaTime = ("({0:d}:{1:02d}:{2:02d})".format(hours,minutes,seconds))
-				tmp.append("{0} {1}".format(job["jobData"]["status"],deltaTime))
+		for job in self.jobs.jobs():
+			if job["jobData"]["jobID"] in self.runningJobs:
 				jobsRunning = jobsRunning + 1
-			else:
-				tmp.append(job["jobData"]["status"])
+			elif job["jobData"]["status"] != "array":
 				jobsQueue = jobsQueue + 1
-			tmp.append(job["solverFlags"]["cpus"]+job["solverFlags"]["gpus"])
-			tmp.append(job["jobData"]["priority"])
+			jobList.append(self.__queueRow(job))
+
+		jobHistory = [self.__historyRow(job) for job in self.jobStore.query(limit=30)]
+
+		# return needed values
+		return [self.hostName, self.cpus, self.gpus, totMem, self.IPaddr, jobList, jobsQueue, jobsRunning, jobHistory] # same 9 values as version 0.5; the core map is in getHostInfo
 
-			jobList.append(tmp[:])
+	## getHostInfo Method
+	# returns the host information: {"hostName", "IP", "cpus", "gpus", "memory", "usedCPUs", "usedGPUs", "jobsRunning", "jobsQueue", "coreMap"}
+	def getHostInfo(self):
+		logging.debug("host information requested from client")
+		with self.jobListLock:
+			hostInfo = self.__hostRecord()
+		hostInfo["coreMap"] = self.__coreMap()
+		return hostInfo
+
+	## getQueue Method
+	# returns the active jobs as queue rows [user, jobID, status, cores, priority, time estimate]
+	# optionally only the jobs of one user and/or with a status starting with the given status
+	def getQueue(self,user=None,status=None):
+		logging.debug("job queue requested from client")
+		with self.jobListLock:
+			jobs = self.jobs.jobs()
+			if user is not None:
+				jobs = [job for job in jobs if job["jobData"]["clientName"] == user]
+			if status is not None:
+				jobs = [job for job in jobs if job["jobData"]["status"].startswith(status)]
+			return [self.__queueRow(job) for job in jobs]
+
+	## getJob Method
+	# returns the record of an active or finished job (see __jobRecord) with the host it ran on
+	def getJob(self,jobID):
+		with self.jobListLock:
+			job = self.jobs.get(jobID)
+			if job is not None:
+				record = self.__jobRecord(job)
+				record["host"] = self.hostName
+				return record
+		try:
+			jobs = self.jobStore.query(jobID=jobID, limit=1)
+		except Exception as e:
+			logging.error("unable to query job history: {0}".format(e))
+			return "*** ERROR: unable to query job history: {0}".format(e)
+		if not jobs:
+			return "*** ERROR: job {0} not found on {1}".format(jobID,self.hostName)
+		record = self.__jobRecord(jobs[0])
+		record["host"] = self.hostName
+		return record
+
+	## __queueRow Private Method
+	# returns the queue row of an active job shown by the client: [user, jobID, status, cores, priority, time estimate]
+	def __queueRow(self,job):
+		row = []
+		row.append(job["jobData"]["clientName"])
+		row.append(job["jobData"]["jobID"])
+		runningJob = self.runningJobs.get(job["jobData"]["jobID"])
+		if runningJob is not None and ("running" in job["jobData"]["status"] or job["jobData"]["status"] == "suspended"):
+			deltaTimeSec = int(self.__runTime(runningJob))
+			hours, remainder = divmod(deltaTimeSec, 3600)
+			minutes, seconds = divmod(remainder, 60)
+			deltaTime = ("({0:d}:{1:02d}:{2:02d})".format(hours,minutes,seconds))
+			row.append("{0} {1}".format(job["jobData"]["status"],deltaTime))
+		elif "array" in job["jobData"]:
+			array = job["jobData"]["array"]
+			finished = len([state for state in array["taskStates"].values() if state not in ("queue","running")])
+			row.append("{0} ({1}/{2} tasks finished)".format(job["jobData"]["status"],finished,array["tasks"]))
+		else:
+			row.append(job["jobData"]["status"])
+		row.append(job["solverFlags"]["cpus"]+job["solverFlags"]["gpus"])
+		row.append(job["jobData"]["priority"])
+
+		# estimated time left for running jobs, estimated run time for queued jobs
+		predictedTime = self.__predictJob(job)["wallTime"]
+		if predictedTime is None:
+			row.append("unknown")
+		elif runningJob is not None:
+			remaining = max(0, int(predictedTime - self.__runTime(runningJob)))
+			hours, remainder = divmod(remaining, 3600)
+			row.append("{0:d}:{1:02d} left".format(hours,remainder//60))
+		else:
+			hours, remainder = divmod(int(predictedTime), 3600)
+			row.append("~{0:d}:{1:02d} run".format(hours,remainder//60))
+		return row
+
+	## __coreMap Private Method
+	# returns the cores each running job is pinned to: [jobID, cores, NUMA nodes]
+	def __coreMap(self):
+		coreMap = []
+		for jobID, cores in sorted(self.coreAllocator.assignments().items()):
+			coreMap.append([jobID, formatCPUList(cores), formatCPUList(self.coreAllocator.nodesOf(cores))])
+		return coreMap
+
+	## getChanges Method
+	# returns the job records added, changed or removed since a state version:
+	# {"version", "full", "host", "jobs" (changed or all active job records), "removed" (jobIDs), "history" (new history rows)}
+	# the full state is sent if sinceVersion is 0 or too old; it is built once per state version and cached
+	def getChanges(self,sinceVersion=0):
+		with self.jobListLock:
+			version = self.stateVersion
+			host = self.__hostRecord()
+			if sinceVersion == version and version > 0:
+				return {"version":version, "full":False, "host":host, "jobs":[], "removed":[], "history":[]}
+
+			if sinceVersion <= self.oldestVersion or sinceVersion > version:
+				if self.fullStateCache is None or self.fullStateCache[0] != version:
+					self.fullStateCache = (version, {"version":version, "full":True, "jobs":[self.__jobRecord(job) for job in self.jobs.jobs()],
+						"removed":[], "history":[self.__historyRow(job) for job in self.jobStore.query(limit=30)]})
+				response = dict(self.fullStateCache[1])
+				response["host"] = host
+				return response
+
+			jobs = []
+			removed = []
+			for jobID in reversed(self.jobVersions):
+				changeVersion, isRemoved = self.jobVersions[jobID]
+				if changeVersion <= sinceVersion:
+					break
+				job = self.jobs.get(jobID)
+				if isRemoved or job is None:
+					removed.append(jobID)
+				else:
+					jobs.append(self.__jobRecord(job))
+			history = [row for changeVersion, row in self.histVersions if changeVersion > sinceVersion]
+			return {"version":version, "full":False, "host":host, "jobs":jobs, "removed":removed, "history":history}
+
+	## __jobRecord Private Method
+	# returns the compact record of an active or finished job
+	def __jobRecord(self,job):
+		jobData = job["jobData"]
+		return {"jobID":jobData["jobID"], "jobNumber":jobData["jobNumber"], "jobName":jobData["jobName"], "user":jobData["clientName"],
+			"status":jobData["status"], "priority":jobData["priority"], "cpus":job["solverFlags"]["cpus"], "gpus":job["solverFlags"]["gpus"],
+			"submissionTime":jobData.get("submissionTime"), "startTimestamp":jobData.get("startTimestamp"), "runTime":jobData.get("runTime")}
+
+	## __hostRecord Private Method
+	# returns the host information sent with every getChanges response
+	# must be called while holding jobListLock
+	def __hostRecord(self):
+		[usedCPUs, usedGPUs] = self.__usedResources()
+		return {"hostName":self.hostName, "IP":self.IPaddr, "cpus":self.cpus, "gpus":self.gpus, "memory":int(self.mem.total/1024.0 ** 3),
+			"usedCPUs":usedCPUs, "usedGPUs":usedGPUs, "jobsRunning":len(self.runningJobs), "jobsQueue":len(self.jobs) - len(self.runningJobs)}
+
+	## __stateChanged Private Method
+	# bumps the state version for a changed, removed or finished job
+	# must be called while holding jobListLock
+	def __stateChanged(self,jobID,removed=False,historyRow=None):
+		self.stateVersion = self.stateVersion + 1
+		if removed:
+			self.publishedStatus.pop(jobID,None)
+			self.progressOffsets.pop(jobID,None)
+		if historyRow is not None:
+			self.histVersions.append((self.stateVersion, historyRow))
+		else:
+			self.jobVersions.pop(jobID,None)
+			self.jobVersions[jobID] = (self.stateVersion, removed)
+
+		# forget old removals and history rows; clients that far behind get the full state
+		maxChanges = 10000
+		while len(self.histVersions) > maxChanges:
+			self.oldestVersion = max(self.oldestVersion, self.histVersions.pop(0)[0])
+		while len(self.jobVersions) > maxChanges:
+			self.oldestVersion = max(self.oldestVersion, self.jobVersions.popitem(last=False)[1][0])
+
+	## subscribe Method
+	# registers a client callback object (with a oneway jobEvent(event) method) for job events; returns the subscription ID
+	# events: {"type": "state", "host", "jobID", "jobNumber", "jobName", "user", "status", "final", "version", "time"}
+	# and, with progress, {"type": "progress", "host", "jobID", "jobNumber", "jobName", "user", "lines", "time"} for new .sta file lines
+	# jobNumber and user limit the events to one job number and/or one user's jobs
+	def subscribe(self,callbackURI,jobNumber=None,user=None,progress=False):
+		subscriptionID = self.events.subscribe(callbackURI, jobNumber, user, progress)
+		if progress:
+			with self.jobListLock:
+				for jobID in list(self.progressOffsets.keys()): # send the tail of the .sta files again for the new subscriber
+					if jobNumber is None or jobID.split(":")[0] == jobNumber:
+						self.progressOffsets.pop(jobID)
+		return subscriptionID
+
+	## unsubscribe Method
+	# removes a subscription made with subscribe
+	def unsubscribe(self,subscriptionID):
+		return self.events.unsubscribe(subscriptionID)
+
+	## __publishState Private Method
+	# sends a job's status to subscribers if it changed; must be called while holding jobListLock
+	def __publishState(self,job,final=False):
+		jobData = job["jobData"]
+		if self.publishedStatus.get(jobData["jobID"]) == jobData["status"] and not final:
+			return
+		self.publishedStatus[jobData["jobID"]] = jobData["status"]
+		self.events.publish({"type":"state", "host":self.hostName, "jobID":jobData["jobID"], "jobNumber":jobData["jobNumber"],
+			"jobName":jobData["jobName"], "user":jobData["clientName"], "status":jobData["status"], "final":final,
+			"version":self.stateVersion, "time":time.time()})
+
+	## __progressWatcher Private Method
+	# thread loop; sends the new lines of the .sta files of watched running jobs to subscribers
+	def __progressWatcher(self):
+		interval = self.serverConf["events"]["progressInterval_seconds"]
+		while True:
+			time.sleep(interval)
+			with self.jobListLock:
+				watched = [runningJob["job"] for runningJob in self.runningJobs.values() if self.events.watchesProgress(runningJob["job"]["jobData"]["jobNumber"])]
+				offsets = dict((job["jobData"]["jobID"], self.progressOffsets.get(job["jobData"]["jobID"])) for job in watched)
+
+			for job in watched:
+				jobData = job["jobData"]
+				staPath = os.path.join(jobData["jobDirectory"], jobData["jobName"] + ".sta")
+				offset = offsets[jobData["jobID"]]
+				try:
+					size = os.path.getsize(staPath)
+					if offset is not None and size <= offset:
+						continue
+					with open(staPath, "rb") as staFile:
+						if offset is None: # first read: only the last lines
+							staFile.seek(max(0, size - 4096))
+							data = staFile.read()
+							lines = data.splitlines(True)
+							if size > 4096: # first line may be cut off
+								lines = lines[1:]
+							lines = lines[-25:]
+						else:
+							staFile.seek(offset)
+							data = staFile.read()
+							lines = data.splitlines(True)
+				except (IOError, OSError):
+					continue
+
+				# keep an unfinished last line for the next read
+				newOffset = size if offset is None else offset + len(data)
+				if lines and not lines[-1].endswith(b"\n"):
+					newOffset = newOffset - len(lines[-1])
+					lines = lines[:-1]
+				with self.jobListLock:
+					if jobData["jobID"] not in self.runningJobs:
+						continue
+					self.progressOffsets[jobData["jobID"]] = newOffset
+				if lines:
+					self.events.publish({"type":"progress", "host":self.hostName, "jobID":jobData["jobID"], "jobNumber":jobData["jobNumber"],
+						"jobName":jobData["jobName"], "user":jobData["clientName"], "lines":[line.decode("utf-8","replace").rstrip("\r\n") for line in lines],
+						"time":time.time()})
+
+	## getHistory Method
+	# returns finished jobs, newest first, as [username, job number, job name, status, submission time] rows
+	# filters: {user, status (matches the start of the status), jobNumber, jobID, jobName, host}; since/until are
+	# submission time stamps (seconds since the epoch)
+	def getHistory(self,offset=0,limit=30,filters=None,since=None,until=None):
+		logging.debug("job history requested from client")
+		filters = filters or {}
+		for field in filters:
+			if field not in ["user", "status", "jobNumber", "jobID", "jobName", "host"]:
+				return "*** ERROR: invalid history filter: {0}".format(field)
+		limit = max(0, min(int(limit), 10000))
+		try:
+			return [self.__historyRow(job) for job in self.jobStore.query(offset=offset, limit=limit, since=since, until=until, **filters)]
+		except Exception as e:
+			logging.error("unable to query job history: {0}".format(e))
+			return "*** ERROR: unable to query job history: {0}".format(e)
+
+	## __historyRow Private Method
+	# returns the job history row of a finished job shown by the client
+	def __historyRow(self,job):
+		return [job["jobData"]["clientName"], job["jobData"]["jobNumber"], job["jobData"]["jobName"], job["jobData"]["status"], job["jobData"]["submissionTime"]]
+
+	## listJobFiles Method
+	# returns [name, size, modification time] of the files in a job directory matching any of the shell patterns (e.g. "*.odb")
+	def listJobFiles(self,jobNumber,patterns):
+		try:
+			return self.files.listFiles(jobNumber, patterns)
+		except (ValueError, OSError) as e:
+			return "*** ERROR: {0}".format(e)
+
+	## readJobFile Method
+	# returns a chunk of a file in a job directory: {"data" (base64), "compressed" (zlib), "offset", "size", "mtime"}
+	# at most fileTransfer chunkSize_bytes are sent per call; compress only applies to the text file types in the conf. file
+	# clients may read different ranges of a file in parallel, each over its own connection
+	def readJobFile(self,jobNumber,name,offset=0,length=None,compress=False):
+		try:
+			return self.files.readChunk(jobNumber, name, offset, length, compress)
+		except (ValueError, IOError, OSError) as e:
+			return "*** ERROR: {0}".format(e)
+
+	## missingInputs Method
+	# returns the SHA-256 digests of input files that are not in the input cache and have to be sent with submit
+	def missingInputs(self,digests):
+		if self.inputCache is None:
+			return list(digests)
+		return self.inputCache.missing(digests)
+
+	## checksumJobFile Method
+	# returns {"sha256", "size", "mtime"} of a file in a job directory, used by clients to verify ranged downloads
+	def checksumJobFile(self,jobNumber,name):
+		try:
+			return self.files.checksum(jobNumber, name)
+		except (ValueError, IOError, OSError) as e:
+			return "*** ERROR: {0}".format(e)
 
-		jobHistory = []
-		for job in self.jobHist:
-			tmp = []
-			tmp.append(job["jobData"]["clientName"])
-			tmp.append(job["jobData"]["jobNumber"])
-			tmp.append(job["jobData"]["jobName"])
-			tmp.append(job["jobData"]["status"])
-			tmp.append(job["jobData"]["submissionTime"])
+	## openUpload Method
+	# starts a chunked upload of a file for a job submitted later with submit; returns the upload ID
+	def openUpload(self,name):
+		try:
+			return self.files.openUpload(name)
+		except (ValueError, IOError, OSError) as e:
+			logging.error("unable to start upload of {0}: {1}".format(name,e))
+			return "*** ERROR: {0}".format(e)
+
+	## writeUpload Method
+	# writes a base64 encoded (and, if compressed, zlib compressed) chunk of an upload at the given offset
+	def writeUpload(self,uploadID,offset,data,compressed=False):
+		try:
+			self.files.writeChunk(uploadID, offset, data, compressed)
+		except (ValueError, TypeError, IOError, OSError, zlib.error) as e:
+			return "*** ERROR: {0}".format(e)
 
-			jobHistory.append(tmp[:])
+	## closeUpload Method
+	# finishes an upload once all size bytes were written
+	def closeUpload(self,uploadID,size):
+		try:
+			self.files.closeUpload(uploadID, size)
+		except (ValueError, OSError) as e:
+			return "*** ERROR: {0}".format(e)
 
-		# return needed values
-		return [self.hostName, self.cpus, self.gpus, totMem, self.IPaddr, jobList, jobsQueue, jobsRunning, jobHistory]
-	
 	## loadSerializedJobID Method
 	# loads the serialized job ID or creates one if it doesn't exist
 	def loadSerializedJobID(self):
@@ -461,81 +1776,170 @@ class serverDaemon(object):
 			logging.info("created job ID serpent file: {0}".format(self.jobID))
 	
 	## serializeJobID Method
-	# opens the serialized job ID object to update it
+	# opens the serialized job ID object to update it; must be called while holding jobIDLock
 	def serializeJobID(self):
 		jobIDPath = os.path.join(self.serverScriptDirectory,"jobIDCounter.serpent")
-		with self.jobIDLock:        
-			try:
-				serpent.dump(self.jobID, open(jobIDPath,"wb"))
-				logging.info("job ID serpent file edited. Current ID = {0}".format(self.jobID))
-			except:
-				logging.error("unable to serialize job ID counter")
-
-	## loadSerializedJobList Method
-	# loads the serialized job List or creates one if it doesn't exist
-	def loadSerializedJobList(self):
-		jobListPath = os.path.join(self.serverScriptDirectory,"jobList.serpent")
-		with self.serializedJobListLock:
-			if os.path.isfile(jobListPath):
-				self.jobs = serpent.load(open(jobListPath,"rb"))
-			else:
-				self.jobs = []
-				serpent.dump(self.jobs, open(jobListPath, "wb"))
-				logging.info("created job list serpent file")
-	
+		try:
+			atomicWrite(jobIDPath, serpent.dumps(self.jobID))
+			logging.info("job ID serpent file edited. Current ID = {0}".format(self.jobID))
+		except:
+			logging.error("unable to serialize job ID counter")
+
+	## loadSerializedJobState Method
+	# loads the active job list from the job state snapshot and journal
+	# falls back to the jobList.serpent and jobHist.serpent files of older versions; job history found there
+	# is moved to the job history database and dropped from the job state at the next snapshot
+	def loadSerializedJobState(self):
+		state = self.journal.load()
+		if state is None:
+			state = {"jobs":[], "hist":[]}
+			for key, fileName in [("jobs","jobList.serpent"), ("hist","jobHist.serpent")]:
+				path = os.path.join(self.serverScriptDirectory,fileName)
+				if os.path.isfile(path):
+					state[key] = serpent.load(open(path,"rb"))
+		self.jobs = jobQueue(state["jobs"])
+		if state["hist"]:
+			self.jobStore.addMany(list(reversed(state["hist"])))
+			logging.info("moved {0} jobs to the job history database".format(len(state["hist"])))
+
 	## initSerializedJobList Method
-	# initializes the job list by clearing any stale jobs from list on daemon startup or creates one if it doesn't exist
+	# recovers the jobs left in the job list when the daemon starts, following the recovery policy in serverConf.json
+	# starts the journal, writes a fresh snapshot of the job state and starts the scheduler
 	def initSerializedJobList(self):
-		jobListPath = os.path.join(self.serverScriptDirectory,"jobList.serpent")
+		with self.startupLock:
+			if self.started:
+				return
+			self.started = True
+		self.journal.start()
 		with self.jobListLock:
-			if os.path.isfile(jobListPath):
-				self.jobs = serpent.load(open(jobListPath,"rb"))
-				for job in self.jobs:
-					job["jobData"]["status"] = "MACHINE ERROR"
-					logging.info("Job {0} removed from queue (jobList) due to daemon initialization".format(job["jobData"]["jobID"]))
-					self.jobHist.insert(0,job)
-					self.serializeJobHist()
-					indexToRemove = self.jobs.index(job)
-					removedItem = self.jobs.pop(indexToRemove)
-					self.serializeJobList()
+			for job in self.jobs.jobs():
+				try:
+					self.__recoverJob(job)
+				except Exception as e:
+					logging.error("unable to recover job {0}: {1}".format(job["jobData"]["jobID"],e))
+					self.__failRecoveredJob(job)
+		self.journal.compact()
+		logging.info("job state snapshot written")
+		self.__startScheduler()
+
+	## __recoverJob Private Method
+	# requeues, holds, re-attaches or fails a job found in the job list at startup
+	# must be called while holding jobListLock
+	def __recoverJob(self,job):
+		policy = self.serverConf["recovery"]
+		jobID = job["jobData"]["jobID"]
+		status = job["jobData"]["status"]
+
+		if status in ("queue", "queue (license wait)"): # license tokens are requested again
+			job["jobData"]["status"] = "queue"
+			if policy["queuedJobs"] == "requeue":
+				logging.info("job {0} requeued after daemon restart".format(jobID))
 			else:
-				self.jobs = []
-				serpent.dump(self.jobs, open(jobListPath, "wb"))
-				logging.info("created job list serpent file")
+				self.__failRecoveredJob(job)
+			return
 
-	## serializeJobHist Method
-	# opens the serialized job history list object to update it
-	def serializeJobList(self):
-		jobListPath = os.path.join(self.serverScriptDirectory,"jobList.serpent")
-		with self.serializedJobListLock:
-			try:
-				serpent.dump(self.jobs, open(jobListPath,"wb"))
-			except:
-				logging.error("unable to serializeJobList")
-
-	## loadSerializedJobHist Method
-	# loads the serialized job history list or creates one if it doesn't exist
-	def loadSerializedJobHist(self):
-		jobHistPath = os.path.join(self.serverScriptDirectory,"jobHist.serpent")
-		with self.serializedJobHistLock:
-			if os.path.isfile(jobHistPath):
-				self.jobHist = serpent.load(open(jobHistPath,"rb"))
+		if status in ("waiting", "array"): # waits on other jobs or on its array tasks
+			if policy["queuedJobs"] == "requeue":
+				self.jobs.hold(jobID)
+				logging.info("job {0} held again after daemon restart".format(jobID))
 			else:
-				self.jobHist = []
-				serpent.dump(self.jobHist, open(jobHistPath, "wb"))
-				logging.info("created job history serpent file")
+				self.__failRecoveredJob(job)
+			return
+
+		# the job was running; look for its solver
+		process = None
+		if self.opSystem == "Linux":
+			process = findSolverProcess(job["jobData"].get("pid"), job["jobData"].get("pidCreateTime"))
+
+		if process is not None and policy["runningJobs"] == "reattach":
+			if status == "suspended": # the preemption that suspended it was lost with the old daemon
+				os.killpg(process.pid, signal.SIGCONT)
+			self.jobs.take(jobID)
+			self.__startJob(job, attachedProcess(process))
+			logging.info("job {0} re-attached to solver process {1} after daemon restart".format(jobID,process.pid))
+			return
+
+		if process is not None: # leftover solver of a job that will be run again or failed
+			try:
+				os.killpg(process.pid, signal.SIGTERM)
+				os.killpg(process.pid, signal.SIGCONT)
+			except OSError as e:
+				logging.error("unable to stop solver process {0} of job {1}: {2}".format(process.pid,jobID,e))
+
+		action = policy["deadJobs"] if process is None else policy["runningJobs"]
+		restarts = job["jobData"].get("restarts",0)
+		if action not in ("requeue", "restart") or restarts >= policy["maxRequeues"]:
+			self.__failRecoveredJob(job)
+			return
+
+		# run the job again, continuing from its state files if possible
+		job["jobData"]["restarts"] = restarts + 1
+		job["jobData"]["status"] = "queue"
+		for key in ["pid", "pidCreateTime", "startTimestamp"]:
+			job["jobData"].pop(key,None)
+		lockFile = os.path.join(job["jobData"]["jobDirectory"],job["jobData"]["jobName"]+".lck")
+		if os.path.isfile(lockFile):
+			os.remove(lockFile)
+		if action == "restart" and canRecover(job["jobData"]["jobDirectory"], job["jobData"]["jobName"], job["jobData"]["jobFile"]):
+			job["solverFlags"]["recover"] = None
+			logging.info("job {0} requeued after daemon restart, recovering from its state files".format(jobID))
+		else:
+			logging.info("job {0} requeued after daemon restart".format(jobID))
+		if "arrayID" in job["jobData"]:
+			arrayJob = self.jobs.get(job["jobData"]["arrayID"])
+			if arrayJob is not None:
+				arrayJob["jobData"]["array"]["taskStates"][job["jobData"]["jobName"]] = "queue"
+				self.serializeJob(arrayJob)
+		self.jobs.push(job)
+		self.serializeJob(job)
+
+	## __failRecoveredJob Private Method
+	# moves a job that cannot be recovered to history as "MACHINE ERROR"
+	# must be called while holding jobListLock
+	def __failRecoveredJob(self,job):
+		job["jobData"]["status"] = "MACHINE ERROR"
+		logging.info("Job {0} removed from queue (jobList) due to daemon initialization".format(job["jobData"]["jobID"]))
+		if "arrayID" in job["jobData"]:
+			self.__arrayTaskFinished(job)
+		else:
+			self.serializeJobHist(job)
+		self.jobs.remove(job["jobData"]["jobID"])
+		self.serializeJobRemoval(job["jobData"]["jobID"])
+
+	## serializeJob Method
+	# journals the current state of an active job; must be called while holding jobListLock
+	def serializeJob(self,job):
+		self.__stateChanged(job["jobData"]["jobID"])
+		self.__publishState(job)
+		try:
+			self.journal.recordJob(job)
+		except Exception as e:
+			logging.error("unable to journal job {0}: {1}".format(job["jobData"]["jobID"],e))
+
+	## serializeJobRemoval Method
+	# journals that a job left the job list; must be called while holding jobListLock
+	def serializeJobRemoval(self,jobID):
+		self.__stateChanged(jobID, removed=True)
+		try:
+			self.journal.recordRemoval(jobID)
+		except Exception as e:
+			logging.error("unable to journal removal of job {0}: {1}".format(jobID,e))
 
 	## serializeJobHist Method
-	# opens the serialized job list object to update it
-	def serializeJobHist(self):
-		jobHistPath = os.path.join(self.serverScriptDirectory,"jobHist.serpent")
-		with self.serializedJobHistLock:
-			if len(self.jobHist) > 30:
-				self.jobHist.pop()
-			try:
-				serpent.dump(self.jobHist, open(jobHistPath,"wb"))
-			except:
-				logging.error("unable to serializeJobHist")
+	# adds a finished job to the job history database; must be called while holding jobListLock
+	def serializeJobHist(self,job):
+		self.__stateChanged(job["jobData"]["jobID"], historyRow=self.__historyRow(job))
+		self.__publishState(job, final=True)
+		try:
+			self.jobStore.add(job)
+		except Exception as e:
+			logging.error("unable to add job {0} to the job history: {1}".format(job["jobData"]["jobID"],e))
+
+	## __journalState Private Method
+	# returns the full job state written to the snapshot when the journal is compacted
+	# called by the journal while holding jobListLock
+	def __journalState(self):
+		return {"jobs":self.jobs.jobs()}
 
 	## loadServerConfFile Method
 	# returns configuration json for client
@@ -0,0 +1,179 @@
+from __future__ import print_function
+import os
+import re
+import stat
+import shutil
+import hashlib
+import logging
+import itertools
+import threading
+try:
+	import fcntl
+except ImportError: # Windows
+	fcntl = None
+from collections import OrderedDict
+
+## @package blobStore
+## @brief
+# Content addressed cache of submitted input files.
+#
+# Input files are stored once under their SHA-256 in runDirectory/.blobs (the same file system
+# as the job directories), so clients only send the files the daemon does not have yet. The
+# store keeps its own read-only copy of each file and every job directory gets a private copy
+# of the blob (a reflink where the file system supports it), so a job that rewrites its input
+# files never changes the cached blob or the files of other jobs. When the store grows beyond
+# its size limit the least recently used blobs are removed. The recency order is kept in the
+# blobs' modification times, so it survives a daemon restart.
+
+FICLONE = 0x40049409 # Linux ioctl sharing the blocks of a file until either copy is written
+
+class blobStore(object):
+	def __init__(self, directory, maxSize):
+		self.directory = directory
+		self.maxSize = maxSize			# bytes kept in the store before the least recently used blobs are removed
+		self.blobs = OrderedDict()		# sha256: size, least recently used first
+		self.size = 0
+		self.pins = {}					# sha256: copies of the blob in progress; pinned blobs are not evicted
+		self.tmpIDs = itertools.count(1)
+		self.lock = threading.Lock()		# guards the bookkeeping only; files are copied and hashed without it
+		self.__scan()
+
+	## missing Method
+	# returns the digests that are not in the store; the others count as used
+	def missing(self, digests):
+		with self.lock:
+			for digest in digests:
+				if digest in self.blobs:
+					self.__touch(digest)
+			return [digest for digest in digests if digest not in self.blobs]
+
+	## link Method
+	# puts a private copy of the blob of a digest at path; returns False if it is not in the store
+	def link(self, digest, path):
+		blobPath = self.__path(digest)
+		with self.lock:
+			if digest not in self.blobs:
+				return False
+			self.__touch(digest)
+			self.pins[digest] = self.pins.get(digest, 0) + 1
+		try:
+			copyFile(blobPath, path)
+		finally:
+			with self.lock:
+				self.pins[digest] = self.pins[digest] - 1
+				if not self.pins[digest]:
+					del self.pins[digest]
+				self.__evict()
+		return True
+
+	## add Method
+	# stores a copy of a job file under its digest; the job keeps its own file
+	# raises ValueError if the file does not have the digest the client sent
+	def add(self, digest, path):
+		blobPath = self.__path(digest)
+		with self.lock:
+			if digest in self.blobs:
+				self.__touch(digest)
+				return
+			tmpPath = "{0}.{1}.tmp".format(blobPath, next(self.tmpIDs))
+
+		# copy and hash without the lock; other submissions only wait for the bookkeeping
+		try:
+			os.makedirs(os.path.dirname(blobPath))
+		except OSError: # exists already
+			pass
+		copyFile(path, tmpPath)
+		if fileDigest(tmpPath) != digest: # checked on the store's copy, which nothing else can change
+			os.remove(tmpPath)
+			raise ValueError("{0} does not match its checksum".format(os.path.basename(path)))
+		os.chmod(tmpPath, stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+
+		with self.lock:
+			if digest in self.blobs: # stored by a concurrent submission meanwhile
+				self.__touch(digest)
+				os.chmod(tmpPath, stat.S_IRUSR | stat.S_IWUSR)
+				os.remove(tmpPath)
+				return
+			os.rename(tmpPath, blobPath)
+			size = os.path.getsize(blobPath)
+			self.blobs[digest] = size
+			self.size = self.size + size
+			self.__evict()
+
+	## __touch Private Method
+	# marks a blob as used; must be called while holding lock
+	def __touch(self, digest):
+		self.blobs[digest] = self.blobs.pop(digest)
+		try:
+			os.utime(self.__path(digest), None)
+		except OSError:
+			pass
+
+	## __evict Private Method
+	# removes the least recently used blobs while the store is too large; blobs being copied into a job are kept
+	# must be called while holding lock
+	def __evict(self):
+		for digest in list(self.blobs):
+			if self.size <= self.maxSize or len(self.blobs) <= 1:
+				break
+			if digest in self.pins:
+				continue
+			size = self.blobs.pop(digest)
+			self.size = self.size - size
+			try:
+				blobPath = self.__path(digest)
+				os.chmod(blobPath, stat.S_IRUSR | stat.S_IWUSR) # read-only files cannot be removed on Windows
+				os.remove(blobPath)
+			except OSError as e:
+				logging.error("unable to remove cached input file {0}: {1}".format(digest,e))
+
+	## __path Private Method
+	# returns the path of a blob; raises ValueError for anything but a SHA-256 hex digest
+	def __path(self, digest):
+		if not re.match(r"^[0-9a-f]{64}$", digest):
+			raise ValueError("invalid checksum: {0}".format(digest))
+		return os.path.join(self.directory, digest[:2], digest)
+
+	## __scan Private Method
+	# loads the blobs of the store, least recently used first
+	def __scan(self):
+		found = []
+		if os.path.isdir(self.directory):
+			for prefix in os.listdir(self.directory):
+				prefixDirectory = os.path.join(self.directory, prefix)
+				if not os.path.isdir(prefixDirectory):
+					continue
+				for digest in os.listdir(prefixDirectory):
+					if digest.endswith(".tmp"): # left by a daemon stopped while adding a blob
+						os.chmod(os.path.join(prefixDirectory, digest), stat.S_IRUSR | stat.S_IWUSR)
+						os.remove(os.path.join(prefixDirectory, digest))
+						continue
+					blobStat = os.stat(os.path.join(prefixDirectory, digest))
+					found.append((blobStat.st_mtime, digest, blobStat.st_size))
+		for mtime, digest, size in sorted(found):
+			self.blobs[digest] = size
+			self.size = self.size + size
+		with self.lock:
+			self.__evict()
+
+## copyFile Function
+# copies a file, as a reflink sharing its blocks where the file system supports it
+def copyFile(source, destination):
+	if fcntl is not None:
+		with open(source, "rb") as sourceFile:
+			with open(destination, "wb") as destinationFile:
+				try:
+					fcntl.ioctl(destinationFile.fileno(), FICLONE, sourceFile.fileno())
+					return
+				except (IOError, OSError): # no reflinks on this file system
+					pass
+	shutil.copyfile(source, destination)
+
+## fileDigest Function
+# returns the SHA-256 hex digest of a file
+def fileDigest(path):
+	digest = hashlib.sha256()
+	with open(path, "rb") as blobFile:
+		for block in iter(lambda: blobFile.read(1048576), b""):
+			digest.update(block)
+	return digest.hexdigest()
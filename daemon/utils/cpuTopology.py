@@ -0,0 +1,143 @@
+from __future__ import print_function
+import os
+import glob
+import re
+import threading
+import multiprocessing
+
+import psutil
+
+## @package cpuTopology
+## @brief
+# NUMA aware core assignment for jobs running side by side.
+#
+# numaNodes reads the cores of each NUMA node from sysfs (one node holding every core on
+# machines or platforms without it). coreAllocator hands each job a disjoint set of cores,
+# preferring the tightest single node, then whole free nodes, then the nodes with the most
+# free cores, so a job's threads and memory stay on as few sockets as possible.
+
+## parseCPUList Function
+# converts a kernel cpu list ("0-3,8-11") to a list of core numbers
+def parseCPUList(cpuList):
+	cores = []
+	for part in cpuList.strip().split(","):
+		if not part:
+			continue
+		if "-" in part:
+			first, last = part.split("-")
+			cores.extend(range(int(first), int(last)+1))
+		else:
+			cores.append(int(part))
+	return cores
+
+## formatCPUList Function
+# converts a list of core numbers to a kernel style cpu list ("0-3,8-11")
+def formatCPUList(cores):
+	parts = []
+	for core in sorted(cores):
+		if parts and parts[-1][1] == core - 1:
+			parts[-1][1] = core
+		else:
+			parts.append([core, core])
+	return ",".join([str(first) if first == last else "{0}-{1}".format(first,last) for first, last in parts])
+
+## numaNodes Function
+# returns {node number: [cores]} for the cores this process may use
+def numaNodes(sysfsPath="/sys/devices/system/node"):
+	usable = set(usableCores())
+	nodes = {}
+	for nodePath in glob.glob(os.path.join(sysfsPath, "node*")):
+		match = re.match(r"node(\d+)$", os.path.basename(nodePath))
+		if match is None:
+			continue
+		try:
+			with open(os.path.join(nodePath, "cpulist"), "r") as cpuList:
+				cores = [core for core in parseCPUList(cpuList.read()) if core in usable]
+		except (IOError, OSError, ValueError):
+			continue
+		if cores:
+			nodes[int(match.group(1))] = cores
+	if not nodes:
+		nodes[0] = sorted(usable)
+	return nodes
+
+## usableCores Function
+# returns the cores this process is allowed to run on
+def usableCores():
+	if hasattr(os, "sched_getaffinity"):
+		return sorted(os.sched_getaffinity(0))
+	try:
+		return sorted(psutil.Process().cpu_affinity())
+	except (AttributeError, psutil.Error):
+		return list(range(multiprocessing.cpu_count()))
+
+## setAffinity Function
+# pins a process or thread (0 = calling process) to the given cores
+def setAffinity(pid, cores):
+	if hasattr(os, "sched_setaffinity"):
+		os.sched_setaffinity(pid, cores)
+	else:
+		psutil.Process(pid or os.getpid()).cpu_affinity(list(cores))
+
+class coreAllocator(object):
+	def __init__(self, nodes):
+		self.nodes = nodes			# node: [cores]
+		self.assigned = {}			# jobID: [cores]
+		self.lock = threading.Lock()
+
+	## allocate Method
+	# assigns count free cores to a job; returns the cores or None if not enough cores are free
+	def allocate(self, jobID, count):
+		with self.lock:
+			self.assigned.pop(jobID, None)
+			free = self.__freeCores()
+			if count <= 0 or count > sum([len(cores) for cores in free.values()]):
+				return None
+
+			# tightest single node that fits the whole job
+			fitting = [node for node in free if len(free[node]) >= count]
+			if fitting:
+				node = min(fitting, key=lambda node: (len(free[node]), node))
+				cores = free[node][:count]
+			else:
+				# whole free nodes first, then the nodes with the most free cores
+				order = sorted(free, key=lambda node: (len(free[node]) != len(self.nodes[node]), -len(free[node]), node))
+				cores = []
+				for node in order:
+					cores.extend(free[node][:count - len(cores)])
+					if len(cores) == count:
+						break
+
+			self.assigned[jobID] = sorted(cores)
+			return self.assigned[jobID]
+
+	## release Method
+	# returns the cores of a job to the pool
+	def release(self, jobID):
+		with self.lock:
+			return self.assigned.pop(jobID, None)
+
+	## cores Method
+	# returns the cores assigned to a job or None
+	def cores(self, jobID):
+		with self.lock:
+			return self.assigned.get(jobID)
+
+	## nodesOf Method
+	# returns the NUMA nodes a set of cores belongs to
+	def nodesOf(self, cores):
+		return sorted([node for node in self.nodes if set(self.nodes[node]) & set(cores)])
+
+	## assignments Method
+	# returns a copy of the jobID: cores map
+	def assignments(self):
+		with self.lock:
+			return dict((jobID, cores[:]) for jobID, cores in self.assigned.items())
+
+	## __freeCores Private Method
+	# returns {node: [free cores]}; must be called while holding lock
+	def __freeCores(self):
+		used = set()
+		for cores in self.assigned.values():
+			used.update(cores)
+		return dict((node, [core for core in cores if core not in used]) for node, cores in self.nodes.items())
@@ -0,0 +1,128 @@
+from __future__ import print_function
+import threading
+import logging
+import itertools
+from collections import deque
+
+import Pyro4
+
+## @package eventPublisher
+## @brief
+# Delivers job events (state changes and solver progress) to subscribed clients.
+#
+# A client subscribes with the URI of a Pyro callback object and optional job filters.
+# publish never blocks: each event is appended to the bounded outbound queue of every
+# matching subscriber and a delivery thread per subscriber calls its (oneway) jobEvent
+# method. When a subscriber falls behind its oldest events are dropped and counted, so a
+# slow or dead client can never stall the scheduler. Subscribers that fail too many
+# deliveries in a row are removed.
+
+class subscription(object):
+	def __init__(self, subscriptionID, callbackURI, jobNumber, user, progress, queueSize):
+		self.subscriptionID = subscriptionID
+		self.callbackURI = callbackURI
+		self.jobNumber = jobNumber		# only events of this job number (None = all jobs)
+		self.user = user				# only events of this user's jobs (None = all users)
+		self.progress = progress		# also send solver progress (new .sta file lines)
+		self.events = deque(maxlen=queueSize)
+		self.dropped = 0				# events dropped because the queue was full
+		self.failures = 0				# failed deliveries in a row
+		self.active = True
+		self.condition = threading.Condition(threading.Lock())
+
+	## matches Method
+	# True if the event is wanted by this subscriber
+	def matches(self, event):
+		if event["type"] == "progress" and not self.progress:
+			return False
+		if self.jobNumber is not None and event.get("jobNumber") != self.jobNumber:
+			return False
+		if self.user is not None and event.get("user") != self.user:
+			return False
+		return True
+
+class eventPublisher(object):
+	def __init__(self, queueSize=1000, maxFailures=3):
+		self.queueSize = queueSize		# events held per subscriber before the oldest are dropped
+		self.maxFailures = maxFailures	# failed deliveries in a row before a subscriber is removed
+		self.subscriptions = {}			# subscriptionID: subscription
+		self.lock = threading.Lock()
+		self.ids = itertools.count(1)
+
+	## subscribe Method
+	# registers a callback object; returns the subscription ID
+	def subscribe(self, callbackURI, jobNumber=None, user=None, progress=False):
+		with self.lock:
+			subscriptionID = next(self.ids)
+			sub = subscription(subscriptionID, callbackURI, jobNumber, user, progress, self.queueSize)
+			self.subscriptions[subscriptionID] = sub
+		thread = threading.Thread(target=self.__deliver, args=(sub,), name="WAM-events-{0}".format(subscriptionID))
+		thread.setDaemon(True)
+		thread.start()
+		logging.info("event subscriber {0} added: {1}".format(subscriptionID, callbackURI))
+		return subscriptionID
+
+	## unsubscribe Method
+	# removes a subscription; True if it existed
+	def unsubscribe(self, subscriptionID):
+		with self.lock:
+			sub = self.subscriptions.pop(subscriptionID, None)
+		if sub is None:
+			return False
+		with sub.condition:
+			sub.active = False
+			sub.condition.notify_all()
+		logging.info("event subscriber {0} removed".format(subscriptionID))
+		return True
+
+	## publish Method
+	# queues an event for every matching subscriber; never blocks on delivery
+	def publish(self, event):
+		with self.lock:
+			subs = list(self.subscriptions.values())
+		for sub in subs:
+			if not sub.matches(event):
+				continue
+			with sub.condition:
+				if len(sub.events) == sub.events.maxlen:
+					sub.dropped = sub.dropped + 1
+				sub.events.append(event)
+				sub.condition.notify()
+
+	## watchesProgress Method
+	# True if anyone subscribed to the solver progress of the given job number
+	def watchesProgress(self, jobNumber):
+		with self.lock:
+			for sub in self.subscriptions.values():
+				if sub.progress and (sub.jobNumber is None or sub.jobNumber == jobNumber):
+					return True
+		return False
+
+	## __deliver Private Method
+	# delivery thread of one subscriber; sends queued events in order through its own proxy
+	def __deliver(self, sub):
+		proxy = Pyro4.Proxy(sub.callbackURI)
+		proxy._pyroTimeout = 10
+		while True:
+			with sub.condition:
+				while sub.active and not sub.events:
+					sub.condition.wait()
+				if not sub.active:
+					break
+				event = sub.events.popleft()
+				if sub.dropped:
+					event = dict(event)
+					event["dropped"] = sub.dropped # let the client know it missed events
+					sub.dropped = 0
+
+			try:
+				proxy.jobEvent(event)
+				sub.failures = 0
+			except Exception as e:
+				sub.failures = sub.failures + 1
+				logging.error("unable to deliver event to subscriber {0}: {1}".format(sub.subscriptionID, e))
+				proxy._pyroRelease()
+				if sub.failures >= self.maxFailures:
+					self.unsubscribe(sub.subscriptionID)
+					break
+		proxy._pyroRelease()
@@ -0,0 +1,233 @@
+from __future__ import print_function
+import os
+import re
+import time
+import zlib
+import mmap
+import base64
+import hashlib
+import fnmatch
+import logging
+import itertools
+import threading
+from collections import OrderedDict
+
+## @package fileTransfer
+## @brief
+# Chunked file transfers between the clients and the job directories of a daemon, over the
+# client's existing Pyro connection (replaces pscp).
+#
+# Downloads are stateless: the client lists the files of a job and reads them in chunks by
+# offset, so any chunk can be asked for again and large files can be read in parallel ranges
+# and resumed. Files larger than a chunk are read through a read-only mmap kept open between
+# calls, so a chunk is copied once out of the page cache instead of being read through a
+# file object per call; checksum returns a cached SHA-256 for verifying them. Uploads are
+# staged in runDirectory/.uploads and moved into the job directory by submit. Chunks are
+# base64 encoded so they pass every serializer; text files (.inp, .dat, .msg, ...) may also
+# be zlib compressed. Only files directly inside runDirectory/<job number> can be read.
+
+class fileTransfer(object):
+	def __init__(self, runDirectory, chunkSize=1048576, compressExtensions=None, compressionLevel=1, uploadTimeout=86400):
+		self.runDirectory = os.path.realpath(runDirectory)
+		self.chunkSize = chunkSize					# largest chunk read or written per call, in bytes
+		self.compressExtensions = [ext.lower() for ext in (compressExtensions or [])]	# files worth compressing
+		self.compressionLevel = compressionLevel	# zlib level of compressed chunks
+		self.uploadTimeout = uploadTimeout			# unfinished uploads older than this (seconds) are removed
+		self.uploadDirectory = os.path.join(self.runDirectory, ".uploads")
+		self.uploads = {}							# uploadID: {"name", "path", "size", "started", "done"}
+		self.lock = threading.Lock()
+		self.ids = itertools.count(1)
+		self.maps = OrderedDict()					# path: {"size", "mtime", "file", "map", "readers", "dropped"} of large files being read, least recently used first
+		self.maxMaps = 16
+		self.mapLock = threading.Lock()
+		self.checksums = {}							# path: (size, mtime, sha256 hex digest)
+
+	## jobFile Method
+	# returns the path of a file in a job directory; raises ValueError for paths outside of it
+	def jobFile(self, jobNumber, name=None):
+		jobNumber = str(jobNumber)
+		if not re.match(r"^[0-9]+$", jobNumber):
+			raise ValueError("invalid job number: {0}".format(jobNumber))
+		jobDirectory = os.path.join(self.runDirectory, jobNumber)
+		if name is None:
+			return jobDirectory
+		if not name or os.path.basename(name) != name or name in (".", ".."):
+			raise ValueError("invalid file name: {0}".format(name))
+		path = os.path.join(jobDirectory, name)
+		if os.path.dirname(os.path.realpath(path)) != os.path.realpath(jobDirectory): # symbolic links out of the job directory
+			raise ValueError("invalid file name: {0}".format(name))
+		return path
+
+	## listFiles Method
+	# returns [name, size, modification time] of the files of a job matching any of the (case insensitive) shell patterns
+	def listFiles(self, jobNumber, patterns):
+		jobDirectory = self.jobFile(jobNumber)
+		if not os.path.isdir(jobDirectory):
+			raise ValueError("job {0} has no job directory".format(jobNumber))
+		rules = [re.compile(fnmatch.translate(pattern), re.IGNORECASE) for pattern in patterns]
+		files = []
+		for name in sorted(os.listdir(jobDirectory)):
+			path = os.path.join(jobDirectory, name)
+			if os.path.isfile(path) and any(rule.match(name) for rule in rules):
+				stat = os.stat(path)
+				files.append([name, stat.st_size, stat.st_mtime])
+		return files
+
+	## readChunk Method
+	# returns {"data": base64 encoded chunk, "compressed", "offset", "size": file size, "mtime"}
+	# length is capped at the chunk size; compress only applies to text files
+	def readChunk(self, jobNumber, name, offset, length=None, compress=False):
+		path = self.jobFile(jobNumber, name)
+		length = self.chunkSize if length is None else min(length, self.chunkSize)
+		stat = os.stat(path)
+		if stat.st_size > self.chunkSize:
+			with self.mapLock:
+				mapped = self.__map(path, stat)
+				mapped["readers"] = mapped["readers"] + 1
+			try: # chunks of the same or other files are copied in parallel; only the map lookup is locked
+				data = mapped["map"][offset:offset + length]
+			finally:
+				with self.mapLock:
+					mapped["readers"] = mapped["readers"] - 1
+					if mapped["dropped"] and mapped["readers"] == 0:
+						self.__unmap(mapped)
+		else:
+			with open(path, "rb") as jobFile:
+				jobFile.seek(offset)
+				data = jobFile.read(length)
+		return self.__encode(name, data, compress, {"offset":offset, "size":stat.st_size, "mtime":stat.st_mtime})
+
+	## checksum Method
+	# returns {"sha256", "size", "mtime"} of a file in a job directory; the digest is kept until the file changes
+	def checksum(self, jobNumber, name):
+		path = self.jobFile(jobNumber, name)
+		stat = os.stat(path)
+		with self.lock:
+			cached = self.checksums.get(path)
+		if cached is None or cached[:2] != (stat.st_size, stat.st_mtime):
+			digest = hashlib.sha256()
+			with open(path, "rb") as jobFile:
+				for block in iter(lambda: jobFile.read(self.chunkSize), b""):
+					digest.update(block)
+			cached = (stat.st_size, stat.st_mtime, digest.hexdigest())
+			with self.lock:
+				self.checksums[path] = cached
+		return {"sha256":cached[2], "size":cached[0], "mtime":cached[1]}
+
+	## openUpload Method
+	# starts an upload of a file; returns the upload ID
+	def openUpload(self, name):
+		if not name or os.path.basename(name) != name or name in (".", ".."):
+			raise ValueError("invalid file name: {0}".format(name))
+		self.__removeStaleUploads()
+		if not os.path.isdir(self.uploadDirectory):
+			os.mkdir(self.uploadDirectory)
+		with self.lock:
+			uploadID = next(self.ids)
+			path = os.path.join(self.uploadDirectory, "{0}-{1}".format(os.getpid(), uploadID))
+			open(path, "wb").close()
+			self.uploads[uploadID] = {"name":name, "path":path, "size":0, "started":time.time(), "done":False}
+		return uploadID
+
+	## writeChunk Method
+	# writes a base64 encoded (and possibly compressed) chunk of an upload at the given offset
+	def writeChunk(self, uploadID, offset, data, compressed=False):
+		upload = self.__upload(uploadID)
+		data = base64.b64decode(data)
+		if compressed:
+			data = zlib.decompress(data)
+		with open(upload["path"], "r+b") as uploadFile:
+			uploadFile.seek(offset)
+			uploadFile.write(data)
+		with self.lock:
+			upload["size"] = max(upload["size"], offset + len(data))
+
+	## closeUpload Method
+	# finishes an upload after checking that all of its size bytes arrived
+	def closeUpload(self, uploadID, size):
+		upload = self.__upload(uploadID)
+		if os.path.getsize(upload["path"]) != size:
+			raise ValueError("upload of {0} is incomplete: {1} of {2} bytes".format(upload["name"], os.path.getsize(upload["path"]), size))
+		upload["done"] = True
+
+	## takeUpload Method
+	# moves a finished upload to the given path
+	def takeUpload(self, uploadID, path):
+		upload = self.__upload(uploadID)
+		if not upload["done"]:
+			raise ValueError("upload of {0} was not closed".format(upload["name"]))
+		os.rename(upload["path"], path)
+		with self.lock:
+			self.uploads.pop(uploadID, None)
+
+	## __map Private Method
+	# returns the map record of a file, mapped again if the file changed; must be called while holding mapLock
+	def __map(self, path, stat):
+		mapped = self.maps.pop(path, None)
+		if mapped is not None and (mapped["size"], mapped["mtime"]) != (stat.st_size, stat.st_mtime):
+			self.__drop(mapped)
+			mapped = None
+		if mapped is None:
+			mappedFile = open(path, "rb")
+			try:
+				mapped = {"size":stat.st_size, "mtime":stat.st_mtime, "file":mappedFile,
+					"map":mmap.mmap(mappedFile.fileno(), 0, access=mmap.ACCESS_READ), "readers":0, "dropped":False}
+			except Exception:
+				mappedFile.close()
+				raise
+			while len(self.maps) >= self.maxMaps:
+				self.__drop(self.maps.popitem(last=False)[1])
+		self.maps[path] = mapped
+		return mapped
+
+	## __drop Private Method
+	# forgets a mapped file; it is closed once no reader is copying from it; must be called while holding mapLock
+	def __drop(self, mapped):
+		mapped["dropped"] = True
+		if mapped["readers"] == 0:
+			self.__unmap(mapped)
+
+	## __unmap Private Method
+	# closes the mmap and file of a mapped file
+	def __unmap(self, mapped):
+		mapped["map"].close()
+		mapped["file"].close()
+
+	## __upload Private Method
+	# returns an open upload or raises ValueError
+	def __upload(self, uploadID):
+		with self.lock:
+			upload = self.uploads.get(uploadID)
+		if upload is None:
+			raise ValueError("unknown upload: {0}".format(uploadID))
+		return upload
+
+	## __removeStaleUploads Private Method
+	# removes uploads that were not used for a job in time, including those left by an earlier daemon run
+	def __removeStaleUploads(self):
+		with self.lock:
+			stale = [uploadID for uploadID, upload in self.uploads.items() if time.time() - upload["started"] > self.uploadTimeout]
+			for uploadID in stale:
+				logging.info("removed unused upload of {0}".format(self.uploads.pop(uploadID)["name"]))
+			active = set(upload["path"] for upload in self.uploads.values())
+		if not os.path.isdir(self.uploadDirectory):
+			return
+		for name in os.listdir(self.uploadDirectory):
+			path = os.path.join(self.uploadDirectory, name)
+			try:
+				if path not in active and time.time() - os.path.getmtime(path) > self.uploadTimeout:
+					os.remove(path)
+			except OSError:
+				pass
+
+	## __encode Private Method
+	# adds the base64 encoded data to a chunk reply, compressed if asked for and worthwhile
+	def __encode(self, name, data, compress, reply):
+		reply["compressed"] = False
+		if compress and os.path.splitext(name)[1].lower() in self.compressExtensions:
+			packed = zlib.compress(data, self.compressionLevel)
+			if len(packed) < len(data):
+				data = packed
+				reply["compressed"] = True
+		reply["data"] = base64.b64encode(data).decode("ascii")
+		return reply
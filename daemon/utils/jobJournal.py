@@ -0,0 +1,220 @@
+from __future__ import print_function
+import os
+import threading
+import time
+import zlib
+import logging
+from collections import OrderedDict
+
+import serpent
+
+## @package jobJournal
+## @brief
+# Write-ahead journal of job events with periodic compaction into a snapshot.
+#
+# Every change of a job is appended to the journal as one small record, so the cost of a
+# state change no longer depends on the size of the queue. Records are written by a single
+# writer thread: events arriving close together are coalesced (only the latest state of a
+# job is kept) and written with one fsync. Once enough records have been written the full
+# state is dumped to a snapshot file that atomically replaces the old one, and the journal
+# starts over.
+#
+# Each record is framed as "<length> <crc32>\n<serpent data>\n" and carries a sequence number.
+# Loading replays the records newer than the snapshot and stops at the first torn or corrupt
+# record, so a crash in the middle of a write loses at most the records of the last batch.
+
+## atomicWrite Function
+# writes data to a temporary file and renames it over path, so path always holds a complete file
+def atomicWrite(path, data):
+	tmpPath = path + ".tmp"
+	with open(tmpPath, "wb") as tmpFile:
+		tmpFile.write(data)
+		tmpFile.flush()
+		os.fsync(tmpFile.fileno())
+	if os.name == "nt" and os.path.isfile(path): # rename does not replace files on Windows
+		os.remove(path)
+	os.rename(tmpPath, path)
+	if hasattr(os, "O_DIRECTORY"): # make the rename itself durable
+		directory = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY | os.O_DIRECTORY)
+		try:
+			os.fsync(directory)
+		finally:
+			os.close(directory)
+
+class jobJournal(object):
+	def __init__(self, snapshotPath, journalPath, snapshot, stateLock, flushDelay=0.05, compactAfter=1000):
+		self.snapshotPath = snapshotPath
+		self.journalPath = journalPath
+		self.snapshot = snapshot			# function returning the full state {"jobs": [...]}
+		self.stateLock = stateLock			# lock guarding the state returned by snapshot
+		self.flushDelay = flushDelay		# seconds to wait for more events before writing a batch
+		self.compactAfter = compactAfter	# records written to the journal before it is compacted
+
+		self.condition = threading.Condition(threading.Lock())
+		self.fileLock = threading.Lock()	# serializes writes to and truncation of the journal file
+		self.pending = OrderedDict()		# key: encoded record waiting to be written
+		self.sequence = 0					# sequence number of the latest record
+		self.flushedSequence = 0			# sequence number of the latest record on disk
+		self.journalRecords = 0				# records in the journal since the last snapshot
+		self.journalFile = None
+		self.writerThread = None
+
+	## load Method
+	# returns the state stored in the snapshot and journal: {"jobs": [...], "hist": [...]} or None if neither exists
+	# "hist" holds the job history written by older versions, newest first
+	def load(self):
+		if not os.path.isfile(self.snapshotPath) and not os.path.isfile(self.journalPath):
+			return None
+
+		state = {"jobs":[], "hist":[]}
+		snapshotSequence = 0
+		if os.path.isfile(self.snapshotPath):
+			with open(self.snapshotPath, "rb") as snapshotFile:
+				snapshot = serpent.load(snapshotFile)
+			state = snapshot["state"]
+			snapshotSequence = snapshot["sequence"]
+
+		jobs = OrderedDict((job["jobData"]["jobID"], job) for job in state["jobs"])
+		hist = list(state.get("hist",[]))
+		self.sequence = snapshotSequence
+
+		validBytes = 0
+		if os.path.isfile(self.journalPath):
+			with open(self.journalPath, "rb") as journalFile:
+				data = journalFile.read()
+			for record, end in self.__readRecords(data):
+				validBytes = end
+				if record["sequence"] <= snapshotSequence:
+					continue # already part of the snapshot
+				self.sequence = record["sequence"]
+				self.journalRecords = self.journalRecords + 1
+				if record["op"] == "job":
+					jobs[record["job"]["jobData"]["jobID"]] = record["job"]
+				elif record["op"] == "remove":
+					jobs.pop(record["jobID"], None)
+				elif record["op"] == "hist": # written by older versions
+					hist.insert(0, record["job"])
+			if validBytes < len(data):
+				logging.error("discarded {0} bytes of a torn or corrupt journal record in {1}".format(len(data) - validBytes, self.journalPath))
+				with open(self.journalPath, "r+b") as journalFile:
+					journalFile.truncate(validBytes)
+
+		self.flushedSequence = self.sequence
+		return {"jobs":list(jobs.values()), "hist":hist}
+
+	## start Method
+	# opens the journal for appending and starts the writer thread
+	def start(self):
+		self.journalFile = open(self.journalPath, "ab")
+		self.writerThread = threading.Thread(target=self.__writer, name="WAM-journal")
+		self.writerThread.setDaemon(True)
+		self.writerThread.start()
+
+	## recordJob Method
+	# records the current state of an active job
+	def recordJob(self, job):
+		self.__record(("job", job["jobData"]["jobID"]), {"op":"job", "job":job})
+
+	## recordRemoval Method
+	# records that a job left the active job list
+	def recordRemoval(self, jobID):
+		self.__record(("job", jobID), {"op":"remove", "jobID":jobID})
+
+	## flush Method
+	# waits until every record made so far is on disk (or the timeout passes)
+	def flush(self, timeout=10):
+		deadline = time.time() + timeout
+		with self.condition:
+			sequence = self.sequence
+			self.condition.notify_all()
+			while self.flushedSequence < sequence and time.time() < deadline:
+				self.condition.wait(0.1)
+			return self.flushedSequence >= sequence
+
+	## compact Method
+	# writes the full state to a new snapshot and empties the journal
+	# pending records are covered by the snapshot and dropped; must not be called while holding stateLock
+	def compact(self):
+		with self.stateLock:
+			state = self.snapshot()
+			with self.condition:
+				self.pending.clear()
+				sequence = self.sequence
+			data = serpent.dumps({"sequence":sequence, "state":state})
+		atomicWrite(self.snapshotPath, data)
+
+		with self.fileLock:
+			self.journalFile.seek(0)
+			self.journalFile.truncate()
+		with self.condition:
+			self.journalRecords = 0
+			self.flushedSequence = max(self.flushedSequence, sequence)
+			self.condition.notify_all()
+
+	## __record Private Method
+	# encodes a record and queues it for the writer; a newer record with the same key replaces an unwritten one
+	def __record(self, key, record):
+		with self.condition:
+			self.sequence = self.sequence + 1
+			record["sequence"] = self.sequence
+			payload = serpent.dumps(record)
+			self.pending.pop(key, None)
+			self.pending[key] = "{0} {1}\n".format(len(payload), zlib.crc32(payload) & 0xffffffff).encode("ascii") + payload + b"\n"
+			self.condition.notify_all()
+
+	## __writer Private Method
+	# writer thread loop; appends batches of records with a single fsync
+	def __writer(self):
+		while True:
+			with self.condition:
+				while not self.pending:
+					self.condition.wait()
+			time.sleep(self.flushDelay) # let events arriving close together join the batch
+
+			with self.condition:
+				batch = list(self.pending.values())
+				self.pending.clear()
+				sequence = self.sequence
+
+			# records of a batch that lands after a compaction are older than the snapshot and skipped on load
+			with self.fileLock:
+				try:
+					self.journalFile.write(b"".join(batch))
+					self.journalFile.flush()
+					os.fsync(self.journalFile.fileno())
+				except (IOError, OSError) as e:
+					logging.error("unable to write job journal {0}: {1}".format(self.journalPath,e))
+
+			with self.condition:
+				self.journalRecords = self.journalRecords + len(batch)
+				self.flushedSequence = max(self.flushedSequence, sequence)
+				self.condition.notify_all()
+				compactNow = self.journalRecords >= self.compactAfter
+
+			if compactNow:
+				try:
+					self.compact()
+				except Exception as e:
+					logging.error("unable to compact job journal {0}: {1}".format(self.journalPath,e))
+
+	## __readRecords Private Method
+	# yields (record, end offset) for each intact record in the journal data
+	def __readRecords(self, data):
+		offset = 0
+		while offset < len(data):
+			headerEnd = data.find(b"\n", offset)
+			if headerEnd < 0:
+				return
+			try:
+				length, crc = [int(value) for value in data[offset:headerEnd].split()]
+			except ValueError:
+				return
+			payload = data[headerEnd+1:headerEnd+1+length]
+			if len(payload) < length or zlib.crc32(payload) & 0xffffffff != crc:
+				return
+			try:
+				record = serpent.loads(payload)
+			except Exception:
+				return
+			offset = headerEnd + 1 + length + 1
+			yield record, offset
@@ -0,0 +1,168 @@
+from __future__ import print_function
+import heapq
+import itertools
+import time
+from collections import OrderedDict
+
+## @package jobQueue
+## @brief
+# Indexed priority queue holding every active (queued, held or running) job of a daemon.
+# Queued jobs are kept in a heap keyed on (priority, submission timestamp) and all
+# jobs are indexed by jobID and jobNumber so lookups and removals never scan the list.
+# Held jobs (e.g. jobs waiting on other jobs) stay indexed but are kept out of the heap
+# until they are pushed again.
+#
+# Removal from the heap is lazy: stale heap entries are skipped when they reach the
+# top and the heap is rebuilt once they outnumber the live entries.
+
+class jobQueue(object):
+	def __init__(self, jobs=None):
+		self.__heap = []		# heap entries: [priority, submissionTimestamp, sequence, jobID]
+		self.__entries = {}		# jobID: live heap entry of a queued job
+		self.__jobs = {}		# jobID: job dictionary of every active job
+		self.__jobNumbers = {}	# jobNumber: list of jobIDs
+		self.__running = OrderedDict()	# jobID: None for jobs taken from the heap, in start order
+		self.__held = OrderedDict()		# jobID: None for jobs kept out of the heap, in hold order
+		self.__sequence = itertools.count()
+
+		if jobs is not None:
+			for job in jobs:
+				self.push(job)
+
+	## push Method
+	# adds a job to the queue; O(log n)
+	def push(self, job):
+		jobID = job["jobData"]["jobID"]
+		jobNumber = job["jobData"]["jobNumber"]
+		if "submissionTimestamp" not in job["jobData"]:
+			job["jobData"]["submissionTimestamp"] = time.time()
+
+		if jobID not in self.__jobs:
+			self.__jobs[jobID] = job
+			self.__jobNumbers.setdefault(jobNumber, []).append(jobID)
+		self.__running.pop(jobID, None)
+		self.__held.pop(jobID, None)
+		if jobID in self.__entries: # pushing a queued job again replaces its heap entry
+			self.__entries[jobID][-1] = None
+
+		entry =[int(job["jobData"]["priority"]), job["jobData"]["submissionTimestamp"], next(self.__sequence), jobID]
+		self.__entries[jobID] = entry
+		heapq.heappush(self.__heap, entry)
+
+	## peek Method
+	# returns the next queued job without removing it, or None if nothing is queued
+	def peek(self):
+		self.__dropStaleEntries()
+		if self.__heap:
+			return self.__jobs[self.__heap[0][-1]]
+		return None
+
+	## pop Method
+	# takes the next queued job off the heap; the job stays indexed as a running job
+	def pop(self):
+		self.__dropStaleEntries()
+		if not self.__heap:
+			return None
+		entry = heapq.heappop(self.__heap)
+		return self.take(entry[-1])
+
+	## take Method
+	# takes a specific queued job off the heap (e.g. when it is started out of order)
+	def take(self, jobID):
+		entry = self.__entries.pop(jobID, None)
+		if entry is not None:
+			entry[-1] = None # mark heap entry as stale
+		self.__held.pop(jobID, None)
+		if jobID in self.__jobs and jobID not in self.__running:
+			self.__running[jobID] = None
+		return self.__jobs.get(jobID)
+
+	## hold Method
+	# takes a queued job out of the heap without starting it; push it again to release it
+	def hold(self, jobID):
+		entry = self.__entries.pop(jobID, None)
+		if entry is not None:
+			entry[-1] = None
+		if jobID in self.__jobs and jobID not in self.__held:
+			self.__held[jobID] = None
+		self.__compact()
+
+	## remove Method
+	# removes a job (queued, held or running) from the queue and its indices; returns the job or None
+	def remove(self, jobID):
+		job = self.__jobs.pop(jobID, None)
+		if job is None:
+			return None
+
+		entry = self.__entries.pop(jobID, None)
+		if entry is not None:
+			entry[-1] = None
+		self.__running.pop(jobID, None)
+		self.__held.pop(jobID, None)
+
+		jobNumber = job["jobData"]["jobNumber"]
+		jobIDs = self.__jobNumbers.get(jobNumber, [])
+		if jobID in jobIDs:
+			jobIDs.remove(jobID)
+		if not jobIDs:
+			self.__jobNumbers.pop(jobNumber, None)
+
+		self.__compact()
+		return job
+
+	## get Method
+	# returns the job with the given jobID or None
+	def get(self, jobID):
+		return self.__jobs.get(jobID)
+
+	## getByNumber Method
+	# returns all jobs submitted under the given jobNumber
+	def getByNumber(self, jobNumber):
+		return [self.__jobs[jobID] for jobID in self.__jobNumbers.get(jobNumber, [])]
+
+	## isQueued Method
+	# True if the job is waiting in the heap
+	def isQueued(self, jobID):
+		return jobID in self.__entries
+
+	## queued Method
+	# returns the queued jobs in priority order; O(n log n), meant for display and scheduling scans
+	def queued(self):
+		return [self.__jobs[entry[-1]] for entry in sorted(self.__entries.values())]
+
+	## running Method
+	# returns the jobs that were taken off the heap, in start order
+	def running(self):
+		return [self.__jobs[jobID] for jobID in self.__running]
+
+	## held Method
+	# returns the jobs kept out of the heap, in hold order
+	def held(self):
+		return [self.__jobs[jobID] for jobID in self.__held]
+
+	## jobs Method
+	# returns every active job: running jobs first, then queued jobs in priority order, then held jobs
+	def jobs(self):
+		return self.running() + self.queued() + self.held()
+
+	def __len__(self):
+		return len(self.__jobs)
+
+	def __contains__(self, jobID):
+		return jobID in self.__jobs
+
+	def __iter__(self):
+		return iter(self.jobs())
+
+	## __dropStaleEntries Private Method
+	# pops removed entries off the top of the heap
+	def __dropStaleEntries(self):
+		while self.__heap and self.__heap[0][-1] is None:
+			heapq.heappop(self.__heap)
+
+	## __compact Private Method
+	# rebuilds the heap once stale entries outnumber the live ones
+	def __compact(self):
+		if len(self.__heap) > 2*len(self.__entries) + 32:
+			self.__heap = [entry for entry in self.__heap if entry[-1] is not None]
+			heapq.heapify(self.__heap)
@@ -0,0 +1,67 @@
+from __future__ import print_function
+import os
+import re
+
+import psutil
+
+## @package jobRecovery
+## @brief
+# Helpers used to recover the jobs of a daemon after it restarts.
+#
+# A solver started by the previous daemon keeps running in its own session, so it can be
+# found again from its pid and process creation time (the creation time guards against the
+# pid having been reused). attachedProcess stands in for the subprocess.Popen object of such
+# a solver. Abaqus/Explicit jobs whose solver died can continue from their state files with
+# the recover option.
+
+## findSolverProcess Function
+# returns the psutil process of a job's solver if it is still running, otherwise None
+def findSolverProcess(pid, createTime):
+	if pid is None or createTime is None:
+		return None
+	try:
+		process = psutil.Process(pid)
+		if abs(process.create_time() - createTime) > 1.0 or process.status() == psutil.STATUS_ZOMBIE:
+			return None
+		return process
+	except psutil.Error:
+		return None
+
+## canRecover Function
+# True if an Abaqus/Explicit job left the state files needed to continue it with the recover option
+def canRecover(jobDirectory, jobName, inpPath):
+	for extension in [".abq", ".res", ".stt"]:
+		if not os.path.isfile(os.path.join(jobDirectory, jobName + extension)):
+			return False
+	try:
+		with open(inpPath, "r") as inp:
+			return re.search(r"^\*DYNAMIC\s*,\s*EXPLICIT", inp.read(), re.IGNORECASE | re.MULTILINE) is not None
+	except (IOError, OSError):
+		return False
+
+class attachedProcess(object):
+	def __init__(self, process):
+		self.process = process	# psutil process of the solver started by the previous daemon
+		self.pid = process.pid
+		self.returncode = None
+
+	## poll Method
+	# returns None while the solver runs; its exit status is not known, so 0 once it has exited
+	def poll(self):
+		if self.returncode is None:
+			try:
+				if self.process.is_running() and self.process.status() != psutil.STATUS_ZOMBIE:
+					return None
+			except psutil.Error:
+				pass
+			self.returncode = 0
+		return self.returncode
+
+	## wait Method
+	# waits for the solver to exit
+	def wait(self):
+		try:
+			self.process.wait()
+		except psutil.Error:
+			pass
+		return self.poll()
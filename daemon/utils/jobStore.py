@@ -0,0 +1,112 @@
+from __future__ import print_function
+import sqlite3
+import threading
+
+import serpent
+
+## @package jobStore
+## @brief
+# Job history kept in an embedded SQLite database.
+#
+# Every finished job is stored as one row: the fields history queries filter on are columns
+# with their own index and the full job record is kept as serpent data. Queries return the
+# newest jobs first and never load more rows than asked for, so the history can grow without
+# limit and the daemon only keeps the active queue in memory.
+
+queryFields = ["jobID", "jobNumber", "jobName", "user", "status", "host"]
+
+class jobStore(object):
+	def __init__(self, dbPath, host):
+		self.dbPath = dbPath
+		self.host = host			# host written to the rows of jobs finished on this daemon
+		self.lock = threading.Lock()
+
+		self.db = sqlite3.connect(dbPath, check_same_thread=False)
+		self.db.execute("PRAGMA journal_mode=WAL")		# readers do not block the writer
+		self.db.execute("PRAGMA synchronous=NORMAL")	# commits survive a daemon crash without an fsync each
+		self.db.execute("""CREATE TABLE IF NOT EXISTS jobHist (
+			seq INTEGER PRIMARY KEY AUTOINCREMENT,
+			jobID TEXT, jobNumber TEXT, jobName TEXT, user TEXT, status TEXT, host TEXT,
+			submissionTime TEXT, submissionTimestamp REAL, runTime INTEGER, cpus INTEGER, record BLOB)""")
+		for field in ["jobID", "jobNumber", "jobName", "user", "status", "host", "submissionTimestamp"]:
+			self.db.execute("CREATE INDEX IF NOT EXISTS jobHist_{0} ON jobHist ({0})".format(field))
+		self.db.commit()
+
+	## add Method
+	# stores a finished job
+	def add(self, job):
+		self.addMany([job])
+
+	## addMany Method
+	# stores finished jobs in one transaction, oldest first
+	def addMany(self, jobs):
+		rows = []
+		for job in jobs:
+			jobData = job["jobData"]
+			rows.append((jobData["jobID"], jobData["jobNumber"], jobData["jobName"], jobData["clientName"], jobData["status"], self.host,
+				jobData.get("submissionTime"), jobData.get("submissionTimestamp"), jobData.get("runTime"), int(job["solverFlags"]["cpus"]),
+				sqlite3.Binary(serpent.dumps(job))))
+		with self.lock:
+			self.db.executemany("""INSERT INTO jobHist (jobID, jobNumber, jobName, user, status, host, submissionTime,
+				submissionTimestamp, runTime, cpus, record) VALUES (?,?,?,?,?,?,?,?,?,?,?)""", rows)
+			self.db.commit()
+
+	## query Method
+	# returns finished jobs, newest first, matching all given filters
+	# status matches on its start (e.g. "killed" matches "killed by user"); since/until bound the submission timestamp
+	def query(self, offset=0, limit=30, since=None, until=None, **filters):
+		where, values = self.__where(since, until, filters)
+		sql = "SELECT record FROM jobHist{0} ORDER BY seq DESC".format(where)
+		if limit is not None:
+			sql = sql + " LIMIT ? OFFSET ?"
+			values = values + [int(limit), int(offset)]
+		with self.lock:
+			rows = self.db.execute(sql, values).fetchall()
+		return [serpent.loads(bytes(row[0])) for row in rows]
+
+	## count Method
+	# returns the number of finished jobs matching the filters
+	def count(self, since=None, until=None, **filters):
+		where, values = self.__where(since, until, filters)
+		with self.lock:
+			return self.db.execute("SELECT COUNT(*) FROM jobHist{0}".format(where), values).fetchone()[0]
+
+	## statuses Method
+	# returns the statuses of the finished jobs with the given jobID or jobNumber
+	def statuses(self, jobID=None, jobNumber=None):
+		where, values = self.__where(None, None, {"jobID":jobID, "jobNumber":jobNumber})
+		with self.lock:
+			return [row[0] for row in self.db.execute("SELECT status FROM jobHist{0}".format(where), values).fetchall()]
+
+	## runTimes Method
+	# returns the run times of the latest completed runs of a job name on the given number of cpus
+	def runTimes(self, jobName, cpus, limit=50):
+		with self.lock:
+			rows = self.db.execute("""SELECT runTime FROM jobHist WHERE jobName = ? AND status = 'complete' AND cpus = ?
+				AND runTime IS NOT NULL ORDER BY seq DESC LIMIT ?""", (jobName, int(cpus), int(limit))).fetchall()
+		return [row[0] for row in rows]
+
+	## __where Private Method
+	# builds the WHERE clause of a query from the filters that are set
+	def __where(self, since, until, filters):
+		clauses = []
+		values = []
+		for field in queryFields:
+			value = filters.get(field)
+			if value is None:
+				continue
+			if field == "status":
+				clauses.append("status GLOB ?")
+				values.append(value + "*")
+			else:
+				clauses.append("{0} = ?".format(field))
+				values.append(value)
+		if since is not None:
+			clauses.append("submissionTimestamp >= ?")
+			values.append(float(since))
+		if until is not None:
+			clauses.append("submissionTimestamp < ?")
+			values.append(float(until))
+		if not clauses:
+			return "", values
+		return " WHERE " + " AND ".join(clauses), values
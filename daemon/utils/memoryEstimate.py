@@ -0,0 +1,41 @@
+from __future__ import print_function
+import os
+import re
+
+## @package memoryEstimate
+## @brief
+# Memory estimates used for memory-aware admission of jobs.
+#
+# inputFileMemoryEstimate gives a rough estimate from the size of the input file before a
+# job starts; datMemoryEstimate reads the estimate Abaqus/Standard writes to the .dat file
+# once the pre-processor has run.
+
+## inputFileMemoryEstimate Function
+# returns an estimate in bytes from the size of an input file and a bytes of memory per input byte factor
+def inputFileMemoryEstimate(inpPath, bytesPerInputByte):
+	if not os.path.isfile(inpPath):
+		return 0
+	return int(os.path.getsize(inpPath)*bytesPerInputByte)
+
+## datMemoryEstimate Function
+# returns the "memory to minimize I/O" estimate (summed over all processes) in bytes from an
+# Abaqus .dat file, or None if the estimate has not been written yet
+# only the head of the file is read since the estimate is written right after the pre-processor
+def datMemoryEstimate(datPath, maxBytes=4*1048576):
+	if not os.path.isfile(datPath):
+		return None
+	with open(datPath, "r") as dat:
+		content = dat.read(maxBytes)
+
+	start = content.find("M E M O R Y   E S T I M A T E")
+	if start < 0:
+		return None
+
+	# rows: process, floating point operations per iteration, minimum memory (MB), memory to minimize I/O (MB)
+	rowPattern = re.compile(r"^\s*(\d+)\s+([0-9.]+E[+-]\d+)\s+(\d+)\s+(\d+)\s*$", re.MULTILINE)
+	estimate = 0
+	for row in rowPattern.finditer(content, start, min(len(content), start + 10000)):
+		estimate = estimate + int(row.group(4))
+	if estimate == 0:
+		return None
+	return estimate*1048576
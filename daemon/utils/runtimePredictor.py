@@ -0,0 +1,170 @@
+from __future__ import print_function
+import os
+import math
+import threading
+import logging
+
+import serpent
+
+from .jobJournal import atomicWrite
+
+## @package runtimePredictor
+## @brief
+# Predicts the wall time and peak memory of a job from completed job history.
+#
+# One model is kept per (host, solver). Each model is a ridge regression on log-scaled
+# features (input file size, element count, node count, cpus) fitted to the log of the
+# target. Only the sufficient statistics (X'X and X'y) are stored, so adding a finished job
+# costs O(features^2) and the model never has to be refit from the full history.
+
+featureNames = ["bias", "fileSize", "elements", "nodes", "cpus"]
+targetNames = ["wallTime", "peakMemory"]
+
+## inputFileFeatures Function
+# scans an Abaqus input file (and its *INCLUDE files) for its size, element and node counts
+def inputFileFeatures(inpPath):
+	features = {"fileSize":0, "elements":0, "nodes":0}
+	__scanInputFile(inpPath, features, 0)
+	return features
+
+def __scanInputFile(inpPath, features, depth):
+	if depth > 10 or not os.path.isfile(inpPath):
+		return
+	features["fileSize"] = features["fileSize"] + os.path.getsize(inpPath)
+	block = None
+	with open(inpPath, "r") as inp:
+		for line in inp:
+			if line.startswith("**"): # comment line
+				continue
+			if line.startswith("*"):
+				keyword = line[1:].split(",")[0].strip().upper()
+				if keyword == "NODE":
+					block = "nodes"
+				elif keyword == "ELEMENT":
+					block = "elements"
+				else:
+					block = None
+				if keyword == "INCLUDE":
+					for option in line.split(",")[1:]:
+						if option.strip().upper().startswith("INPUT"):
+							includeFile = option.split("=",1)[1].strip()
+							includePath = os.path.join(os.path.dirname(inpPath), includeFile)
+							__scanInputFile(includePath, features, depth+1)
+				continue
+			if block is not None and line.strip():
+				features[block] = features[block] + 1
+
+## featureVector Function
+# converts job features into the regression input vector
+def featureVector(features, cpus):
+	return [1.0,
+			math.log(1.0 + features["fileSize"]),
+			math.log(1.0 + features["elements"]),
+			math.log(1.0 + features["nodes"]),
+			math.log(max(1, int(cpus)))]
+
+class runtimePredictor(object):
+	def __init__(self, modelPath, ridge=1.0e-3, minSamples=3):
+		self.modelPath = modelPath
+		self.ridge = ridge				# regularization keeps the solve stable with few samples
+		self.minSamples = minSamples	# number of completed jobs before a model makes predictions
+		self.lock = threading.Lock()
+		self.models = {}				# "host:solver": {"samples", "XtX": {target: [[...]]}, "Xty": {target: [...]}, "counts": {target: n}}
+		self.version = 0				# bumped on every update, so an older snapshot never overwrites a newer one
+		self.savedVersion = 0
+		self.saveLock = threading.Lock()
+		self.load()
+
+	## update Method
+	# adds one completed job to the model
+	def update(self, host, solver, features, cpus, wallTime, peakMemory):
+		x = featureVector(features, cpus)
+		targets = {"wallTime":wallTime, "peakMemory":peakMemory}
+		n = len(x)
+		with self.lock:
+			model = self.models.setdefault("{0}:{1}".format(host,solver), {"samples":0,
+				"XtX":dict((name,[[0.0]*n for i in range(n)]) for name in targetNames), "Xty":dict((name,[0.0]*n) for name in targetNames),
+				"counts":dict((name,0) for name in targetNames)})
+			model["samples"] = model["samples"] + 1
+			for name in targetNames:
+				# a job only counts for the targets it has a value for (e.g. no memory sample, run time under a second)
+				if targets[name] is None or targets[name] <= 0:
+					continue
+				y = math.log(targets[name])
+				model["counts"][name] = model["counts"][name] + 1
+				for i in range(n):
+					for j in range(n):
+						model["XtX"][name][i][j] = model["XtX"][name][i][j] + x[i]*x[j]
+					model["Xty"][name][i] = model["Xty"][name][i] + x[i]*y
+			self.version = self.version + 1
+			snapshot = (self.version, serpent.dumps(self.models))
+		self.save(snapshot)
+
+	## predict Method
+	# returns {"wallTime": seconds, "peakMemory": bytes, "samples": n}; values are None without enough history
+	def predict(self, host, solver, features, cpus):
+		x = featureVector(features, cpus)
+		prediction = {"wallTime":None, "peakMemory":None, "samples":0}
+		with self.lock:
+			model = self.models.get("{0}:{1}".format(host,solver))
+			if model is None:
+				return prediction
+			prediction["samples"] = model["samples"]
+			for name in targetNames:
+				if model["counts"][name] < self.minSamples:
+					continue
+				A = [row[:] for row in model["XtX"][name]]
+				for i in range(len(A)):
+					A[i][i] = A[i][i] + self.ridge*model["counts"][name]
+				w = self.__solve(A, model["Xty"][name][:])
+				if w is not None:
+					logValue = sum([wi*xi for wi, xi in zip(w, x)])
+					prediction[name] = math.exp(min(logValue, 50.0))
+		return prediction
+
+	## load Method
+	# loads the serialized model or starts an empty one
+	def load(self):
+		if os.path.isfile(self.modelPath):
+			try:
+				with open(self.modelPath, "rb") as modelFile:
+					self.models = serpent.load(modelFile)
+				for key in [key for key, model in self.models.items() if not isinstance(model["XtX"], dict)]:
+					logging.info("dropped runtime model {0}, it was trained with jobs missing a target".format(key))
+					del self.models[key] # older models shared one XtX between the targets
+			except Exception as e:
+				logging.error("unable to read runtime model {0}, starting without history: {1}".format(self.modelPath,e))
+				self.models = {}
+
+	## save Method
+	# writes a (version, serialized models) snapshot taken under lock; called without holding lock
+	# so predictions never wait on disk I/O
+	def save(self, snapshot):
+		with self.saveLock:
+			if snapshot[0] <= self.savedVersion:
+				return # a newer snapshot was written already
+			try:
+				atomicWrite(self.modelPath, snapshot[1])
+				self.savedVersion = snapshot[0]
+			except Exception as e:
+				logging.error("unable to write runtime model {0}: {1}".format(self.modelPath,e))
+
+	## __solve Private Method
+	# solves A w = b by Gaussian elimination with partial pivoting; returns None if singular
+	def __solve(self, A, b):
+		n = len(b)
+		for col in range(n):
+			pivot = max(range(col, n), key=lambda row: abs(A[row][col]))
+			if abs(A[pivot][col]) < 1.0e-12:
+				return None
+			A[col], A[pivot] = A[pivot], A[col]
+			b[col], b[pivot] = b[pivot], b[col]
+			for row in range(col+1, n):
+				factor = A[row][col]/A[col][col]
+				for k in range(col, n):
+					A[row][k] = A[row][k] - factor*A[col][k]
+				b[row] = b[row] - factor*b[col]
+		w = [0.0]*n
+		for row in range(n-1, -1, -1):
+			w[row] = (b[row] - sum([A[row][k]*w[k] for k in range(row+1, n)]))/A[row][row]
+		return w
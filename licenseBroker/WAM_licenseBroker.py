@@ -0,0 +1,214 @@
+#!/usr/bin/python
+
+# Futures
+from __future__ import absolute_import
+from __future__ import print_function
+
+# Standard Libraries
+import sys
+import os
+import threading
+import socket
+import time
+import itertools
+import logging
+
+# 3rd Party Packages
+import Pyro4 # https://pypi.org/project/Pyro4/
+
+# Local Source Packages
+from utils.parseJSONFile import parseJSONFile
+
+# Development Version
+version = 0.5
+
+# License broker class visible to the WAM daemons
+# Hands out Abaqus license tokens from a cluster wide pool so that jobs started on several
+# daemons at once never ask the license server for more tokens than it has. Requests are
+# granted strictly first come, first served. Granted tokens are leased and must be renewed
+# by the owning daemon, so tokens of a crashed daemon return to the pool.
+@Pyro4.expose
+class licenseBroker(object):
+	def __init__(self):
+		# define this directory
+		self.brokerScriptDirectory = os.path.dirname(os.path.realpath(__file__))
+
+		# load broker conf. file
+		self.loadBrokerConfFile()
+
+		# start logging
+		self.loggingSetup()
+
+		# token pool; the configured token count stands in for the license server
+		self.totalTokens = self.brokerConf["license"]["totalTokens"]
+		self.leaseTimeout = self.brokerConf["license"]["leaseTimeout_minutes"]*60
+		self.tickets = {}	# ticket: {"owner", "jobID", "tokens", "granted", "lastSeen"}
+		self.waiting = []	# tickets waiting for tokens, oldest first
+		self.ticketCounter = itertools.count(1)
+		self.ticketLock = threading.Lock()
+
+		self.hostName = socket.gethostname()
+		self.nsThread = None
+
+		logging.info("WAM license broker initialized with {0} tokens".format(self.totalTokens))
+
+	## requestTokens Method
+	# queues a request for tokens and returns its ticket
+	# the request is granted right away if nobody is waiting and enough tokens are free
+	def requestTokens(self,owner,jobID,tokens):
+		tokens = int(tokens)
+		if tokens > self.totalTokens:
+			raise ValueError("job {0} needs {1} tokens, the pool only has {2}".format(jobID,tokens,self.totalTokens))
+
+		with self.ticketLock:
+			ticket = "{0}-{1}".format(owner,next(self.ticketCounter))
+			self.tickets[ticket] = {"owner":owner, "jobID":jobID, "tokens":tokens, "granted":False, "lastSeen":time.time()}
+			self.waiting.append(ticket)
+			logging.info("{0} requested {1} tokens for job {2} (ticket {3})".format(owner,tokens,jobID,ticket))
+			self.__grantTokens()
+		return ticket
+
+	## checkTokens Method
+	# returns "granted", "waiting" or "unknown" (expired or released) for a ticket and renews its lease
+	def checkTokens(self,ticket):
+		with self.ticketLock:
+			self.__expireLeases()
+			request = self.tickets.get(ticket)
+			if request is None:
+				return "unknown"
+			request["lastSeen"] = time.time()
+			if request["granted"]:
+				return "granted"
+			return "waiting"
+
+	## releaseTokens Method
+	# returns the tokens of a ticket to the pool (or withdraws a waiting request)
+	def releaseTokens(self,ticket):
+		with self.ticketLock:
+			request = self.tickets.pop(ticket,None)
+			if ticket in self.waiting:
+				self.waiting.remove(ticket)
+			if request is not None:
+				logging.info("{0} released {1} tokens of job {2} (ticket {3})".format(request["owner"],request["tokens"],request["jobID"],ticket))
+			self.__grantTokens()
+
+	## renewLeases Method
+	# keeps the given tickets of a daemon alive; returns the tickets the broker no longer knows
+	def renewLeases(self,owner,tickets):
+		unknown = []
+		with self.ticketLock:
+			now = time.time()
+			for ticket in tickets:
+				request = self.tickets.get(ticket)
+				if request is None or request["owner"] != owner:
+					unknown.append(ticket)
+				else:
+					request["lastSeen"] = now
+			self.__expireLeases()
+		return unknown
+
+	## getStatus Method
+	# returns the token pool usage and the waiting requests
+	def getStatus(self):
+		with self.ticketLock:
+			self.__expireLeases()
+			usedTokens = sum([request["tokens"] for request in self.tickets.values() if request["granted"]])
+			granted = [[request["owner"], request["jobID"], request["tokens"]] for request in self.tickets.values() if request["granted"]]
+			waiting = [[self.tickets[ticket]["owner"], self.tickets[ticket]["jobID"], self.tickets[ticket]["tokens"]] for ticket in self.waiting]
+		return {"totalTokens":self.totalTokens, "usedTokens":usedTokens, "granted":granted, "waiting":waiting}
+
+	## __grantTokens Private Method
+	# grants waiting requests in order for as long as their tokens fit in the pool
+	# must be called while holding ticketLock
+	def __grantTokens(self):
+		usedTokens = sum([request["tokens"] for request in self.tickets.values() if request["granted"]])
+		while self.waiting:
+			request = self.tickets[self.waiting[0]]
+			if usedTokens + request["tokens"] > self.totalTokens:
+				break # first come, first served; later requests wait behind the head
+			request["granted"] = True
+			usedTokens = usedTokens + request["tokens"]
+			logging.info("granted {0} tokens to {1} for job {2} ({3}/{4} tokens in use)".format(request["tokens"],request["owner"],request["jobID"],usedTokens,self.totalTokens))
+			self.waiting.pop(0)
+
+	## __expireLeases Private Method
+	# drops tickets that have not been renewed within the lease timeout
+	# must be called while holding ticketLock
+	def __expireLeases(self):
+		now = time.time()
+		expired = [ticket for ticket, request in self.tickets.items() if now - request["lastSeen"] > self.leaseTimeout]
+		for ticket in expired:
+			request = self.tickets.pop(ticket)
+			if ticket in self.waiting:
+				self.waiting.remove(ticket)
+			logging.error("lease of ticket {0} ({1} tokens, job {2} on {3}) expired".format(ticket,request["tokens"],request["jobID"],request["owner"]))
+		if expired:
+			self.__grantTokens()
+
+	## loadBrokerConfFile Method
+	# loads the broker configuration json
+	def loadBrokerConfFile(self):
+		filePath = os.path.join(self.brokerScriptDirectory,"brokerConf.json")
+		self.brokerConf = parseJSONFile(filePath)
+		return self.brokerConf
+
+	## loggingSetup Method
+	# configure and start logging
+	def loggingSetup(self):
+		logDirectory = os.path.join(self.brokerScriptDirectory,"logs")
+		if not os.path.isdir(logDirectory):
+			os.mkdir(logDirectory)
+		logFile = os.path.join(logDirectory,self.brokerConf["localhost"]["logFileName"])
+		maxLogSize = self.brokerConf["localhost"]["maxLogSize"] # maximum size of log file in Mb
+
+		if os.path.isfile(logFile) and os.path.getsize(logFile) > maxLogSize*1048576: # delete log file if larger than max - only occurs during restart
+			os.remove(logFile)
+
+		for handler in logging.root.handlers[:]:
+			logging.root.removeHandler(handler)
+
+		logging.basicConfig(filename=logFile, level=logging.DEBUG, format='%(asctime)s - %(levelname)s: %(message)s', datefmt='%m/%d/%Y %I:%M:%S %p')
+
+	## connectToNameServer Method
+	# registers the broker with the name server and keeps re-registering in a thread
+	def connectToNameServer(self, broker_uri):
+		def nsReregister(broker_uri):
+			while 1:
+				nsHost = self.brokerConf["nameServer"]["nameServerIP"]
+				nsPort = self.brokerConf["nameServer"]["nameServerPort"]
+				reconnectTime = self.brokerConf["nameServer"]["reconnectToNameServer_minutes"]
+
+				try:
+					ns = Pyro4.locateNS(host=nsHost,port=nsPort)
+					ns.register(self.brokerConf["nameServer"]["brokerName"], broker_uri)
+					logging.info("shook hands with naming server at {0}:{1}".format(nsHost,nsPort))
+				except:
+					logging.error("cannot connect to name server ({0}:{1}), attempting to reconnect in {2} minutes".format(nsHost,nsPort,reconnectTime))
+
+				time.sleep(reconnectTime*60)
+
+		self.nsThread = threading.Thread(target=nsReregister, args=(broker_uri,))
+		self.nsThread.setDaemon(False)
+		self.nsThread.start()
+
+def main():
+	license_broker = licenseBroker()
+
+	# initialize Pyro4
+	try: # use network ip addr. if connected to network
+		myIP = [(s.connect(('8.8.8.8', 80)), s.getsockname()[0], s.close()) for s in [socket.socket(socket.AF_INET, socket.SOCK_DGRAM)]][0][1]
+		daemon = Pyro4.Daemon(host=myIP, port=license_broker.brokerConf["usePortNumber"])
+		logging.info("starting license broker on {0}:{1}".format(myIP,license_broker.brokerConf["usePortNumber"]))
+	except: # otherwise send error
+		logging.error("unable to connect to network, exiting script")
+		sys.exit(1)
+
+	broker_uri = daemon.register(license_broker,objectId=license_broker.brokerConf["nameServer"]["brokerName"])
+	license_broker.connectToNameServer(broker_uri)
+
+	logging.info("license broker started successfully: uri = {0}".format(broker_uri))
+
+	daemon.requestLoop()
+
+if __name__=="__main__":
+	main()